@@ -0,0 +1,26 @@
+"""attempt invoice/idempotency/status index
+
+Revision ID: 01af5536c4f1
+Revises: a3d6cad473a6
+Create Date: 2026-10-18 11:24:05.117903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '01af5536c4f1'
+down_revision: Union[str, None] = 'a3d6cad473a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_attempt_invoice_idem_status', 'payment_attempts', ['invoice_id', 'idempotency_key', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attempt_invoice_idem_status', table_name='payment_attempts')
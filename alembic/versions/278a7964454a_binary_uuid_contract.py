@@ -0,0 +1,151 @@
+"""binary uuid keys, contract: swap shadow columns in
+
+Revision ID: 278a7964454a
+Revises: 34ab588c7dcd
+Create Date: 2026-10-18 13:09:47.902144
+
+Step two of two. Ship it only once the previous application version is
+fully drained: no instance of it may be running, since it writes text ids
+that nothing converts any more. The sync triggers from 34ab588c7dcd are
+dropped first, before any ALTER removes the columns they read. Each table
+is then rebuilt once, in place with LOCK=NONE, so reads continue while it
+runs. Deploy the application version that ships this revision right after.
+
+Row and index sizes drop accordingly: every uuid goes from a 36 character
+VARCHAR (up to 144 bytes as a utf8mb4 index key) to 16 bytes, and InnoDB
+repeats the primary key in every secondary index entry.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '278a7964454a'
+down_revision: Union[str, None] = '34ab588c7dcd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UUID_COLUMNS = {
+    'invoices': ('id',),
+    'payment_attempts': ('id', 'invoice_id'),
+    'outbox_events': ('id', 'aggregate_id'),
+    'outbox_events_archive': ('id', 'aggregate_id'),
+}
+
+# Indexes containing a uuid column, rebuilt in the same ALTER as the swap.
+UUID_INDEXES = {
+    'invoices': (
+        ('ix_invoice_created', 'created_at, id', False),
+        ('ix_invoice_status_created', 'status, created_at, id', False),
+        ('ix_invoice_customer_created', 'customer_ref, created_at, id', False),
+    ),
+    'payment_attempts': (
+        ('uq_invoice_idemkey', 'invoice_id, idempotency_key', True),
+        ('ix_attempt_invoice', 'invoice_id', False),
+        ('ix_attempt_invoice_idem_status', 'invoice_id, idempotency_key, status', False),
+    ),
+    'outbox_events': (
+        ('ix_outbox_aggregate', 'aggregate_type, aggregate_id', False),
+    ),
+    'outbox_events_archive': (
+        ('ix_outbox_archive_aggregate', 'aggregate_type, aggregate_id', False),
+    ),
+}
+
+
+def _to_binary(expr: str) -> str:
+    return f"UNHEX(REPLACE({expr}, '-', ''))"
+
+
+def _to_text(expr: str) -> str:
+    h = f"LOWER(HEX({expr}))"
+    return (
+        f"CONCAT_WS('-', SUBSTR({h}, 1, 8), SUBSTR({h}, 9, 4), SUBSTR({h}, 13, 4), "
+        f"SUBSTR({h}, 17, 4), SUBSTR({h}, 21, 12))"
+    )
+
+
+def _sync_triggers(table: str, columns: tuple[str, ...]) -> None:
+    assignments = ", ".join(f"NEW.{c}_bin = {_to_binary(f'NEW.{c}')}" for c in columns)
+    for when, suffix in (("INSERT", "ins"), ("UPDATE", "upd")):
+        op.execute(
+            f"CREATE TRIGGER {table}_uuid_bin_{suffix} BEFORE {when} ON {table} "
+            f"FOR EACH ROW SET {assignments}"
+        )
+
+
+def _drop_triggers(table: str) -> None:
+    for suffix in ("ins", "upd"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_uuid_bin_{suffix}")
+
+
+def _drop_indexes(table: str) -> list[str]:
+    clauses = ["DROP PRIMARY KEY"]
+    clauses += [f"DROP INDEX {name}" for name, _, _ in UUID_INDEXES[table]]
+    return clauses
+
+
+def _add_indexes(table: str) -> list[str]:
+    clauses = ["ADD PRIMARY KEY (id)"]
+    clauses += [
+        f"ADD {'UNIQUE ' if unique else ''}INDEX {name} ({cols})"
+        for name, cols, unique in UUID_INDEXES[table]
+    ]
+    return clauses
+
+
+def upgrade() -> None:
+    # The triggers read the text columns the swap drops
+    for table in UUID_COLUMNS:
+        _drop_triggers(table)
+
+    conn = op.get_bind()
+    for table, columns in UUID_COLUMNS.items():
+        missing = conn.execute(
+            sa.text(f"SELECT COUNT(*) FROM {table} WHERE " + " OR ".join(f"{c}_bin IS NULL" for c in columns))
+        ).scalar()
+        if missing:
+            raise RuntimeError(f"{table}: {missing} rows without binary ids, re-run the 34ab588c7dcd backfill")
+
+    # Re-adding the FK with checks off keeps it in place (no table copy);
+    # the ids were converted by the same expression on both sides.
+    op.execute("SET foreign_key_checks = 0")
+    op.execute("ALTER TABLE payment_attempts DROP FOREIGN KEY payment_attempts_ibfk_1")
+
+    for table, columns in UUID_COLUMNS.items():
+        clauses = _drop_indexes(table)
+        clauses += [f"DROP COLUMN {c}" for c in columns]
+        clauses += [f"CHANGE COLUMN {c}_bin {c} BINARY(16) NOT NULL" for c in columns]
+        clauses += _add_indexes(table)
+        op.execute(f"ALTER TABLE {table} {', '.join(clauses)}, ALGORITHM=INPLACE, LOCK=NONE")
+
+    op.execute(
+        "ALTER TABLE payment_attempts ADD CONSTRAINT fk_attempt_invoice "
+        "FOREIGN KEY (invoice_id) REFERENCES invoices (id) ON DELETE CASCADE, ALGORITHM=INPLACE"
+    )
+    op.execute("SET foreign_key_checks = 1")
+
+
+def downgrade() -> None:
+    # Back to the post-expand state: text keys plus synced binary shadows.
+    op.execute("SET foreign_key_checks = 0")
+    op.execute("ALTER TABLE payment_attempts DROP FOREIGN KEY fk_attempt_invoice")
+
+    for table, columns in UUID_COLUMNS.items():
+        adds = ", ".join(f"ADD COLUMN {c}_txt VARCHAR(36) NULL" for c in columns)
+        op.execute(f"ALTER TABLE {table} {adds}, ALGORITHM=INPLACE, LOCK=NONE")
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{c}_txt = {_to_text(c)}" for c in columns))
+
+        clauses = _drop_indexes(table)
+        clauses += [f"CHANGE COLUMN {c} {c}_bin BINARY(16) NULL" for c in columns]
+        clauses += [f"CHANGE COLUMN {c}_txt {c} VARCHAR(36) NOT NULL" for c in columns]
+        clauses += _add_indexes(table)
+        op.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+        _sync_triggers(table, columns)
+
+    op.execute(
+        "ALTER TABLE payment_attempts ADD CONSTRAINT payment_attempts_ibfk_1 "
+        "FOREIGN KEY (invoice_id) REFERENCES invoices (id) ON DELETE CASCADE"
+    )
+    op.execute("SET foreign_key_checks = 1")
@@ -0,0 +1,96 @@
+"""binary uuid keys, expand: shadow columns, sync triggers, backfill
+
+Revision ID: 34ab588c7dcd
+Revises: 8da2b08eaa33
+Create Date: 2026-10-18 13:05:12.418305
+
+Step one of two, safe to run while the previous application version is
+serving traffic:
+
+- adds a nullable BINARY(16) shadow column next to every uuid column
+  (instant/in-place, no table copy)
+- installs BEFORE INSERT/UPDATE triggers that keep the shadows in sync
+  with whatever the running application writes
+- backfills existing rows in primary-key ranges of BACKFILL_BATCH rows,
+  each committed on its own so row locks are held only briefly
+
+Creating triggers needs the TRIGGER privilege (and SUPER, or
+log_bin_trust_function_creators=1, when binary logging is on).
+
+The swap itself happens in 278a7964454a.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '34ab588c7dcd'
+down_revision: Union[str, None] = '8da2b08eaa33'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UUID_COLUMNS = {
+    'invoices': ('id',),
+    'payment_attempts': ('id', 'invoice_id'),
+    'outbox_events': ('id', 'aggregate_id'),
+    'outbox_events_archive': ('id', 'aggregate_id'),
+}
+
+BACKFILL_BATCH = 5000
+
+
+def _to_binary(expr: str) -> str:
+    return f"UNHEX(REPLACE({expr}, '-', ''))"
+
+
+def _create_triggers(table: str, columns: tuple[str, ...]) -> None:
+    assignments = ", ".join(f"NEW.{c}_bin = {_to_binary(f'NEW.{c}')}" for c in columns)
+    for when, suffix in (("INSERT", "ins"), ("UPDATE", "upd")):
+        op.execute(
+            f"CREATE TRIGGER {table}_uuid_bin_{suffix} BEFORE {when} ON {table} "
+            f"FOR EACH ROW SET {assignments}"
+        )
+
+
+def _drop_triggers(table: str) -> None:
+    for suffix in ("ins", "upd"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_uuid_bin_{suffix}")
+
+
+def _backfill(conn, table: str, columns: tuple[str, ...]) -> None:
+    assignments = ", ".join(f"{c}_bin = {_to_binary(c)}" for c in columns)
+    last = ""
+    while True:
+        upper = conn.execute(
+            sa.text(f"SELECT id FROM {table} WHERE id > :last ORDER BY id LIMIT 1 OFFSET {BACKFILL_BATCH - 1}"),
+            {"last": last},
+        ).scalar()
+        if upper is None:
+            conn.execute(sa.text(f"UPDATE {table} SET {assignments} WHERE id > :last"), {"last": last})
+            return
+        conn.execute(
+            sa.text(f"UPDATE {table} SET {assignments} WHERE id > :last AND id <= :upper"),
+            {"last": last, "upper": upper},
+        )
+        last = upper
+
+
+def upgrade() -> None:
+    for table, columns in UUID_COLUMNS.items():
+        adds = ", ".join(f"ADD COLUMN {c}_bin BINARY(16) NULL" for c in columns)
+        op.execute(f"ALTER TABLE {table} {adds}, ALGORITHM=INPLACE, LOCK=NONE")
+        # Triggers go in before the backfill so rows written meanwhile are covered.
+        _create_triggers(table, columns)
+
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        for table, columns in UUID_COLUMNS.items():
+            _backfill(conn, table, columns)
+
+
+def downgrade() -> None:
+    for table, columns in UUID_COLUMNS.items():
+        _drop_triggers(table)
+        drops = ", ".join(f"DROP COLUMN {c}_bin" for c in columns)
+        op.execute(f"ALTER TABLE {table} {drops}, ALGORITHM=INPLACE, LOCK=NONE")
@@ -0,0 +1,28 @@
+"""outbox pending index
+
+Revision ID: 3dec8be6dcad
+Revises: 4afed6a0a16a
+Create Date: 2026-10-18 09:12:41.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3dec8be6dcad'
+down_revision: Union[str, None] = '4afed6a0a16a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_outbox_pending', 'outbox_events', ['published_at', 'created_at'], unique=False)
+    op.drop_index('ix_outbox_published_at', table_name='outbox_events')
+
+
+def downgrade() -> None:
+    op.create_index('ix_outbox_published_at', 'outbox_events', ['published_at'], unique=False)
+    op.drop_index('ix_outbox_pending', table_name='outbox_events')
@@ -0,0 +1,37 @@
+"""add payment_retry_schedule
+
+Revision ID: 5b1f0c9e7a32
+Revises: d7eaced62459
+Create Date: 2026-10-18 19:02:41.118203
+
+Only attempts failing after the deploy get a retry scheduled; invoices that
+failed earlier stay as they are until paid by hand.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c9e7a32'
+down_revision: Union[str, None] = 'd7eaced62459'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('payment_retry_schedule',
+    sa.Column('invoice_id', sa.BINARY(length=16), nullable=False),
+    sa.Column('retry_no', sa.SmallInteger(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('error_code', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], name='fk_retry_schedule_invoice', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('invoice_id')
+    )
+    op.create_index('ix_retry_schedule_due', 'payment_retry_schedule', ['due_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_retry_schedule_due', table_name='payment_retry_schedule')
+    op.drop_table('payment_retry_schedule')
@@ -0,0 +1,26 @@
+"""index processed_provider_events.processed_at
+
+Revision ID: 6c3e8d1a9f20
+Revises: 5b1f0c9e7a32
+Create Date: 2026-10-18 20:11:07.482913
+
+Lets the retention worker prune the dedupe ledger oldest first without a
+full scan.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '6c3e8d1a9f20'
+down_revision: Union[str, None] = '5b1f0c9e7a32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_processed_events_processed_at', 'processed_provider_events', ['processed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_processed_events_processed_at', table_name='processed_provider_events')
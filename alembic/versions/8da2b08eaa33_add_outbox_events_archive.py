@@ -0,0 +1,40 @@
+"""add outbox_events_archive
+
+Revision ID: 8da2b08eaa33
+Revises: 01af5536c4f1
+Create Date: 2026-10-18 12:40:51.662031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision: str = '8da2b08eaa33'
+down_revision: Union[str, None] = '01af5536c4f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_events_archive',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('aggregate_type', sa.String(length=64), nullable=False),
+    sa.Column('aggregate_id', sa.String(length=36), nullable=False),
+    sa.Column('payload', mysql.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('published_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_archive_aggregate', 'outbox_events_archive', ['aggregate_type', 'aggregate_id'], unique=False)
+    op.create_index('ix_outbox_archive_published_at', 'outbox_events_archive', ['published_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_archive_published_at', table_name='outbox_events_archive')
+    op.drop_index('ix_outbox_archive_aggregate', table_name='outbox_events_archive')
+    op.drop_table('outbox_events_archive')
@@ -0,0 +1,35 @@
+"""add outbox_events.seq for the change feed
+
+Revision ID: 9358a543987f
+Revises: c4a51855fd34
+Create Date: 2026-10-18 15:40:19.205733
+
+Adding an AUTO_INCREMENT column copies the table; existing rows are
+numbered in primary key (creation) order. Retention keeps outbox_events
+small, so this is quick, but run it off-peak.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9358a543987f'
+down_revision: Union[str, None] = 'c4a51855fd34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Alembic cannot express AUTO_INCREMENT on a non-primary-key column
+    op.execute(
+        "ALTER TABLE outbox_events "
+        "ADD COLUMN seq BIGINT NOT NULL AUTO_INCREMENT, "
+        "ADD UNIQUE INDEX uq_outbox_seq (seq)"
+    )
+    op.add_column('outbox_events_archive', sa.Column('seq', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('outbox_events_archive', 'seq')
+    op.execute("ALTER TABLE outbox_events DROP INDEX uq_outbox_seq, DROP COLUMN seq")
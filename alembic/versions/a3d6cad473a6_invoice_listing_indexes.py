@@ -0,0 +1,30 @@
+"""invoice listing indexes
+
+Revision ID: a3d6cad473a6
+Revises: 3dec8be6dcad
+Create Date: 2026-10-18 10:02:17.904412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d6cad473a6'
+down_revision: Union[str, None] = '3dec8be6dcad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_invoice_created', 'invoices', ['created_at', 'id'], unique=False)
+    op.create_index('ix_invoice_status_created', 'invoices', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_invoice_customer_created', 'invoices', ['customer_ref', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_invoice_customer_created', table_name='invoices')
+    op.drop_index('ix_invoice_status_created', table_name='invoices')
+    op.drop_index('ix_invoice_created', table_name='invoices')
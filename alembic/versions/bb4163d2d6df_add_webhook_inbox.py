@@ -0,0 +1,38 @@
+"""add webhook_inbox
+
+Revision ID: bb4163d2d6df
+Revises: 278a7964454a
+Create Date: 2026-10-18 13:41:26.530817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision: str = 'bb4163d2d6df'
+down_revision: Union[str, None] = '278a7964454a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_inbox',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('provider_payment_id', sa.String(length=64), nullable=False),
+    sa.Column('payload', mysql.JSON(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=True),
+    sa.Column('error', sa.String(length=64), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_inbox_pending', 'webhook_inbox', ['processed_at', 'shard', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_inbox_pending', table_name='webhook_inbox')
+    op.drop_table('webhook_inbox')
@@ -0,0 +1,35 @@
+"""add import_runs
+
+Revision ID: c4a51855fd34
+Revises: dc04844c1dde
+Create Date: 2026-10-18 15:02:44.390521
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a51855fd34'
+down_revision: Union[str, None] = 'dc04844c1dde'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('import_runs',
+    sa.Column('id', sa.String(length=64), nullable=False),
+    sa.Column('source', sa.String(length=512), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('invoices_created', sa.Integer(), nullable=False),
+    sa.Column('row_errors', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('import_runs')
@@ -0,0 +1,38 @@
+"""add customer_balances
+
+Revision ID: d7eaced62459
+Revises: 9358a543987f
+Create Date: 2026-10-18 16:21:08.547312
+
+The table starts empty: populate it with
+`python -m app.cli.rebuild_customer_balances` once the application version
+that maintains it is deployed (rows written before that are picked up by
+the rebuild, rows written after are maintained incrementally).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7eaced62459'
+down_revision: Union[str, None] = '9358a543987f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('customer_balances',
+    sa.Column('customer_ref', sa.String(length=64), nullable=False),
+    sa.Column('currency', sa.String(length=8), nullable=False),
+    sa.Column('open_count', sa.Integer(), nullable=False),
+    sa.Column('open_amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('paid_count', sa.Integer(), nullable=False),
+    sa.Column('paid_amount_cents', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('customer_ref', 'currency')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('customer_balances')
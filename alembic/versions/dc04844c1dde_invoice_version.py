@@ -0,0 +1,25 @@
+"""add invoices.version
+
+Revision ID: dc04844c1dde
+Revises: e5da68bc7d94
+Create Date: 2026-10-18 14:31:08.664270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'dc04844c1dde'
+down_revision: Union[str, None] = 'e5da68bc7d94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('invoices', 'version')
@@ -0,0 +1,30 @@
+"""add processed_provider_events
+
+Revision ID: e5da68bc7d94
+Revises: bb4163d2d6df
+Create Date: 2026-10-18 14:02:53.117094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5da68bc7d94'
+down_revision: Union[str, None] = 'bb4163d2d6df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('processed_provider_events',
+    sa.Column('provider_payment_id', sa.String(length=64), nullable=False),
+    sa.Column('provider_event_id', sa.String(length=64), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('provider_payment_id', 'provider_event_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('processed_provider_events')
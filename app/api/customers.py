@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.infra.db import get_read_db
+from app.infra.models import CustomerBalance
+from app.schemas.customer import CustomerSummaryOut
+
+router = APIRouter(prefix="/customers", tags=["customers"])
+
+
+@router.get("/{customer_ref}/summary", response_model=CustomerSummaryOut)
+def customer_summary(customer_ref: str, db: Session = Depends(get_read_db)):
+    # A primary key range read of customer_balances (one row per currency),
+    # however many invoices the customer has.
+    rows = db.execute(
+        select(CustomerBalance)
+        .where(CustomerBalance.customer_ref == customer_ref)
+        .order_by(CustomerBalance.currency)
+    ).scalars().all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="customer_not_found")
+
+    return {
+        "customer_ref": customer_ref,
+        "balances": [
+            {
+                "currency": b.currency,
+                "invoice_count": b.open_count + b.paid_count,
+                "open_count": b.open_count,
+                "open_amount_cents": b.open_amount_cents,
+                "paid_count": b.paid_count,
+                "paid_amount_cents": b.paid_amount_cents,
+            }
+            for b in rows
+        ],
+    }
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core.config import (
+    OUTBOX_FEED_MAX_WAIT_SECONDS,
+    OUTBOX_FEED_POLL_INTERVAL_SECONDS,
+    OUTBOX_FEED_SSE_HEARTBEAT_SECONDS,
+)
+from app.infra.db import SessionLocal
+from app.infra.serialization import dumps
+from app.schemas.event import EventFeedOut
+from app.services.outbox import outbox_notifier
+from app.services.outbox_feed import read_feed
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+def _read(after: int, limit: int) -> list[dict]:
+    # Sessions are opened per read rather than per request: a waiting
+    # long-poll or an open stream must not hold a pooled connection.
+    with SessionLocal() as db:
+        return read_feed(db, after, limit)
+
+
+@router.get("", response_model=EventFeedOut)
+async def events(after: int = 0, limit: int = 100, wait: float = 0):
+    """Events after the `after` cursor. With `wait`, blocks up to that many
+    seconds until at least one event is available (long-poll)."""
+    limit = max(1, min(limit, 1000))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max(0.0, min(wait, OUTBOX_FEED_MAX_WAIT_SECONDS))
+    while True:
+        with outbox_notifier.listen() as waiter:
+            batch = await run_in_threadpool(_read, after, limit)
+            remaining = deadline - loop.time()
+            if batch or remaining <= 0:
+                break
+            await waiter.wait(min(remaining, OUTBOX_FEED_POLL_INTERVAL_SECONDS))
+    return {"events": batch, "cursor": batch[-1]["seq"] if batch else after}
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['event_type']}\ndata: {dumps(event)}\n\n"
+
+
+@router.get("/stream")
+async def event_stream(
+    request: Request,
+    after: Optional[int] = None,
+    last_event_id: Optional[str] = Header(default=None),
+):
+    """Server-Sent Events over the same feed. Reconnecting clients resume
+    from their Last-Event-ID (the last seq they received)."""
+    if after is None:
+        try:
+            after = int(last_event_id or 0)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+
+    async def stream():
+        cursor = after
+        loop = asyncio.get_running_loop()
+        last_sent = loop.time()
+        while not await request.is_disconnected():
+            with outbox_notifier.listen() as waiter:
+                batch = await run_in_threadpool(_read, cursor, 500)
+                if not batch:
+                    await waiter.wait(OUTBOX_FEED_POLL_INTERVAL_SECONDS)
+            if batch:
+                cursor = batch[-1]["seq"]
+                yield "".join(_sse(e) for e in batch)
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= OUTBOX_FEED_SSE_HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = loop.time()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Table, select
+
+from app.core.config import EXPORT_YIELD_PER
+from app.infra.db import read_engine
+from app.infra.serialization import dumps
+from app.infra.models import Invoice, PaymentAttempt, OutboxEvent
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"unserializable value: {type(value).__name__}")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _stream_table(
+    table: Table,
+    fmt: ExportFormat,
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+) -> Iterator[str]:
+    query = select(table).order_by(*table.primary_key.columns)
+    if created_from:
+        query = query.where(table.c.created_at >= created_from)
+    if created_to:
+        query = query.where(table.c.created_at < created_to)
+
+    # The connection is owned by the generator, not by a request dependency:
+    # it has to outlive the endpoint function and stay open while the body is
+    # streamed. stream_results makes the driver use a server-side cursor, so
+    # only `EXPORT_YIELD_PER` rows are held in memory at a time. Exports read
+    # from the replica when one is configured and caught up.
+    with read_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER).execute(query)
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(columns)
+            for rows in result.partitions():
+                writer.writerows([_csv_value(v) for v in row] for row in rows)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+                )
+
+
+def _export(table: Table, fmt: ExportFormat, created_from, created_to) -> StreamingResponse:
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_table(table, fmt, created_from, created_to),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table.name}.{fmt}"'},
+    )
+
+
+@router.get("/invoices")
+def export_invoices(
+    format: ExportFormat = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    return _export(Invoice.__table__, format, created_from, created_to)
+
+
+@router.get("/payment_attempts")
+def export_payment_attempts(
+    format: ExportFormat = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    return _export(PaymentAttempt.__table__, format, created_from, created_to)
+
+
+@router.get("/outbox_events")
+def export_outbox_events(
+    format: ExportFormat = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    return _export(OutboxEvent.__table__, format, created_from, created_to)
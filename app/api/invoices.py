@@ -1,33 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Any, Literal, Optional
+
+from email.utils import format_datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
-from app.infra.db import get_db
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.config import FAST_JSON, INVOICE_BATCH_MAX_ITEMS
+from app.infra.db import get_db, get_read_db
 from app.infra.models import Invoice, PaymentAttempt, OutboxEvent
-from app.schemas.invoice import InvoiceCreate, InvoiceOut, InvoiceDetailOut, PaymentAttemptOut, OutboxEventSummary
+from app.infra.serialization import JSONResponse, dumps_bytes
+from app.infra.types import new_id
+from app.schemas.invoice import (
+    InvoiceBatchResult,
+    InvoiceCreate,
+    InvoiceOut,
+    InvoiceDetailOut,
+)
+from app.services.customer_balances import BalanceDeltas, apply_balances
+from app.services.invoices import create_invoices, invoice_detail_cache, invoice_validator
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
 
 @router.post("", response_model=InvoiceOut)
 def create_invoice(payload: InvoiceCreate, db: Session = Depends(get_db)):
+    # Id and status are set here, so the response needs no refresh round trip
     inv = Invoice(
+        id=new_id(),
+        status="open",
         amount_cents=payload.amount_cents,
         currency=payload.currency,
         customer_ref=payload.customer_ref,
     )
     db.add(inv)
-    db.commit()
-    db.refresh(inv)
-    return InvoiceOut(
+    balances = BalanceDeltas()
+    balances.invoice_created(inv.customer_ref, inv.currency, inv.amount_cents)
+    apply_balances(db, balances)
+    response = InvoiceOut(
         invoice_id=inv.id,
         status=inv.status,
         amount_cents=inv.amount_cents,
         currency=inv.currency,
         customer_ref=inv.customer_ref,
     )
+    db.commit()
+    return response
+
+
+@router.post("/batch", response_model=list[InvoiceBatchResult])
+def create_invoice_batch(payload: list[dict[str, Any]], db: Session = Depends(get_db)):
+    if len(payload) > INVOICE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail="invoice_batch_too_large")
+
+    # Items are validated one by one so a bad row is reported instead of
+    # rejecting the whole request; valid rows are inserted together.
+    results = create_invoices(db, enumerate(payload))
+    db.commit()
+    return results
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip() == "*" or tag.strip().removeprefix("W/") == opaque
+        for tag in if_none_match.split(",")
+    )
 
 
 @router.get("/{invoice_id}", response_model=InvoiceDetailOut)
-def get_invoice(invoice_id: str, db: Session = Depends(get_db)):
+def get_invoice(
+    invoice_id: str,
+    db: Session = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    # Pollers revalidate with If-None-Match: one small query answers 304,
+    # and a changed invoice whose detail another request already rendered
+    # is served from the cache without the attempt/outbox queries.
+    validator = invoice_validator(db, invoice_id)
+    if validator is None:
+        raise HTTPException(status_code=404, detail="invoice_not_found")
+    etag, updated_at = validator
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = invoice_detail_cache.get(invoice_id)
+    if cached is not None and cached[0] == etag:
+        return Response(content=cached[1], media_type="application/json", headers=headers)
+    generation = invoice_detail_cache.generation
+
+    detail = _invoice_detail(db, invoice_id)
+    if FAST_JSON:
+        # Rows read from our own tables need no model validation
+        body = dumps_bytes(detail)
+    else:
+        body = InvoiceDetailOut.model_validate(detail).model_dump_json().encode()
+    invoice_detail_cache.set(invoice_id, (etag, body), generation)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _invoice_detail(db: Session, invoice_id: str) -> dict:
+    # Plain dicts shaped like InvoiceDetailOut; datetimes are left to the encoder
     inv = db.get(Invoice, invoice_id)
     if not inv:
         raise HTTPException(status_code=404, detail="invoice_not_found")
@@ -51,54 +131,93 @@ def get_invoice(invoice_id: str, db: Session = Depends(get_db)):
         .all()
     )
 
-    return InvoiceDetailOut(
-        invoice_id=inv.id,
-        status=inv.status,
-        amount_cents=inv.amount_cents,
-        currency=inv.currency,
-        customer_ref=inv.customer_ref,
-        attempts=[
-            PaymentAttemptOut(
-                attempt_id=a.id,
-                status=a.status,
-                idempotency_key=a.idempotency_key,
-                provider_payment_id=a.provider_payment_id,
-                error_code=a.error_code,
-                error_message=a.error_message,
-                created_at=a.created_at.isoformat(),
-            )
+    return {
+        **_invoice_out(inv),
+        "attempts": [
+            {
+                "attempt_id": a.id,
+                "status": a.status,
+                "idempotency_key": a.idempotency_key,
+                "provider_payment_id": a.provider_payment_id,
+                "error_code": a.error_code,
+                "error_message": a.error_message,
+                "created_at": a.created_at,
+            }
             for a in attempts
         ],
-        outbox_events=[
-            OutboxEventSummary(
-                id=e.id,
-                event_type=e.event_type,
-                aggregate_type=e.aggregate_type,
-                aggregate_id=e.aggregate_id,
-                created_at=e.created_at.isoformat(),
-                published_at=e.published_at.isoformat()
-                if e.published_at else None,
-            )
+        "outbox_events": [
+            {
+                "id": e.id,
+                "event_type": e.event_type,
+                "aggregate_type": e.aggregate_type,
+                "aggregate_id": e.aggregate_id,
+                "created_at": e.created_at,
+                "published_at": e.published_at,
+            }
             for e in outbox
         ],
-    )
+    }
+
+
+def _invoice_out(i: Invoice) -> dict:
+    return {
+        "invoice_id": i.id,
+        "status": i.status,
+        "amount_cents": i.amount_cents,
+        "currency": i.currency,
+        "customer_ref": i.customer_ref,
+    }
 
 
 @router.get("", response_model=list[InvoiceOut])
-def list_invoices(limit: int = 20, db: Session = Depends(get_db)):
-    rows = (
-        db.query(Invoice)
-        .order_by(Invoice.created_at.desc())
-        .limit(min(limit, 100))
-        .all()
-    )
-    return [
-        InvoiceOut(
-            invoice_id=i.id,
-            status=i.status,
-            amount_cents=i.amount_cents,
-            currency=i.currency,
-            customer_ref=i.customer_ref,
+def list_invoices(
+    response: Response,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    status: Optional[Literal["open", "paid", "void"]] = None,
+    customer_ref: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+):
+    # Keyset pagination on (created_at, id): every page is an index range scan
+    # starting right after the previous page's last row, so page N costs the
+    # same as page 1. The next page's cursor is returned in X-Next-Cursor.
+    limit = max(1, min(limit, 100))
+    query = select(Invoice)
+    if status:
+        query = query.where(Invoice.status == status)
+    if customer_ref:
+        query = query.where(Invoice.customer_ref == customer_ref)
+    if created_from:
+        query = query.where(Invoice.created_at >= created_from)
+    if created_to:
+        query = query.where(Invoice.created_at < created_to)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+        query = query.where(
+            or_(
+                Invoice.created_at < created_at,
+                and_(Invoice.created_at == created_at, Invoice.id < last_id),
+            )
         )
-        for i in rows
-    ]
+
+    rows = db.execute(
+        query.order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(limit + 1)
+    ).scalars().all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at.isoformat(), last.id)
+
+    items = [_invoice_out(i) for i in rows]
+    if FAST_JSON:
+        # Skips response_model validation; the headers set above have to
+        # be passed on explicitly once a Response is returned.
+        return JSONResponse(items, headers=dict(response.headers))
+    return items
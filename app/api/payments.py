@@ -1,51 +1,91 @@
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
+from app.core.config import WEBHOOK_BATCH_MAX_ITEMS, WEBHOOK_INGEST_MODE
 from app.infra.db import get_db
-from app.schemas.payment import PayInvoiceRequest, PayInvoiceResponse, ProviderWebhookRequest
-from app.services.payments import pay_invoice, handle_provider_webhook
+from app.schemas.payment import PayInvoiceRequest, PayInvoiceResponse, ProviderWebhookRequest, ProviderWebhookResult
+from app.services.payments import (
+    cached_pay_response,
+    handle_provider_webhook,
+    handle_provider_webhook_batch,
+    pay_invoice,
+    pay_replay_cache,
+)
 from app.services.outbox import publish_pending
+from app.services.transactions import run_in_transaction
+from app.services.webhook_inbox import append_webhook
 
 router = APIRouter(tags=["payments"])
 
 
 @router.post("/invoices/{invoice_id}/pay", response_model=PayInvoiceResponse, status_code=202)
 def pay(invoice_id: str, payload: PayInvoiceRequest, db: Session = Depends(get_db), idempotency_key: str = Header(default="")):
-    # Use-case + transaction boundary in the endpoint
-    attempt = pay_invoice(
-        db,
-        invoice_id=invoice_id,
-        idempotency_key=idempotency_key
-    )
+    # Exact replays (same invoice + Idempotency-Key) are served from the
+    # in-process cache, checked against the attempt row, without taking the
+    # invoice row lock.
+    replay_key = (invoice_id, idempotency_key)
+    cached = cached_pay_response(db, replay_key)
+    if cached is not None:
+        return cached
+    generation = pay_replay_cache.generation
 
-    # Ensure attempt.id exists for event payloads that may rely on it
-    # db.flush()
+    # Use-case + transaction boundary in the endpoint; replayed on deadlocks
+    # and lock wait timeouts.
+    def unit_of_work(db: Session) -> PayInvoiceResponse:
+        attempt = pay_invoice(
+            db,
+            invoice_id=invoice_id,
+            idempotency_key=idempotency_key
+        )
+        # Build the response before committing: commit expires the attempt,
+        # and reloading it would cost another round trip.
+        return PayInvoiceResponse(
+            attempt_id=attempt.id,
+            status=attempt.status,
+            provider_payment_id=attempt.provider_payment_id,
+        )
 
-    db.commit()
-    db.refresh(attempt)
+    response = run_in_transaction(db, "pay", unit_of_work)
 
-    return PayInvoiceResponse(
-        attempt_id=attempt.id,
-        status=attempt.status,
-        provider_payment_id=attempt.provider_payment_id,
-    )
+    # Skipped if a webhook invalidated an entry while we were reading
+    pay_replay_cache.set(replay_key, response, generation)
+    return response
 
 
 @router.post("/webhooks/payment-provider")
 def webhook(payload: ProviderWebhookRequest, db: Session = Depends(get_db)):
-    attempt = handle_provider_webhook(
-        db,
-        provider_payment_id=payload.provider_payment_id,
-        result=payload.result,
-        provider_event_id=payload.provider_event_id,
-        error_code=payload.error_code,
-        error_message=payload.error_message,
-    )
-    db.commit()
-    return {
-        "status": "ok",
-        "attempt_id": attempt.id,
-        "attempt_status": attempt.status
-    }
+    if WEBHOOK_INGEST_MODE == "inbox":
+        # Durable ack only; app.workers.webhook_inbox applies it later
+        run_in_transaction(db, "webhook_inbox", lambda db: append_webhook(db, payload))
+        return {"status": "accepted"}
+
+    def unit_of_work(db: Session) -> dict:
+        attempt = handle_provider_webhook(
+            db,
+            provider_payment_id=payload.provider_payment_id,
+            result=payload.result,
+            provider_event_id=payload.provider_event_id,
+            error_code=payload.error_code,
+            error_message=payload.error_message,
+        )
+        if attempt is None:
+            return {"status": "ok", "duplicate": True}
+        return {
+            "status": "ok",
+            "attempt_id": attempt.id,
+            "attempt_status": attempt.status
+        }
+
+    return run_in_transaction(db, "webhook", unit_of_work)
+
+
+@router.post("/webhooks/payment-provider/batch", response_model=list[ProviderWebhookResult])
+def webhook_batch(payload: list[ProviderWebhookRequest], db: Session = Depends(get_db)):
+    if len(payload) > WEBHOOK_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail="webhook_batch_too_large")
+
+    # One transaction for the whole batch; per-item failures are reported in
+    # the response instead of aborting the other items.
+    return run_in_transaction(db, "webhook_batch", lambda db: handle_provider_webhook_batch(db, payload))
 
 
 @router.post("/internal/outbox/publish")
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import WEBHOOK_INGEST_MODE
+from app.infra.async_db import get_async_db
+from app.schemas.payment import PayInvoiceRequest, PayInvoiceResponse, ProviderWebhookRequest
+from app.services.payments import pay_replay_cache
+from app.services.payments_async import cached_pay_response_async, pay_invoice_async, handle_provider_webhook_async
+from app.services.transactions import run_in_transaction_async
+from app.services.webhook_inbox import inbox_insert
+
+# Async versions of the hot-path routes in app.api.payments. Mounted ahead of
+# the sync router when DB_ASYNC_MODE is on, so they take precedence for the
+# same paths; everything else keeps using the sync routes.
+router = APIRouter(tags=["payments"])
+
+
+@router.post("/invoices/{invoice_id}/pay", response_model=PayInvoiceResponse, status_code=202)
+async def pay(invoice_id: str, payload: PayInvoiceRequest, db: AsyncSession = Depends(get_async_db), idempotency_key: str = Header(default="")):
+    replay_key = (invoice_id, idempotency_key)
+    cached = await cached_pay_response_async(db, replay_key)
+    if cached is not None:
+        return cached
+    generation = pay_replay_cache.generation
+
+    async def unit_of_work(db: AsyncSession) -> PayInvoiceResponse:
+        attempt = await pay_invoice_async(
+            db,
+            invoice_id=invoice_id,
+            idempotency_key=idempotency_key
+        )
+        return PayInvoiceResponse(
+            attempt_id=attempt.id,
+            status=attempt.status,
+            provider_payment_id=attempt.provider_payment_id,
+        )
+
+    response = await run_in_transaction_async(db, "pay", unit_of_work)
+
+    pay_replay_cache.set(replay_key, response, generation)
+    return response
+
+
+@router.post("/webhooks/payment-provider")
+async def webhook(payload: ProviderWebhookRequest, db: AsyncSession = Depends(get_async_db)):
+    if WEBHOOK_INGEST_MODE == "inbox":
+        await run_in_transaction_async(db, "webhook_inbox", lambda db: db.execute(inbox_insert(payload)))
+        return {"status": "accepted"}
+
+    async def unit_of_work(db: AsyncSession) -> dict:
+        attempt = await handle_provider_webhook_async(
+            db,
+            provider_payment_id=payload.provider_payment_id,
+            result=payload.result,
+            provider_event_id=payload.provider_event_id,
+            error_code=payload.error_code,
+            error_message=payload.error_message,
+        )
+        if attempt is None:
+            return {"status": "ok", "duplicate": True}
+        return {
+            "status": "ok",
+            "attempt_id": attempt.id,
+            "attempt_status": attempt.status
+        }
+
+    return await run_in_transaction_async(db, "webhook", unit_of_work)
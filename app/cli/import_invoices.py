@@ -0,0 +1,165 @@
+"""Bulk invoice importer.
+
+Streams invoices from a CSV file (header: amount_cents,currency,customer_ref)
+or an NDJSON file and inserts them in chunks of --batch-size rows, one
+transaction per chunk. Every chunk also advances the run's checkpoint in
+`import_runs` inside that same transaction, so an interrupted import is
+resumed by running the same command again: rows before the checkpoint are
+skipped and no row is ever inserted twice.
+
+Rows that fail validation, and CSV rows with more fields than the header,
+are skipped and appended to --errors as NDJSON ({"row": n, "error": ...}).
+A chunk's errors are written and fsynced before the chunk commits, so a
+crash can repeat them on resume but never lose them. Rows are numbered
+from 1 and count data rows only (no CSV header, no blank NDJSON lines).
+
+    python -m app.cli.import_invoices invoices.csv --errors import_errors.ndjson
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Iterator, NamedTuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import INVOICE_IMPORT_BATCH_SIZE
+from app.infra.db import SessionLocal
+from app.infra.models import ImportRun
+from app.services.invoices import create_invoices
+
+
+class RowError(NamedTuple):
+    """A row rejected while reading, before validation."""
+
+    error: str
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Any]:
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            for record in csv.DictReader(f):
+                # DictReader collects fields beyond the header under None
+                extra = record.pop(None, None)
+                if extra is not None:
+                    yield RowError(f"row: {len(extra)} more fields than the header")
+                    continue
+                # empty cells fall back to the schema defaults
+                yield {k: v for k, v in record.items() if v not in ("", None)}
+        return
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # handed on as-is, so validation reports it against its row
+                yield line.strip()
+
+
+def default_run_id(path: str) -> str:
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def _import_chunk(db: Session, chunk: list[tuple[int, Any]]) -> list[dict]:
+    results = create_invoices(db, [(row, payload) for row, payload in chunk if not isinstance(payload, RowError)])
+    results += [
+        {"row": row, "status": "error", "error": payload.error}
+        for row, payload in chunk
+        if isinstance(payload, RowError)
+    ]
+    return sorted(results, key=lambda r: r["row"])
+
+
+def _start_run(db: Session, run_id: str, source: str) -> ImportRun:
+    run = db.get(ImportRun, run_id)
+    if run is None:
+        run = ImportRun(id=run_id, source=source[:512], rows_done=0, invoices_created=0, row_errors=0)
+        db.add(run)
+        db.commit()
+    return run
+
+
+def import_file(
+    path: str,
+    fmt: str,
+    batch_size: int = INVOICE_IMPORT_BATCH_SIZE,
+    run_id: str | None = None,
+    errors_path: str | None = None,
+) -> ImportRun:
+    run_id = run_id or default_run_id(path)
+    db = SessionLocal()
+    try:
+        run = _start_run(db, run_id, path)
+        if run.finished_at is not None:
+            return run
+        rows_done = run.rows_done
+
+        rows = islice(enumerate(read_rows(path, fmt), start=1), rows_done, None)
+        errors_out = open(errors_path, "a") if errors_path else None
+        try:
+            while chunk := list(islice(rows, batch_size)):
+                results = _import_chunk(db, chunk)
+                errors = [r for r in results if r["status"] == "error"]
+                advanced = db.execute(
+                    update(ImportRun)
+                    .where(ImportRun.id == run_id, ImportRun.rows_done == rows_done)
+                    .values(
+                        rows_done=chunk[-1][0],
+                        invoices_created=ImportRun.invoices_created + len(results) - len(errors),
+                        row_errors=ImportRun.row_errors + len(errors),
+                        updated_at=datetime.utcnow(),
+                    )
+                ).rowcount
+                if advanced != 1:
+                    db.rollback()
+                    raise RuntimeError(f"import run {run_id} was advanced by another importer")
+                if errors_out and errors:
+                    # durable before the checkpoint moves past these rows
+                    errors_out.writelines(
+                        json.dumps({"row": e["row"], "error": e["error"]}) + "\n" for e in errors
+                    )
+                    errors_out.flush()
+                    os.fsync(errors_out.fileno())
+                db.commit()
+                rows_done = chunk[-1][0]
+        finally:
+            if errors_out:
+                errors_out.close()
+
+        db.execute(update(ImportRun).where(ImportRun.id == run_id).values(finished_at=datetime.utcnow()))
+        db.commit()
+        return db.get(ImportRun, run_id, populate_existing=True)
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=INVOICE_IMPORT_BATCH_SIZE)
+    parser.add_argument("--run-id", help="checkpoint key; default: derived from path, size and mtime")
+    parser.add_argument("--errors", help="append rejected rows to this NDJSON file")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    started = time.perf_counter()
+    run = import_file(args.path, fmt, args.batch_size, args.run_id, args.errors)
+    elapsed = time.perf_counter() - started
+    print(
+        f"run {run.id}: {run.rows_done} rows, {run.invoices_created} invoices created, "
+        f"{run.row_errors} rejected ({elapsed:.1f}s this session)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Rebuilds `customer_balances` from `invoices`.
+
+Walks customers in customer_ref order, --batch-size customers per
+transaction, so it streams through any number of invoices without long
+transactions. Each batch:
+
+1. locks the batch's key range in customer_balances (FOR UPDATE, which
+   includes the gaps), so invoice writers for those customers wait for it
+2. aggregates the customers' invoices through ix_invoice_customer_created
+3. replaces the range's balance rows with the fresh totals
+
+Writers take the balance row lock before they change invoice rows (see
+app.services.customer_balances). After step 1 no writer for the range is
+in flight, and the aggregate sees every committed change. Safe to run
+while the API is serving traffic.
+
+    python -m app.cli.rebuild_customer_balances --batch-size 500
+"""
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import CUSTOMER_BALANCE_REBUILD_BATCH_SIZE
+from app.infra.db import SessionLocal
+from app.infra.models import CustomerBalance, Invoice
+
+
+def _in_range(column, last: str | None, upper: str | None) -> list:
+    conditions = [column.is_not(None) if last is None else column > last]
+    if upper is not None:
+        conditions.append(column <= upper)
+    return conditions
+
+
+def _next_upper(db: Session, last: str | None, batch_size: int) -> str | None:
+    # Upper bound of the next batch, or None if the rest fits in one
+    return db.execute(
+        select(Invoice.customer_ref)
+        .where(*_in_range(Invoice.customer_ref, last, None))
+        .group_by(Invoice.customer_ref)
+        .order_by(Invoice.customer_ref)
+        .offset(batch_size - 1)
+        .limit(1)
+    ).scalar()
+
+
+def rebuild_range(db: Session, last: str | None, upper: str | None) -> int:
+    """Recomputes the balances of customers in (last, upper]; returns rows written."""
+    db.execute(
+        select(CustomerBalance.customer_ref)
+        .where(*_in_range(CustomerBalance.customer_ref, last, upper))
+        .with_for_update()
+    ).all()
+
+    totals: dict[tuple[str, str], dict] = {}
+    for ref, currency, status, count, amount in db.execute(
+        select(Invoice.customer_ref, Invoice.currency, Invoice.status, func.count(), func.sum(Invoice.amount_cents))
+        .where(*_in_range(Invoice.customer_ref, last, upper), Invoice.status.in_(("open", "paid")))
+        .group_by(Invoice.customer_ref, Invoice.currency, Invoice.status)
+    ):
+        row = totals.setdefault((ref, currency), {
+            "customer_ref": ref, "currency": currency,
+            "open_count": 0, "open_amount_cents": 0, "paid_count": 0, "paid_amount_cents": 0,
+        })
+        row[f"{status}_count"] = count
+        row[f"{status}_amount_cents"] = int(amount)
+
+    db.execute(delete(CustomerBalance).where(*_in_range(CustomerBalance.customer_ref, last, upper)))
+    if totals:
+        now = datetime.utcnow()
+        db.execute(insert(CustomerBalance), [{**row, "updated_at": now} for row in totals.values()])
+    db.commit()
+    return len(totals)
+
+
+def rebuild(batch_size: int = CUSTOMER_BALANCE_REBUILD_BATCH_SIZE, pause: float = 0.0) -> int:
+    db = SessionLocal()
+    written = 0
+    last = None
+    try:
+        while True:
+            upper = _next_upper(db, last, batch_size)
+            # End the read so rebuild_range's snapshot is taken after its locks
+            db.rollback()
+            written += rebuild_range(db, last, upper)
+            if upper is None:
+                return written
+            last = upper
+            if pause:
+                time.sleep(pause)
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=CUSTOMER_BALANCE_REBUILD_BATCH_SIZE, help="customers per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = rebuild(args.batch_size, args.pause)
+    print(f"{written} customer balances rebuilt in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
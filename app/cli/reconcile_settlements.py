@@ -0,0 +1,121 @@
+"""Reconciles a provider settlement file against payment_attempts/invoices.
+
+The file is memory-mapped and cut into --chunk-bytes ranges at line
+boundaries. A process pool parses the ranges; at most two per worker are in
+flight, so memory stays bounded by chunk size and worker count, not file
+size. For each parsed chunk, the parent looks up the attempts and invoices
+with IN lists of --lookup-batch-size ids on uq_provider_payment_id; lookups
+use the read replica when one is configured. It reports lines that do not
+match:
+
+- unknown_provider_payment_id: no attempt with that id
+- not_paid_locally: settled as succeeded, invoice not paid
+- attempt_not_succeeded: settled as succeeded, invoice paid by another attempt
+- failed_at_provider: settled as failed, attempt succeeded here
+- amount_mismatch, currency_mismatch: against the invoice
+
+Mismatches go to --out as NDJSON and unparseable lines to --errors.
+With --emit-events, mismatches of known payments also get a
+`settlement_mismatch` outbox event, committed once per chunk. Events are
+emitted again if the same file is reconciled again.
+
+    python -m app.cli.reconcile_settlements settlement-2026-10-18.csv --out mismatches.ndjson
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app.core.config import RECONCILE_CHUNK_BYTES, RECONCILE_LOOKUP_BATCH_SIZE
+from app.infra.db import SessionLocal, read_engine
+from app.services.invoices import invoice_aggregate_ids, touch_invoices
+from app.services.outbox import enqueue_events
+from app.services.reconciliation import chunk_ranges, mismatch_event, parse_chunk, reconcile_rows
+
+
+def reconcile_file(
+    path: str,
+    out_path: str,
+    errors_path: str | None = None,
+    workers: int | None = None,
+    chunk_bytes: int = RECONCILE_CHUNK_BYTES,
+    lookup_batch_size: int = RECONCILE_LOOKUP_BATCH_SIZE,
+    emit_events: bool = False,
+) -> Counter:
+    """Returns counts of lines, parse errors and each mismatch type."""
+    workers = workers or os.cpu_count() or 1
+    counts: Counter = Counter()
+    read_db = Session(bind=read_engine())
+    write_db = SessionLocal() if emit_events else None
+    out = open(out_path, "w")
+    errors_out = open(errors_path, "w") if errors_path else None
+
+    def consume(parsed) -> None:
+        rows, errors = parsed
+        counts["lines"] += len(rows) + len(errors)
+        counts["parse_errors"] += len(errors)
+        if errors_out:
+            errors_out.writelines(json.dumps(e) + "\n" for e in errors)
+
+        events = []
+        for record in reconcile_rows(read_db, rows, lookup_batch_size):
+            counts.update(record["mismatches"])
+            out.write(json.dumps(record) + "\n")
+            if write_db is not None and (event := mismatch_event(record)) is not None:
+                events.append(event)
+        # end the read transaction so every chunk sees current data
+        read_db.rollback()
+
+        if events:
+            enqueue_events(write_db, events)
+            touch_invoices(write_db, invoice_aggregate_ids(events))
+            write_db.commit()
+            counts["events"] += len(events)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for start, end in chunk_ranges(path, chunk_bytes):
+                in_flight.append(pool.submit(parse_chunk, path, start, end))
+                if len(in_flight) >= 2 * workers:
+                    consume(in_flight.popleft().result())
+            while in_flight:
+                consume(in_flight.popleft().result())
+    finally:
+        out.close()
+        if errors_out:
+            errors_out.close()
+        read_db.close()
+        if write_db is not None:
+            write_db.close()
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--out", default="settlement_mismatches.ndjson", help="NDJSON mismatch report")
+    parser.add_argument("--errors", help="write unparseable lines (byte offset, reason) to this NDJSON file")
+    parser.add_argument("--workers", type=int, help="parser processes; default: CPU count")
+    parser.add_argument("--chunk-bytes", type=int, default=RECONCILE_CHUNK_BYTES)
+    parser.add_argument("--lookup-batch-size", type=int, default=RECONCILE_LOOKUP_BATCH_SIZE)
+    parser.add_argument("--emit-events", action="store_true", help="write settlement_mismatch outbox events")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = reconcile_file(
+        args.path, args.out, args.errors, args.workers, args.chunk_bytes, args.lookup_batch_size, args.emit_events
+    )
+    elapsed = time.perf_counter() - started
+    lines = counts.pop("lines", 0)
+    print(f"{lines} lines in {elapsed:.1f}s ({lines / elapsed if elapsed else 0:.0f} lines/s)")
+    for name, n in sorted(counts.items()):
+        print(f"  {name}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import (
+    ASYNC_DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+)
+from app.infra.db import SessionLocal, set_lock_wait_timeout
+from app.infra.instrumentation import instrument_engine, instrumented_pool_class
+from app.infra.serialization import ENGINE_JSON_OPTIONS
+
+# Only imported when DB_ASYNC_MODE is on, so the async driver stays optional.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=instrumented_pool_class("async", is_async=True),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    **ENGINE_JSON_OPTIONS,
+)
+instrument_engine(async_engine.sync_engine, "async")
+set_lock_wait_timeout(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes cannot be lazy-loaded after commit in
+# async code, and the routes read the attempt after committing. The sync
+# session class is SessionLocal's, so its session events (the outbox flush
+# at commit) apply here too.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=SessionLocal.class_,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
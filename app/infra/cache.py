@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.infra.metrics import register_collector
+
+_caches: list["TTLCache"] = []
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Caches are per process. The TTL is what bounds staleness for changes
+    made by other processes, which cannot invalidate this copy.
+
+    `generation` is bumped on every invalidation. A reader that loaded a value
+    from the database passes the generation it saw before the read to `set`,
+    and the value is dropped if an invalidation happened in between.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Any | None:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@register_collector
+def _cache_metrics():
+    yield "# HELP cache_requests_total In-process cache lookups by result."
+    yield "# TYPE cache_requests_total counter"
+    for cache in _caches:
+        yield f'cache_requests_total{{cache="{cache.name}",result="hit"}} {cache.hits}'
+        yield f'cache_requests_total{{cache="{cache.name}",result="miss"}} {cache.misses}'
+    yield "# HELP cache_entries Entries currently held by an in-process cache."
+    yield "# TYPE cache_entries gauge"
+    for cache in _caches:
+        yield f'cache_entries{{cache="{cache.name}"}} {len(cache)}'
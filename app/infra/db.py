@@ -1,18 +1,89 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import logging
+import time
+from typing import Callable
 
-from app.core.config import DATABASE_URL
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+
+from app.core.config import (
+    DATABASE_URL,
+    DB_LOCK_WAIT_TIMEOUT_SECONDS,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    REPLICA_DATABASE_URL,
+    REPLICA_POOL_SIZE,
+)
+from app.infra.instrumentation import instrument_engine, instrumented_pool_class
+from app.infra.serialization import ENGINE_JSON_OPTIONS
+from app.infra.replica import (
+    LAST_WRITE_COOKIE,
+    LAST_WRITE_HEADER,
+    READ_ROUTES,
+    ReplicaLagMonitor,
+    parse_last_write,
+    read_route,
+)
 
 
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=1800,
+    poolclass=instrumented_pool_class("primary"),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    **ENGINE_JSON_OPTIONS,
 )
+instrument_engine(engine, "primary")
+
+
+def set_lock_wait_timeout(engine: Engine, seconds: int = DB_LOCK_WAIT_TIMEOUT_SECONDS) -> None:
+    """Applies innodb_lock_wait_timeout to every new connection of `engine`.
+
+    Lock waits then fail within `seconds` (error 1205) and are replayed by
+    app.services.transactions, instead of tying up a worker for the server
+    default of 50s.
+    """
+    if not seconds or engine.dialect.name != "mysql":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET SESSION innodb_lock_wait_timeout = {int(seconds)}")
+        cursor.close()
+
+
+set_lock_wait_timeout(engine)
+
+logger = logging.getLogger("app.db")
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+replica_engine: Engine | None = None
+ReplicaSessionLocal: sessionmaker | None = None
+replica_monitor: ReplicaLagMonitor | None = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        REPLICA_DATABASE_URL,
+        poolclass=instrumented_pool_class("replica"),
+        pool_size=REPLICA_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        **ENGINE_JSON_OPTIONS,
+    )
+    instrument_engine(replica_engine, "replica")
+    ReplicaSessionLocal = sessionmaker(bind=replica_engine, autoflush=False, autocommit=False)
+    replica_monitor = ReplicaLagMonitor(replica_engine)
+
 
 class Base(DeclarativeBase):
     pass
@@ -24,3 +95,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _read_target(last_write: float | None) -> str:
+    if replica_monitor is None:
+        return "no_replica"
+    return read_route(replica_monitor.lag(), last_write, time.time())
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes: the replica when it is safe to use.
+
+    Falls back to the primary when no replica is configured, when it lags
+    (see app.infra.replica) and for clients that wrote recently, identified
+    by the last-write cookie or header set on their write responses.
+    """
+    last_write = parse_last_write(
+        request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    )
+    reason = _read_target(last_write)
+    if reason == "replica":
+        READ_ROUTES.inc(target="replica", reason="replica")
+        db = ReplicaSessionLocal()
+    else:
+        if reason != "no_replica":
+            READ_ROUTES.inc(target="primary", reason=reason)
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def read_engine() -> Engine:
+    """Engine for long reads outside a request session (exports): the
+    replica unless it is lagging. No read-your-writes check."""
+    if _read_target(None) == "replica":
+        return replica_engine
+    return engine
+
+
+def on_commit(db, fn: Callable[[], None]) -> None:
+    """Runs `fn` after the session's current transaction commits.
+
+    Dropped if the transaction rolls back. Used for in-process side effects
+    (cache invalidation, notifications) that must only happen once the
+    change is durable. Accepts a Session or an AsyncSession.
+    """
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault("on_commit", []).append(fn)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    for fn in session.info.pop("on_commit", ()):
+        try:
+            fn()
+        except Exception:
+            logger.exception("on_commit callback failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_commit(session: Session) -> None:
+    session.info.pop("on_commit", None)
@@ -0,0 +1,188 @@
+"""Database pool and query instrumentation.
+
+- pool checkout wait time and checkout timeouts (pool exhaustion)
+- pool occupancy gauges, read at scrape time
+- per-statement count/latency and a slow-query log
+- per-request query count and DB time, attributed to the route by the
+  middleware in app.main through a context variable
+- opt-in per-request profile (DB_QUERY_PROFILE): statement shapes, the
+  slowest statements and possible N+1 patterns, reported as response
+  headers and a log line
+"""
+import contextvars
+import heapq
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import DB_N_PLUS_ONE_THRESHOLD, DB_PROFILE_SLOWEST, DB_SLOW_QUERY_MS
+from app.infra.metrics import Counter, Histogram, register_collector
+
+logger = logging.getLogger("app.db")
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection.", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts that gave up because the pool was exhausted.", ("engine",))
+QUERIES = Counter("db_queries_total", "SQL statements executed.", ("engine",))
+QUERY_SECONDS = Histogram("db_query_seconds", "SQL statement execution time.", ("engine",))
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS.", ("engine",))
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements issued per HTTP request.", ("route",),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "DB time per HTTP request.", ("route",))
+N_PLUS_ONE = Counter(
+    "db_n_plus_one_total", "Requests repeating one statement shape DB_N_PLUS_ONE_THRESHOLD+ times.", ("route",),
+)
+
+_engines: dict[str, Engine] = {}
+
+
+_PARAM = re.compile(r"%\([^)]*\)s|%s|\?|:\w+")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with parameters and IN-list lengths normalized away."""
+    shape = _PARAM.sub("?", " ".join(statement.split()))
+    return _PARAM_LIST.sub("?", shape)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    profile: bool = False
+    # shape -> [executions, seconds]; only filled when profiling
+    shapes: dict[str, list] = field(default_factory=dict)
+    # min-heap of the DB_PROFILE_SLOWEST slowest (seconds, statement)
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_seconds += elapsed
+        if not self.profile:
+            return
+        entry = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        item = (elapsed, statement)
+        if len(self.slowest) < DB_PROFILE_SLOWEST:
+            heapq.heappush(self.slowest, item)
+        elif elapsed > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def repeated_shapes(self, threshold: int = DB_N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """Shapes executed at least `threshold` times: likely N+1 loops."""
+        return sorted(
+            ((shape, n) for shape, (n, _) in self.shapes.items() if n >= threshold),
+            key=lambda item: -item[1],
+        )
+
+    def headers(self) -> dict[str, str]:
+        headers = {"X-DB-Query-Count": str(self.queries), "X-DB-Time-Ms": f"{self.db_seconds * 1000:.2f}"}
+        repeated = self.repeated_shapes()
+        if repeated:
+            headers["X-DB-N-Plus-One"] = str(len(repeated))
+        return headers
+
+
+_request_stats: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("db_request_stats", default=None)
+
+
+def begin_request(profile: bool = False) -> tuple[RequestStats, contextvars.Token]:
+    # The stats object is shared by reference, so statements executed in
+    # threadpool workers (sync routes) are still attributed to the request.
+    stats = RequestStats(profile=profile)
+    return stats, _request_stats.set(stats)
+
+
+def end_request(token: contextvars.Token, stats: RequestStats, route: str) -> None:
+    _request_stats.reset(token)
+    REQUEST_QUERIES.observe(stats.queries, route=route)
+    REQUEST_DB_SECONDS.observe(stats.db_seconds, route=route)
+    if stats.profile:
+        _log_profile(stats, route)
+
+
+def _log_profile(stats: RequestStats, route: str) -> None:
+    slowest = "; ".join(
+        f"[{elapsed * 1000:.1f} ms] {' '.join(statement.split())[:200]}"
+        for elapsed, statement in sorted(stats.slowest, reverse=True)
+    )
+    logger.info("%s: %d queries, %.1f ms in DB; slowest: %s", route, stats.queries, stats.db_seconds * 1000, slowest)
+    repeated = stats.repeated_shapes()
+    if repeated:
+        N_PLUS_ONE.inc(route=route)
+        for shape, n in repeated:
+            logger.warning("possible N+1 on %s: %dx %s", route, n, shape[:300])
+
+
+class _TimedCheckout:
+    # `_do_get` is where QueuePool blocks when it is exhausted, so timing it
+    # measures exactly the queueing delay for a connection.
+    engine_name = ""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.engine_name)
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, engine=self.engine_name)
+
+
+def instrumented_pool_class(engine_name: str, is_async: bool = False) -> type:
+    # A subclass per engine rather than an attribute on the pool instance:
+    # engine.dispose() recreates the pool from its class.
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(f"Instrumented{base.__name__}", (_TimedCheckout, base), {"engine_name": engine_name})
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    _engines[name] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        QUERIES.inc(engine=name)
+        QUERY_SECONDS.observe(elapsed, engine=name)
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+        if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+            SLOW_QUERIES.inc(engine=name)
+            logger.warning("slow query (%.1f ms) on %s: %s", elapsed * 1000, name, " ".join(statement.split())[:500])
+
+
+@register_collector
+def _pool_gauges():
+    for metric, doc in (
+        ("db_pool_size", "Configured pool size."),
+        ("db_pool_checked_out", "Connections currently checked out."),
+        ("db_pool_overflow", "Connections open beyond pool_size."),
+    ):
+        yield f"# HELP {metric} {doc}"
+        yield f"# TYPE {metric} gauge"
+        for name, engine in _engines.items():
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            value = {"db_pool_size": pool.size, "db_pool_checked_out": pool.checkedout, "db_pool_overflow": pool.overflow}[metric]()
+            yield f'{metric}{{engine="{name}"}} {value}'
@@ -1,10 +1,11 @@
-import uuid
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, Enum, ForeignKey, UniqueConstraint, Index, Text
+from sqlalchemy import FetchedValue, String, Integer, BigInteger, SmallInteger, DateTime, Enum, ForeignKey, UniqueConstraint, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.mysql import JSON
 
+from app.core.config import OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES
 from app.infra.db import Base
+from app.infra.types import BinaryUUID, CompressedJSON, new_id
 
 InvoiceStatus = Enum("open", "paid", "void", name="invoice_status")
 PaymentAttemptStatus = Enum(
@@ -19,9 +20,9 @@ class Invoice(Base):
     __tablename__ = "invoices"
 
     id: Mapped[str] = mapped_column(
-        String(36),
+        BinaryUUID,
         primary_key=True,
-        default=lambda: str(uuid.uuid4())
+        default=new_id
     )
     status: Mapped[str] = mapped_column(
         InvoiceStatus,
@@ -31,6 +32,8 @@ class Invoice(Base):
     amount_cents: Mapped[int] = mapped_column(Integer, nullable=False)
     currency: Mapped[str] = mapped_column(String(8), nullable=False, default="EUR")
     customer_ref: Mapped[str] = mapped_column(String(64), nullable=True)
+    # Bumped by every change to the invoice or its attempts; feeds the ETag
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -49,20 +52,28 @@ class Invoice(Base):
         cascade="all,delete-orphan"
     )
 
+    # Keyset pagination on (created_at, id), optionally narrowed by a filter
+    __table_args__ = (
+        Index("ix_invoice_created", "created_at", "id"),
+        Index("ix_invoice_status_created", "status", "created_at", "id"),
+        Index("ix_invoice_customer_created", "customer_ref", "created_at", "id"),
+    )
+
 
 class PaymentAttempt(Base):
     __tablename__ = "payment_attempts"
 
     id: Mapped[str] = mapped_column(
-        String(36),
+        BinaryUUID,
         primary_key=True,
-        default=lambda: str(uuid.uuid4())
+        default=new_id
     )
     invoice_id: Mapped[str] = mapped_column(
-        String(36),
+        BinaryUUID,
         ForeignKey(
             "invoices.id",
-            ondelete="CASCADE"
+            ondelete="CASCADE",
+            name="fk_attempt_invoice"
         ),
         nullable=False
     )
@@ -105,6 +116,8 @@ class PaymentAttempt(Base):
         UniqueConstraint("provider_payment_id", name="uq_provider_payment_id"),
         Index("ix_attempt_invoice", "invoice_id"),
         Index("ix_attempt_status", "status"),
+        # pay_invoice's combined replay / in-flight lookup
+        Index("ix_attempt_invoice_idem_status", "invoice_id", "idempotency_key", "status"),
     )
 
 
@@ -112,15 +125,15 @@ class OutboxEvent(Base):
     __tablename__ = "outbox_events"
 
     id: Mapped[str] = mapped_column(
-        String(36),
+        BinaryUUID,
         primary_key=True,
-        default=lambda: str(uuid.uuid4())
+        default=new_id
     )
     event_type: Mapped[str] = mapped_column(String(64), nullable=False)
     aggregate_type: Mapped[str] = mapped_column(String(64), nullable=False)
-    aggregate_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    aggregate_id: Mapped[str] = mapped_column(BinaryUUID, nullable=False)
 
-    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    payload: Mapped[dict] = mapped_column(CompressedJSON(OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES), nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -129,8 +142,174 @@ class OutboxEvent(Base):
     )
     published_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
 
+    # Feed position for GET /events. AUTO_INCREMENT on a non-key column is
+    # declared in the migration; the database always assigns it.
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=FetchedValue())
+
     __table_args__ = (
-        Index("ix_outbox_published_at", "published_at"),
+        Index("uq_outbox_seq", "seq", unique=True),
+        # Serves the relay's "published_at IS NULL ORDER BY created_at" claim query
+        Index("ix_outbox_pending", "published_at", "created_at"),
         Index("ix_outbox_aggregate", "aggregate_type", "aggregate_id"),
         Index("ix_outbox_event_type", "event_type"),
     )
+
+
+class OutboxEventArchive(Base):
+    """Published outbox events moved out of the hot table by the retention worker."""
+
+    __tablename__ = "outbox_events_archive"
+
+    id: Mapped[str] = mapped_column(BinaryUUID, primary_key=True)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    aggregate_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    aggregate_id: Mapped[str] = mapped_column(BinaryUUID, nullable=False)
+
+    payload: Mapped[dict] = mapped_column(CompressedJSON(OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    published_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # NULL for events archived before the feed existed
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_archive_aggregate", "aggregate_type", "aggregate_id"),
+        Index("ix_outbox_archive_published_at", "published_at"),
+    )
+
+
+class ProcessedProviderEvent(Base):
+    """Ledger of provider callbacks already applied, for duplicate detection.
+
+    Keyed per payment: providers only guarantee event ids to be unique
+    within one payment.
+    """
+
+    __tablename__ = "processed_provider_events"
+    __table_args__ = (
+        # Serves the retention worker's oldest-first pruning
+        Index("ix_processed_events_processed_at", "processed_at"),
+    )
+
+    provider_payment_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    provider_event_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    processed_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+
+class ImportRun(Base):
+    """Checkpoint of a bulk invoice import, advanced in the same transaction as each chunk."""
+
+    __tablename__ = "import_runs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    source: Mapped[str] = mapped_column(String(512), nullable=False)
+    rows_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    invoices_created: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    row_errors: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
+    )
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+
+class WebhookInboxEntry(Base):
+    """Provider callback accepted in inbox mode, waiting for the inbox worker.
+
+    `shard` is derived from provider_payment_id, so all callbacks for one
+    payment land in the same shard and are applied in `id` (arrival) order.
+    """
+
+    __tablename__ = "webhook_inbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    provider_payment_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+    processed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=True)
+    error: Mapped[str] = mapped_column(String(64), nullable=True)
+
+    __table_args__ = (
+        # Serves the worker's "processed_at IS NULL AND shard IN (...) ORDER BY id" claim
+        Index("ix_webhook_inbox_pending", "processed_at", "shard", "id"),
+    )
+
+
+class CustomerBalance(Base):
+    """Per-customer, per-currency invoice totals, maintained incrementally.
+
+    Written by app.services.customer_balances in the same transaction as
+    the invoice changes it summarizes; rebuilt from `invoices` by
+    app.cli.rebuild_customer_balances. Invoices without a customer_ref are
+    not tracked.
+    """
+
+    __tablename__ = "customer_balances"
+
+    customer_ref: Mapped[str] = mapped_column(String(64), primary_key=True)
+    currency: Mapped[str] = mapped_column(String(8), primary_key=True)
+    open_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    open_amount_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    paid_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    paid_amount_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
+    )
+
+
+class PaymentRetrySchedule(Base):
+    """Next automatic retry (dunning) of an open invoice whose attempt failed.
+
+    Written by app.services.dunning when a webhook fails an attempt, and
+    deleted when app.workers.dunning runs the retry. At most one row per
+    invoice; `retry_no` is the number of the retry the row stands for.
+    The worker only reads ix_retry_schedule_due, never payment_attempts.
+    """
+
+    __tablename__ = "payment_retry_schedule"
+
+    invoice_id: Mapped[str] = mapped_column(
+        BinaryUUID,
+        ForeignKey(
+            "invoices.id",
+            ondelete="CASCADE",
+            name="fk_retry_schedule_invoice"
+        ),
+        primary_key=True
+    )
+    retry_no: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    due_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # error_code of the failed attempt the retry follows
+    error_code: Mapped[str] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+    __table_args__ = (
+        Index("ix_retry_schedule_due", "due_at"),
+    )
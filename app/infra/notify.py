@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class _Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    async def wait(self, timeout: float) -> bool:
+        """True if notified, False on timeout. Re-armed after every wake-up."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.event.clear()
+
+
+class ChangeNotifier:
+    """Wakes asyncio waiters from any thread (e.g. a sync request's commit hook).
+
+    Per process only: changes committed by other processes are not seen,
+    so waiters should still re-check the source after a bounded timeout.
+    Register with `listen()` before reading the source, so a notification
+    that arrives between the read and the wait is not lost.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._waiters: set[_Waiter] = set()
+
+    @contextmanager
+    def listen(self) -> Iterator[_Waiter]:
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            yield waiter
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def notify(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for waiter in waiters:
+            try:
+                waiter.loop.call_soon_threadsafe(waiter.event.set)
+            except RuntimeError:
+                # loop already closed; its waiter is about to be discarded
+                pass
@@ -0,0 +1,50 @@
+"""Client side of the payment provider.
+
+Charges are not requested from inside `pay_invoice`: that would hold the
+invoice row lock for a network round trip. pay_invoice generates the
+provider_payment_id and records a `payment_attempt_created` outbox event.
+The outbox relay, with the `provider` publisher, turns those events into
+charge requests after the commit. The provider reports the outcome
+asynchronously through POST /webhooks/payment-provider. Charge requests
+can be delivered more than once (the relay is at-least-once), so providers
+deduplicate them by provider_payment_id.
+"""
+from typing import Protocol, Sequence
+
+import httpx
+
+from app.core.config import PAYMENT_PROVIDER_TIMEOUT_SECONDS, PAYMENT_PROVIDER_URL
+from app.infra.serialization import dumps_bytes
+
+
+class ProviderClient(Protocol):
+    def charge(self, charges: Sequence[dict]) -> None:
+        """Submits charge requests; raises if the provider did not accept them all."""
+        ...
+
+
+class HttpProviderClient:
+    """Posts batches of charge requests as JSON to `{base_url}/charges`."""
+
+    def __init__(self, base_url: str = PAYMENT_PROVIDER_URL, timeout: float = PAYMENT_PROVIDER_TIMEOUT_SECONDS) -> None:
+        self._client = httpx.Client(base_url=base_url, timeout=timeout)
+
+    def charge(self, charges: Sequence[dict]) -> None:
+        if not charges:
+            return
+        r = self._client.post("/charges", content=dumps_bytes(list(charges)), headers={"Content-Type": "application/json"})
+        r.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def charge_request(event: dict) -> dict:
+    """Charge request for a published `payment_attempt_created` event."""
+    payload = event["payload"]
+    return {
+        "provider_payment_id": payload["provider_payment_id"],
+        "amount_cents": payload["amount_cents"],
+        "currency": payload["currency"],
+        "reference": payload["attempt_id"],
+    }
@@ -0,0 +1,79 @@
+import os
+import threading
+from typing import Protocol, Sequence
+
+from app.core.config import OUTBOX_PUBLISHER, OUTBOX_PUBLISHER_FILE
+from app.infra.provider import HttpProviderClient, ProviderClient, charge_request
+from app.infra.serialization import dumps_bytes
+
+
+class Publisher(Protocol):
+    """Broker-facing side of the outbox relay.
+
+    `publish` receives one claimed batch and must either deliver all of it or
+    raise; on error the relay rolls back and the batch is retried later
+    (at-least-once delivery).
+    """
+
+    def publish(self, events: Sequence[dict]) -> None:
+        ...
+
+
+class InMemoryPublisher:
+    """Stand-in broker that keeps published messages in a list (tests / load tests)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.published: list[dict] = []
+
+    def publish(self, events: Sequence[dict]) -> None:
+        with self._lock:
+            self.published.extend(events)
+
+
+class FilePublisher:
+    """Stand-in broker that appends messages to an NDJSON file.
+
+    Each batch is written with a single O_APPEND write, so several relay
+    processes can share one file without interleaving lines.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def publish(self, events: Sequence[dict]) -> None:
+        if not events:
+            return
+        data = b"".join(dumps_bytes(e, default=str) + b"\n" for e in events)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+class ProviderPublisher:
+    """Sends a charge request to the payment provider per `payment_attempt_created` event.
+
+    The batch's charges go out in one call. Other events are passed to
+    `inner` if one is given, and dropped otherwise.
+    """
+
+    def __init__(self, client: ProviderClient, inner: Publisher | None = None) -> None:
+        self.client = client
+        self.inner = inner
+
+    def publish(self, events: Sequence[dict]) -> None:
+        self.client.charge([charge_request(e) for e in events if e["event_type"] == "payment_attempt_created"])
+        if self.inner is not None:
+            self.inner.publish(events)
+
+
+def build_publisher(name: str = OUTBOX_PUBLISHER, path: str = OUTBOX_PUBLISHER_FILE) -> Publisher:
+    if name == "memory":
+        return InMemoryPublisher()
+    if name == "file":
+        return FilePublisher(path)
+    if name == "provider":
+        return ProviderPublisher(HttpProviderClient())
+    raise ValueError(f"unknown outbox publisher: {name}")
@@ -0,0 +1,79 @@
+"""Replica lag tracking and read routing decisions.
+
+Lag is read from `SHOW REPLICA STATUS` on the replica itself (needs the
+REPLICA MONITOR / REPLICATION CLIENT privilege). It is sampled at most once
+per REPLICA_LAG_CHECK_INTERVAL_SECONDS by whichever request asks first;
+other requests use the last sample instead of waiting for the check.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import READ_YOUR_WRITES_SECONDS, REPLICA_LAG_CHECK_INTERVAL_SECONDS, REPLICA_MAX_LAG_SECONDS
+from app.infra.metrics import Counter, Gauge
+
+logger = logging.getLogger("app.db")
+
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last sampled replica lag; -1 if replication is not running.")
+READ_ROUTES = Counter("db_read_routing_total", "Read-only requests by the engine serving them.", ("target", "reason"))
+
+# Cookie/header carrying the time of the client's last write (unix seconds)
+LAST_WRITE_COOKIE = "last_write_at"
+LAST_WRITE_HEADER = "X-Last-Write-At"
+
+
+class ReplicaLagMonitor:
+    def __init__(self, engine: Engine, interval: float = REPLICA_LAG_CHECK_INTERVAL_SECONDS) -> None:
+        self.engine = engine
+        self.interval = interval
+        self._lag: float | None = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def lag(self) -> float | None:
+        """Seconds the replica is behind, or None if unknown/not replicating."""
+        if time.monotonic() - self._checked_at >= self.interval and self._lock.acquire(blocking=False):
+            try:
+                self._lag = self._sample()
+                self._checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self._lag
+
+    def _sample(self) -> float | None:
+        try:
+            with self.engine.connect() as conn:
+                status = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        except Exception:
+            logger.warning("replica lag check failed", exc_info=True)
+            REPLICA_LAG.set(-1)
+            return None
+        lag = status.get("Seconds_Behind_Master") if status else None
+        REPLICA_LAG.set(-1 if lag is None else lag)
+        return None if lag is None else float(lag)
+
+
+def parse_last_write(value: str | None) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def read_route(lag: float | None, last_write: float | None, now: float) -> str:
+    """Why a read should go to the primary, or "replica" if it need not.
+
+    - "lagging": replication is stopped, unmonitorable or behind
+      REPLICA_MAX_LAG_SECONDS
+    - "recent_write": the client wrote less than READ_YOUR_WRITES_SECONDS
+      ago, so the replica may not have its change yet. Timestamps from the
+      future are ignored rather than pinning the client to the primary.
+    """
+    if lag is None or lag > REPLICA_MAX_LAG_SECONDS:
+        return "lagging"
+    if last_write is not None and 0 <= now - last_write < READ_YOUR_WRITES_SECONDS:
+        return "recent_write"
+    return "replica"
@@ -0,0 +1,43 @@
+"""JSON encoding for responses, outbox payload columns and publishers.
+
+FAST_JSON=true switches the encoders here to orjson: compact output, and
+datetimes and UUIDs encoded natively instead of through a Python
+`default` hook. With it off the standard library is used and orjson does
+not need to be installed.
+"""
+import json
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse as _StdJSONResponse
+
+from app.core.config import FAST_JSON
+
+Default = Callable[[Any], Any] | None
+
+if FAST_JSON:
+    import orjson
+    from fastapi.responses import ORJSONResponse as JSONResponse
+
+    def dumps_bytes(obj: Any, default: Default = None) -> bytes:
+        return orjson.dumps(obj, default=default)
+
+    def dumps(obj: Any, default: Default = None) -> str:
+        return orjson.dumps(obj, default=default).decode()
+
+    loads = orjson.loads
+
+    # Outbox payloads (and every other JSON column) are encoded and decoded
+    # by the driver-level hooks of the engines.
+    ENGINE_JSON_OPTIONS: dict = {"json_serializer": dumps, "json_deserializer": loads}
+else:
+    JSONResponse = _StdJSONResponse
+
+    def dumps(obj: Any, default: Default = None) -> str:
+        return json.dumps(obj, default=default)
+
+    def dumps_bytes(obj: Any, default: Default = None) -> bytes:
+        return json.dumps(obj, default=default).encode()
+
+    loads = json.loads
+
+    ENGINE_JSON_OPTIONS = {}
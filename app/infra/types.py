@@ -0,0 +1,92 @@
+import base64
+import os
+import time
+import uuid
+import zlib
+
+from sqlalchemy.dialects.mysql import JSON
+from sqlalchemy.types import BINARY, TypeDecorator
+
+from app.infra.serialization import dumps_bytes, loads
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7): 48-bit Unix ms timestamp + random bits.
+
+    Consecutive ids sort by creation time, so inserts append to the end of
+    the clustered index instead of landing on random pages.
+    """
+    ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76                              # version
+    value |= ((rand >> 62) & 0xFFF) << 64           # rand_a (12 bits)
+    value |= 0b10 << 62                             # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF           # rand_b (62 bits)
+    return uuid.UUID(int=value)
+
+
+def new_id() -> str:
+    return str(uuid7())
+
+
+class BinaryUUID(TypeDecorator):
+    """UUID stored as BINARY(16), exposed to Python as the canonical string.
+
+    Models, services and API schemas keep working with `str` ids; only the
+    storage format changes. A malformed id binds as NULL, so lookups by a
+    garbage id simply find nothing (404) instead of raising.
+    """
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        if isinstance(value, bytes):
+            return value
+        try:
+            return uuid.UUID(value).bytes
+        except (TypeError, ValueError):
+            return None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON column that stores large values zlib-compressed.
+
+    A value whose JSON encoding is at least `min_bytes` long is stored as
+    {"$zlib": "<base64 of the compressed JSON>"} and expanded again when
+    read. The column stays valid JSON, so no migration is needed and rows
+    written before compression was enabled read as they are. `min_bytes=0`
+    stores every value as plain JSON.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    _KEY = "$zlib"
+
+    def __init__(self, min_bytes: int = 0):
+        super().__init__()
+        self.min_bytes = min_bytes
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not self.min_bytes:
+            return value
+        raw = dumps_bytes(value)
+        if len(raw) < self.min_bytes:
+            return value
+        return {self._KEY: base64.b64encode(zlib.compress(raw)).decode("ascii")}
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, dict) and len(value) == 1 and self._KEY in value:
+            return loads(zlib.decompress(base64.b64decode(value[self._KEY])))
+        return value
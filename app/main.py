@@ -1,13 +1,60 @@
-from fastapi import FastAPI
+import math
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 
-from app.infra.db import engine
+from app.core.config import DB_ASYNC_MODE, DB_QUERY_PROFILE, READ_YOUR_WRITES_SECONDS
+from app.infra import metrics
+from app.infra.db import engine, replica_engine, replica_monitor
+from app.infra.instrumentation import begin_request, end_request
+from app.infra.replica import LAST_WRITE_COOKIE, LAST_WRITE_HEADER
+from app.infra.serialization import JSONResponse
 from app.api.invoices import router as invoices_router
 from app.api.payments import router as payments_router
+from app.api.exports import router as exports_router
+from app.api.events import router as events_router
+from app.api.customers import router as customers_router
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
 
-app = FastAPI(title="Billing Demo - Payment Orchestrator")
+app = FastAPI(title="Billing Demo - Payment Orchestrator", default_response_class=JSONResponse)
+if DB_ASYNC_MODE:
+    # Registered first so its pay/webhook routes shadow the sync ones
+    from app.api.payments_async import router as payments_async_router
+    app.include_router(payments_async_router)
 app.include_router(invoices_router)
 app.include_router(payments_router)
+app.include_router(exports_router)
+app.include_router(events_router)
+app.include_router(customers_router)
+
+
+@app.middleware("http")
+async def db_request_metrics(request: Request, call_next):
+    stats, token = begin_request(profile=DB_QUERY_PROFILE)
+    try:
+        response = await call_next(request)
+        if stats.profile:
+            # For streamed bodies this covers the work done before streaming
+            response.headers.update(stats.headers())
+        if replica_engine is not None and request.method not in SAFE_METHODS and response.status_code < 400:
+            # Read-your-writes marker, see get_read_db. API clients that do
+            # not keep cookies can echo the header instead.
+            written_at = f"{time.time():.3f}"
+            response.headers[LAST_WRITE_HEADER] = written_at
+            response.set_cookie(LAST_WRITE_COOKIE, written_at, max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True)
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        end_request(token, stats, route.path if route else "unmatched")
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/health")
@@ -15,4 +62,7 @@ def health():
     # DB connectivity check
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
-    return {"status": "ok"}
+    if replica_monitor is None:
+        return {"status": "ok"}
+    # Replica problems degrade reads to the primary, they do not fail health
+    return {"status": "ok", "replica_lag_seconds": replica_monitor.lag()}
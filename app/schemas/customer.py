@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class CurrencyBalance(BaseModel):
+    currency: str
+    invoice_count: int
+    open_count: int
+    open_amount_cents: int
+    paid_count: int
+    paid_amount_cents: int
+
+
+class CustomerSummaryOut(BaseModel):
+    customer_ref: str
+    balances: List[CurrencyBalance]
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, List
+
+
+class FeedEvent(BaseModel):
+    seq: int
+    id: str
+    event_type: str
+    aggregate_type: str
+    aggregate_id: str
+    payload: Any
+    created_at: str
+
+
+class EventFeedOut(BaseModel):
+    events: List[FeedEvent]
+    cursor: int
@@ -1,5 +1,7 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 
 
 class InvoiceCreate(BaseModel):
@@ -16,6 +18,13 @@ class InvoiceOut(BaseModel):
     customer_ref: Optional[str] = None
 
 
+class InvoiceBatchResult(BaseModel):
+    row: int
+    status: Literal["created", "error"]
+    invoice_id: Optional[str] = None
+    error: Optional[str] = None
+
+
 class PaymentAttemptOut(BaseModel):
     attempt_id: str
     status: str
@@ -23,7 +32,7 @@ class PaymentAttemptOut(BaseModel):
     provider_payment_id: str
     error_code: Optional[str] = None
     error_message: Optional[str] = None
-    created_at: str
+    created_at: datetime
 
 
 class OutboxEventSummary(BaseModel):
@@ -31,8 +40,8 @@ class OutboxEventSummary(BaseModel):
     event_type: str
     aggregate_type: str
     aggregate_id: str
-    created_at: str
-    published_at: Optional[str] = None
+    created_at: datetime
+    published_at: Optional[datetime] = None
 
 
 class InvoiceDetailOut(BaseModel):
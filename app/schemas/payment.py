@@ -18,3 +18,13 @@ class ProviderWebhookRequest(BaseModel):
     provider_event_id: str = Field(default_factory=lambda: "evt_mock")
     error_code: Optional[str] = None
     error_message: Optional[str] = None
+
+
+class ProviderWebhookResult(BaseModel):
+    provider_payment_id: str
+    provider_event_id: str
+    status: Literal["ok", "error"]
+    duplicate: bool = False
+    attempt_id: Optional[str] = None
+    attempt_status: Optional[str] = None
+    error: Optional[str] = None
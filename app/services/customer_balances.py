@@ -0,0 +1,70 @@
+"""Incremental maintenance of `customer_balances`.
+
+Invoice writes collect their effect on the per-customer totals in a
+`BalanceDeltas` and apply it with one multi-row
+INSERT ... ON DUPLICATE KEY UPDATE col = col + delta, in the same
+transaction as the invoice change. The first invoice of a customer creates
+the row. Increments commute, so concurrent writers never lose an update;
+each one only holds the row lock until its commit. Rows go out in key order
+so two transactions touching the same customers lock them in the same
+order.
+
+Callers apply the deltas before their own invoice writes reach the
+database. Balance rows are therefore always locked before invoice rows,
+the order app.cli.rebuild_customer_balances relies on.
+"""
+from datetime import datetime
+
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.infra.models import CustomerBalance
+
+BalanceKey = tuple[str, str]  # (customer_ref, currency)
+
+_COUNTERS = ("open_count", "open_amount_cents", "paid_count", "paid_amount_cents")
+
+
+class BalanceDeltas:
+    def __init__(self) -> None:
+        self._deltas: dict[BalanceKey, list[int]] = {}
+
+    def _add(self, customer_ref: str | None, currency: str, *delta: int) -> None:
+        if customer_ref is None:
+            return
+        totals = self._deltas.setdefault((customer_ref, currency), [0, 0, 0, 0])
+        for i, value in enumerate(delta):
+            totals[i] += value
+
+    def invoice_created(self, customer_ref: str | None, currency: str, amount_cents: int) -> None:
+        self._add(customer_ref, currency, 1, amount_cents, 0, 0)
+
+    def invoice_paid(self, customer_ref: str | None, currency: str, amount_cents: int) -> None:
+        self._add(customer_ref, currency, -1, -amount_cents, 1, amount_cents)
+
+    def statement(self):
+        """The upsert applying all collected deltas, or None if there are none."""
+        if not self._deltas:
+            return None
+        now = datetime.utcnow()
+        stmt = insert(CustomerBalance).values([
+            {"customer_ref": ref, "currency": currency, **dict(zip(_COUNTERS, totals)), "updated_at": now}
+            for (ref, currency), totals in sorted(self._deltas.items())
+        ])
+        return stmt.on_duplicate_key_update(
+            **{c: getattr(CustomerBalance, c) + getattr(stmt.inserted, c) for c in _COUNTERS},
+            updated_at=stmt.inserted.updated_at,
+        )
+
+
+def apply_balances(db: Session, deltas: BalanceDeltas) -> None:
+    stmt = deltas.statement()
+    if stmt is not None:
+        db.execute(stmt)
+
+
+async def apply_balances_async(db: AsyncSession, deltas: BalanceDeltas) -> None:
+    stmt = deltas.statement()
+    if stmt is not None:
+        await db.execute(stmt)
@@ -0,0 +1,131 @@
+"""Dunning: automatic retries of invoices whose payment attempt failed.
+
+When a webhook fails an attempt of an open invoice, the handler adds it to a
+`RetryPlan`. The plan asks the policy whether and when to retry, and writes
+one `payment_retry_schedule` row per invoice in the same transaction.
+app.workers.dunning runs the rows when they are due
+(`app.services.payments.pay_due_retries`). Each retry makes a new attempt
+with the idempotency key `dunning:{invoice_id}:{retry_no}`. If that attempt
+fails too, its key yields the next retry number, so the policy's
+max_retries bounds the chain. An attempt the customer starts by hand
+through /pay starts a new chain at retry 1 if it fails.
+"""
+from datetime import datetime, timedelta
+from typing import Mapping, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    DUNNING_ERROR_CODE_DELAYS_SECONDS,
+    DUNNING_MAX_RETRIES,
+    DUNNING_NO_RETRY_ERROR_CODES,
+    DUNNING_RETRY_DELAYS_SECONDS,
+)
+from app.infra.metrics import Counter
+from app.infra.models import PaymentRetrySchedule
+
+_KEY_PREFIX = "dunning:"
+
+DUNNING_RETRIES = Counter(
+    "dunning_retries_total", "Scheduled retries run by the dunning worker, by outcome.", ("outcome",)
+)
+
+
+def retry_idempotency_key(invoice_id: str, retry_no: int) -> str:
+    return f"{_KEY_PREFIX}{invoice_id}:{retry_no}"
+
+
+def next_retry_no(invoice_id: str, failed_idempotency_key: str) -> int:
+    """Number of the retry that follows a failed attempt made with this key."""
+    prefix = f"{_KEY_PREFIX}{invoice_id}:"
+    if failed_idempotency_key.startswith(prefix) and failed_idempotency_key[len(prefix):].isdigit():
+        return int(failed_idempotency_key[len(prefix):]) + 1
+    return 1
+
+
+class DunningPolicy:
+    def __init__(
+        self,
+        max_retries: int = DUNNING_MAX_RETRIES,
+        delays: Sequence[float] = DUNNING_RETRY_DELAYS_SECONDS,
+        no_retry_error_codes: frozenset[str] = DUNNING_NO_RETRY_ERROR_CODES,
+        error_code_delays: Mapping[str, float] = DUNNING_ERROR_CODE_DELAYS_SECONDS,
+    ) -> None:
+        self.max_retries = max_retries
+        self.delays = list(delays) or [3600.0]
+        self.no_retry_error_codes = no_retry_error_codes
+        self.error_code_delays = dict(error_code_delays)
+
+    def delay(self, retry_no: int, error_code: str | None) -> float | None:
+        """Seconds until retry `retry_no` (1-based), or None for no retry."""
+        if retry_no > self.max_retries or error_code in self.no_retry_error_codes:
+            return None
+        if error_code in self.error_code_delays:
+            return self.error_code_delays[error_code]
+        return self.delays[min(retry_no, len(self.delays)) - 1]
+
+
+default_policy = DunningPolicy()
+
+
+class RetryPlan:
+    """Retries to schedule for the attempts failed in one transaction."""
+
+    def __init__(self, policy: DunningPolicy | None = None) -> None:
+        self.policy = policy or default_policy
+        self._rows: dict[str, dict] = {}
+
+    def attempt_failed(
+        self, invoice_id: str, idempotency_key: str, error_code: str | None, now: datetime | None = None
+    ) -> datetime | None:
+        """Plans the retry after this failure; returns when it is due, or None."""
+        retry_no = next_retry_no(invoice_id, idempotency_key)
+        delay = self.policy.delay(retry_no, error_code)
+        if delay is None:
+            self._rows.pop(invoice_id, None)
+            return None
+        now = now or datetime.utcnow()
+        due_at = now + timedelta(seconds=delay)
+        self._rows[invoice_id] = {
+            "invoice_id": invoice_id, "retry_no": retry_no, "due_at": due_at, "error_code": error_code, "created_at": now,
+        }
+        return due_at
+
+    def statement(self):
+        """The upsert writing all planned retries, or None if there are none."""
+        if not self._rows:
+            return None
+        stmt = insert(PaymentRetrySchedule).values([self._rows[k] for k in sorted(self._rows)])
+        return stmt.on_duplicate_key_update(
+            retry_no=stmt.inserted.retry_no,
+            due_at=stmt.inserted.due_at,
+            error_code=stmt.inserted.error_code,
+        )
+
+
+def apply_retry_plan(db: Session, plan: RetryPlan) -> None:
+    stmt = plan.statement()
+    if stmt is not None:
+        db.execute(stmt)
+
+
+async def apply_retry_plan_async(db: AsyncSession, plan: RetryPlan) -> None:
+    stmt = plan.statement()
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+def load_due(db: Session, until: datetime, limit: int) -> list[tuple[datetime, str]]:
+    """(due_at, invoice_id) of the earliest retries due by `until`: a range of ix_retry_schedule_due."""
+    return [
+        (due_at, invoice_id)
+        for invoice_id, due_at in db.execute(
+            select(PaymentRetrySchedule.invoice_id, PaymentRetrySchedule.due_at)
+            .where(PaymentRetrySchedule.due_at <= until)
+            .order_by(PaymentRetrySchedule.due_at)
+            .limit(limit)
+        )
+    ]
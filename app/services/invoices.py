@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Any, Iterable
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import INVOICE_DETAIL_CACHE_SIZE, INVOICE_DETAIL_CACHE_TTL_SECONDS
+from app.infra.cache import TTLCache
+from app.infra.db import on_commit
+from app.infra.models import Invoice
+from app.infra.types import new_id
+from app.schemas.invoice import InvoiceCreate
+from app.services.customer_balances import BalanceDeltas, apply_balances
+
+# invoice_id -> (etag, serialized InvoiceDetailOut)
+invoice_detail_cache = TTLCache("invoice_detail", INVOICE_DETAIL_CACHE_SIZE, INVOICE_DETAIL_CACHE_TTL_SECONDS)
+
+
+def touch_invoice(db: Session, invoice: Invoice) -> None:
+    """Marks a change to the invoice or its attempts, in the caller's transaction.
+
+    The version is bumped with an SQL expression, so concurrent writers
+    never collapse two changes into one version.
+    """
+    invoice.version = Invoice.version + 1
+    invoice_id = invoice.id
+    on_commit(db, lambda: invoice_detail_cache.invalidate(invoice_id))
+
+
+def touch_invoices(db: Session, invoice_ids: Iterable[str]) -> None:
+    """`touch_invoice` for many invoices with one UPDATE.
+
+    Per-object expression assignments cannot be batched by the flush, so
+    batch handlers use this instead of one UPDATE per invoice. In-memory
+    `version` attributes are left as they are.
+    """
+    invoice_ids = list(dict.fromkeys(invoice_ids))
+    if not invoice_ids:
+        return
+    db.execute(
+        update(Invoice)
+        .where(Invoice.id.in_(invoice_ids))
+        .values(version=Invoice.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+    def _invalidate():
+        for invoice_id in invoice_ids:
+            invoice_detail_cache.invalidate(invoice_id)
+
+    on_commit(db, _invalidate)
+
+
+def invoice_validator(db: Session, invoice_id: str) -> tuple[str, datetime] | None:
+    """ETag and Last-Modified of the invoice detail view, by primary key.
+
+    Everything the detail shows bumps `version`, including outbox events
+    being published or archived, so the invoice row alone decides whether
+    the view changed. Returns None if the invoice does not exist.
+    """
+    row = db.execute(
+        select(Invoice.version, Invoice.updated_at).where(Invoice.id == invoice_id)
+    ).first()
+    if row is None:
+        return None
+    version, updated_at = row
+    return f'W/"{version}.{updated_at:%Y%m%d%H%M%S%f}"', updated_at
+
+
+def invoice_aggregate_ids(events: Iterable[Any]) -> list[str]:
+    """Ids of the invoices among the aggregates of outbox rows or event dicts."""
+    ids = []
+    for evt in events:
+        if isinstance(evt, dict):
+            aggregate_type, aggregate_id = evt["aggregate_type"], evt["aggregate_id"]
+        else:
+            aggregate_type, aggregate_id = evt.aggregate_type, evt.aggregate_id
+        if aggregate_type == "invoice":
+            ids.append(aggregate_id)
+    return ids
+
+
+def _validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def create_invoices(db: Session, rows: Iterable[tuple[int, Any]]) -> list[dict]:
+    """Validates and inserts many invoices in the caller's transaction.
+
+    `rows` are (row number, raw payload) pairs. Every payload is validated
+    with `InvoiceCreate`; valid ones get client-side ids and go out in one
+    executemany, which the driver sends as multi-row INSERTs. Returns one
+    result per row, in input order, with either the new id or the error.
+    Customer balances are updated with one upsert for the whole batch.
+    """
+    now = datetime.utcnow()
+    results: list[dict] = []
+    values: list[dict] = []
+    balances = BalanceDeltas()
+    for row, payload in rows:
+        try:
+            item = InvoiceCreate.model_validate(payload)
+        except ValidationError as exc:
+            results.append({"row": row, "status": "error", "error": _validation_error(exc)})
+            continue
+        invoice_id = new_id()
+        values.append({
+            "id": invoice_id,
+            "status": "open",
+            "amount_cents": item.amount_cents,
+            "currency": item.currency,
+            "customer_ref": item.customer_ref,
+            "version": 1,
+            "created_at": now,
+            "updated_at": now,
+        })
+        balances.invoice_created(item.customer_ref, item.currency, item.amount_cents)
+        results.append({"row": row, "status": "created", "invoice_id": invoice_id})
+
+    apply_balances(db, balances)
+    if values:
+        db.execute(insert(Invoice), values)
+    return results
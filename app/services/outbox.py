@@ -1,30 +1,171 @@
+"""Transactional outbox: writes, relay claims and publishing.
+
+Events are written in the transaction of the state change they describe.
+`enqueue_event` and `enqueue_events` do not insert right away: they append
+the rows to the session, and all rows collected in a transaction go out as
+one multi-row INSERT just before it commits. A webhook's two events cost
+one statement and no ORM objects.
+
+Like objects passed to `Session.add`, collected rows follow the
+transaction they were enqueued in: rolling back a SAVEPOINT drops the rows
+enqueued inside it, and rolling back or closing the session's transaction
+drops them all, so a replayed unit of work enqueues them again. Only
+sessions from `SessionLocal` (and the async sessions built on it) flush
+rows at commit.
+"""
 from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import Sequence
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session, SessionTransaction
+from app.infra.db import SessionLocal, on_commit
 from app.infra.models import OutboxEvent
+from app.infra.notify import ChangeNotifier
+from app.infra.types import new_id
+from app.infra.publishers import Publisher
+from app.services.invoices import invoice_aggregate_ids, touch_invoices
+
+# Wakes /events long-polls and streams once new events are committed
+outbox_notifier = ChangeNotifier()
+
+# session.info key: list of (owning transaction, row) pairs
+_PENDING = "outbox_pending"
+
+
+def _collect(db: Session, rows: list[dict]) -> None:
+    session = getattr(db, "sync_session", db)
+    if not session.in_transaction():
+        # Session.add autobegins here as well: the rows need a transaction
+        # whose rollback can discard them
+        session.connection()
+    owner = session.get_nested_transaction() or session.get_transaction()
+    pending = session.info.get(_PENDING)
+    if pending is None:
+        pending = session.info[_PENDING] = []
+        on_commit(db, outbox_notifier.notify)
+    pending.extend((owner, row) for row in rows)
 
 
 def enqueue_event(db: Session, event_type: str, aggregate_type: str, aggregate_id: str, payload: dict) -> OutboxEvent:
+    """Adds an event to the current transaction.
+
+    Returns a transient `OutboxEvent` with its id and timestamp set; the
+    row itself is inserted when the transaction commits.
+    """
     evt = OutboxEvent(
+        id=new_id(),
         event_type=event_type,
         aggregate_type=aggregate_type,
         aggregate_id=aggregate_id,
         payload=payload,
+        created_at=datetime.utcnow(),
     )
-    db.add(evt)
+    _collect(db, [{
+        "id": evt.id,
+        "event_type": evt.event_type,
+        "aggregate_type": evt.aggregate_type,
+        "aggregate_id": evt.aggregate_id,
+        "payload": evt.payload,
+        "created_at": evt.created_at,
+    }])
     return evt
 
 
-def publish_pending(db: Session, limit: int = 50) -> int:
-    # In a real system, this is where we'd publish to Kafka/RabbitMQ.
-    # Here we mark events as published.
-    pending = (
-        db.query(OutboxEvent)
-        .filter(OutboxEvent.published_at.is_(None))
+def enqueue_events(db: Session, events: Sequence[dict]) -> None:
+    # Bulk variant of enqueue_event for callers that already hold the whole
+    # list. Each item carries enqueue_event's keyword arguments.
+    if not events:
+        return
+    now = datetime.utcnow()
+    _collect(db, [{"id": new_id(), "created_at": now, **evt} for evt in events])
+
+
+def flush_events(db: Session) -> None:
+    """Inserts the events enqueued so far. Runs on commit; call it to read them back earlier."""
+    session = getattr(db, "sync_session", db)
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        session.execute(insert(OutboxEvent), [row for _, row in pending])
+
+
+def _within(transaction: SessionTransaction | None, ended: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ended:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _flush_events_before_commit(session: Session) -> None:
+    # Also fires when a SAVEPOINT is released; rows wait for the real commit
+    if session.get_nested_transaction() is None:
+        flush_events(session)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_rolled_back_events(session: Session, previous_transaction: SessionTransaction) -> None:
+    pending = session.info.get(_PENDING)
+    if pending:
+        pending[:] = [(owner, row) for owner, row in pending if not _within(owner, previous_transaction)]
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _drop_pending_events(session: Session, transaction: SessionTransaction) -> None:
+    # Closed without commit
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+def claim_pending(db: Session, limit: int = 50):
+    # FOR UPDATE SKIP LOCKED: concurrent relays each get a disjoint batch and
+    # never wait on rows another relay is already publishing.
+    return db.execute(
+        select(
+            OutboxEvent.id,
+            OutboxEvent.event_type,
+            OutboxEvent.aggregate_type,
+            OutboxEvent.aggregate_id,
+            OutboxEvent.payload,
+            OutboxEvent.created_at,
+        )
+        .where(OutboxEvent.published_at.is_(None))
         .order_by(OutboxEvent.created_at.asc())
         .limit(limit)
-        .all()
+        .with_for_update(skip_locked=True)
+    ).all()
+
+
+def mark_published(db: Session, event_ids: Sequence[str], published_at: datetime | None = None) -> None:
+    if not event_ids:
+        return
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(event_ids))
+        .values(published_at=published_at or datetime.utcnow())
+        .execution_options(synchronize_session=False)
     )
-    now = datetime.datetime.now()
-    for evt in pending:
-        evt.published_at = now
+
+
+def event_message(row) -> dict:
+    return {
+        "id": row.id,
+        "event_type": row.event_type,
+        "aggregate_type": row.aggregate_type,
+        "aggregate_id": row.aggregate_id,
+        "payload": row.payload,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def publish_pending(db: Session, limit: int = 50, publisher: Publisher | None = None) -> int:
+    # Claims a batch, hands it to the publisher and marks it with one UPDATE.
+    # The caller owns the transaction: the row locks are held until it commits.
+    # published_at shows in the invoice detail, so its version is bumped too.
+    pending = claim_pending(db, limit=limit)
+    if not pending:
+        return 0
+    if publisher is not None:
+        publisher.publish([event_message(row) for row in pending])
+    mark_published(db, [row.id for row in pending])
+    touch_invoices(db, invoice_aggregate_ids(pending))
     return len(pending)
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import OUTBOX_FEED_GAP_GRACE_SECONDS
+from app.infra.models import OutboxEvent
+from app.services.outbox import event_message
+
+
+def read_feed(db: Session, after: int, limit: int, gap_grace: float = OUTBOX_FEED_GAP_GRACE_SECONDS) -> list[dict]:
+    """Events with seq > `after`, in seq order, stopping before unsafe gaps.
+
+    seq is assigned at INSERT but rows become visible at COMMIT, so a hole
+    in the sequence may be a transaction that has not committed yet.
+    Reading past it would make consumers skip that event for good. The
+    feed therefore stops at a hole until the row after it is older than
+    `gap_grace`; after that the hole is taken to be a rollback (or an
+    archived event) and skipped. The same goes for the hole in front of
+    the first row a cursor below every remaining seq sees (a new consumer
+    at after=0, or one behind archiving): AUTO_INCREMENT is not reset by
+    DELETE, so that hole is normal, but a lower seq may still commit.
+    """
+    rows = db.execute(
+        select(
+            OutboxEvent.seq,
+            OutboxEvent.id,
+            OutboxEvent.event_type,
+            OutboxEvent.aggregate_type,
+            OutboxEvent.aggregate_id,
+            OutboxEvent.payload,
+            OutboxEvent.created_at,
+        )
+        .where(OutboxEvent.seq > after)
+        .order_by(OutboxEvent.seq.asc())
+        .limit(limit)
+    ).all()
+
+    settled = datetime.utcnow() - timedelta(seconds=gap_grace)
+    events: list[dict] = []
+    expected = after + 1
+    for row in rows:
+        if row.seq != expected and row.created_at > settled:
+            break
+        events.append({"seq": row.seq, **event_message(row)})
+        expected = row.seq + 1
+    return events
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+from app.infra.models import OutboxEvent, OutboxEventArchive
+from app.services.invoices import invoice_aggregate_ids, touch_invoices
+
+_ARCHIVED_COLUMNS = ("id", "event_type", "aggregate_type", "aggregate_id", "payload", "created_at", "published_at", "seq")
+
+
+def retention_cutoff(days: float, now: datetime | None = None) -> datetime:
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def archive_published_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Moves up to `batch_size` events published before `cutoff` to the archive.
+
+    The batch is an index range on ix_outbox_pending (oldest published
+    first), locked with SKIP LOCKED, so the copy + delete only touches rows
+    nobody else holds and the transaction stays short. Invoices losing
+    events from their detail view get a new version. The caller commits.
+    """
+    rows = db.execute(
+        select(OutboxEvent.id, OutboxEvent.aggregate_type, OutboxEvent.aggregate_id)
+        .where(OutboxEvent.published_at < cutoff)
+        .order_by(OutboxEvent.published_at.asc())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+    ids = [row.id for row in rows]
+
+    columns = [getattr(OutboxEvent, name) for name in _ARCHIVED_COLUMNS]
+    db.execute(
+        insert(OutboxEventArchive).from_select(
+            list(_ARCHIVED_COLUMNS) + ["archived_at"],
+            select(*columns, literal(datetime.utcnow())).where(OutboxEvent.id.in_(ids)),
+        )
+    )
+    db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    touch_invoices(db, invoice_aggregate_ids(rows))
+    return len(ids)
@@ -1,70 +1,131 @@
+import time
 import uuid
-from sqlalchemy import select
+from datetime import datetime
+from typing import Sequence
+from sqlalchemy import delete, event, or_, select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
-from app.infra.models import Invoice, PaymentAttempt
-from app.services.outbox import enqueue_event
+from app.core.config import PAY_REPLAY_CACHE_SIZE, PAY_REPLAY_CACHE_TTL_SECONDS
+from app.infra.cache import TTLCache
+from app.infra.db import on_commit
+from app.infra.metrics import Histogram
+from app.infra.models import Invoice, PaymentAttempt, PaymentRetrySchedule
+from app.infra.types import new_id
+from app.schemas.payment import ProviderWebhookRequest
+from app.services.customer_balances import BalanceDeltas, apply_balances
+from app.services.dunning import DUNNING_RETRIES, RetryPlan, apply_retry_plan, retry_idempotency_key
+from app.services.invoices import touch_invoice, touch_invoices
+from app.services.outbox import enqueue_event, enqueue_events
+from app.services.provider_events import claim_events, release_events
+
+
+# PayInvoiceResponse by (invoice_id, idempotency_key): exact client retries
+# are answered with one primary-key read instead of the invoice lock.
+pay_replay_cache = TTLCache("pay_replay", PAY_REPLAY_CACHE_SIZE, PAY_REPLAY_CACHE_TTL_SECONDS)
+
+def _cached_attempt_status_query(cached):
+    return select(PaymentAttempt.status).where(PaymentAttempt.id == cached.attempt_id)
+
+
+def cached_pay_response(db: Session, replay_key: tuple[str, str]):
+    """The cached pay response for `replay_key` if it is still current, else None.
+
+    Webhooks only invalidate the cache of the process that applied them, so
+    the attempt's status is re-read by primary key before a cached response
+    is served. A stale entry is dropped and the read transaction ended, so
+    the caller's unit of work starts from a fresh snapshot.
+    """
+    cached = pay_replay_cache.get(replay_key)
+    if cached is None:
+        return None
+    if db.execute(_cached_attempt_status_query(cached)).scalar_one_or_none() == cached.status:
+        return cached
+    pay_replay_cache.invalidate(replay_key)
+    db.rollback()
+    return None
+
+
+PAY_LOCK_HOLD_SECONDS = Histogram(
+    "pay_invoice_lock_hold_seconds",
+    "Time the invoice row lock taken by pay_invoice is held (lock acquired -> commit/rollback).",
+)
 
 
 def _provider_payment_id() -> str:
     return f"pp_{uuid.uuid4().hex[:18]}"
 
 
-def pay_invoice(db: Session, invoice_id: str, idempotency_key: str) -> PaymentAttempt:
-    if not idempotency_key:
-        raise HTTPException(status_code=400, detail="idempotency_key_required")
+def _existing_attempt_query(invoice_id: str, idempotency_key: str):
+    # One indexed lookup (ix_attempt_invoice_idem_status) answers both
+    # questions pay_invoice has: was this key already used (idempotent replay)
+    # and is another attempt still in flight. The replay flag is computed by
+    # the database so the key comparison follows the column collation, the
+    # same way uq_invoice_idemkey does.
+    is_replay = (PaymentAttempt.idempotency_key == idempotency_key).label("is_replay")
+    return (
+        select(PaymentAttempt, is_replay)
+        .where(
+            PaymentAttempt.invoice_id == invoice_id,
+            or_(
+                PaymentAttempt.idempotency_key == idempotency_key,
+                PaymentAttempt.status == "requires_action",
+            ),
+        )
+        .order_by(is_replay.desc())
+        .limit(1)
+    )
 
-    # Row-lock invoice to avoid concurrent pay attempts for the same invoice
-    invoice = db.execute(
-        select(Invoice).where(Invoice.id == invoice_id).with_for_update()
-    ).scalar_one_or_none()
 
+def _check_invoice_payable(invoice: Invoice | None) -> Invoice:
     if not invoice:
         raise HTTPException(status_code=404, detail="invoice_not_found")
 
     if invoice.status == "paid":
         raise HTTPException(status_code=409, detail="invoice_already_paid")
 
+    return invoice
+
+
+def _replay_or_conflict(row) -> PaymentAttempt | None:
+    if row is None:
+        return None
+
     # Idempotency: if same key already used for this invoice, return same attempt
-    existing = db.query(PaymentAttempt).filter(
-        PaymentAttempt.invoice_id == invoice_id,
-        PaymentAttempt.idempotency_key == idempotency_key,
-    ).one_or_none()
-    if existing:
-        return existing
+    attempt, is_replay = row
+    if is_replay:
+        return attempt
 
-    # If there is a pending attempt, you can choose either to block or return it.
-    pending = db.query(PaymentAttempt).filter(
-        PaymentAttempt.invoice_id == invoice_id,
-        PaymentAttempt.status == "requires_action",
-    ).order_by(PaymentAttempt.created_at.desc()).first()
-    if pending:
-        # conservative behavior to avoid multiple in-flight provider payments
-        raise HTTPException(
-            status_code=409,
-            detail="invoice_has_pending_attempt"
-        )
+    # conservative behavior to avoid multiple in-flight provider payments
+    raise HTTPException(
+        status_code=409,
+        detail="invoice_has_pending_attempt"
+    )
 
+
+def _create_attempt(db: Session, invoice: Invoice, idempotency_key: str, touch: bool = True) -> PaymentAttempt:
+    # The id is generated here rather than by the INSERT, so the outbox
+    # payload can reference it without an extra flush round trip. With
+    # touch=False the caller bumps the invoice version (see touch_invoices).
     attempt = PaymentAttempt(
-        invoice_id=invoice_id,
+        id=new_id(),
+        invoice_id=invoice.id,
         idempotency_key=idempotency_key,
         status="requires_action",
         provider_payment_id=_provider_payment_id(),
     )
     db.add(attempt)
-
-    # Ensure attempt.id is generated BEFORE writing outbox payload
-    db.flush()
+    if touch:
+        touch_invoice(db, invoice)
 
     enqueue_event(
         db,
         event_type="payment_attempt_created",
         aggregate_type="invoice",
-        aggregate_id=invoice_id,
+        aggregate_id=invoice.id,
         payload={
-            "invoice_id": invoice_id,
-            "attempt_id": attempt.id,  # note: will be populated after flush
+            "invoice_id": invoice.id,
+            "attempt_id": attempt.id,
             "provider_payment_id": attempt.provider_payment_id,
             "amount_cents": invoice.amount_cents,
             "currency": invoice.currency,
@@ -74,6 +135,123 @@ def pay_invoice(db: Session, invoice_id: str, idempotency_key: str) -> PaymentAt
     return attempt
 
 
+def pay_invoice(db: Session, invoice_id: str, idempotency_key: str) -> PaymentAttempt:
+    if not idempotency_key:
+        raise HTTPException(status_code=400, detail="idempotency_key_required")
+
+    # Row-lock invoice to avoid concurrent pay attempts for the same invoice.
+    # The lock is held until the caller commits: keep round trips after this
+    # point to a minimum.
+    invoice = _check_invoice_payable(db.execute(
+        select(Invoice).where(Invoice.id == invoice_id).with_for_update()
+    ).scalar_one_or_none())
+    db.info["invoice_locked_at"] = time.perf_counter()
+
+    existing = _replay_or_conflict(db.execute(_existing_attempt_query(invoice_id, idempotency_key)).first())
+    if existing:
+        return existing
+
+    return _create_attempt(db, invoice, idempotency_key)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _observe_invoice_lock_hold(session: Session) -> None:
+    locked_at = session.info.pop("invoice_locked_at", None)
+    if locked_at is not None:
+        PAY_LOCK_HOLD_SECONDS.observe(time.perf_counter() - locked_at)
+
+
+def _already_applied(attempt: PaymentAttempt, provider_event_id: str) -> bool:
+    # If we already processed this provider event id, ignore
+    if attempt.provider_event_id_last == provider_event_id:
+        return True
+
+    # If already terminal, ignore (idempotency for duplicates/out-of-order)
+    if attempt.status in ("succeeded", "failed"):
+        attempt.provider_event_id_last = provider_event_id
+        return True
+
+    return False
+
+
+def _apply_webhook_result(
+    db: Session,
+    attempt: PaymentAttempt,
+    invoice: Invoice,
+    result: str,
+    provider_event_id: str,
+    error_code: str | None,
+    error_message: str | None,
+    balances: BalanceDeltas,
+    retries: RetryPlan,
+    touch: bool = True,
+) -> list[dict]:
+    """Moves attempt/invoice to the new state and returns the outbox events to write.
+
+    The change to the customer's totals is added to `balances` and a retry
+    of a failed payment to `retries`; the caller applies both. With
+    `touch=False` the caller also bumps the invoice version itself (see
+    `touch_invoices`).
+    """
+    if result == "succeeded":
+        attempt.status = "succeeded"
+        if invoice.status != "paid":
+            balances.invoice_paid(invoice.customer_ref, invoice.currency, invoice.amount_cents)
+        invoice.status = "paid"
+        events = [
+            dict(
+                event_type="payment_attempt_succeeded",
+                aggregate_type="invoice",
+                aggregate_id=invoice.id,
+                payload={
+                    "invoice_id": invoice.id,
+                    "attempt_id": attempt.id,
+                    "provider_payment_id": attempt.provider_payment_id
+                },
+            ),
+            dict(
+                event_type="invoice_paid",
+                aggregate_type="invoice",
+                aggregate_id=invoice.id,
+                payload={
+                    "invoice_id": invoice.id,
+                    "amount_cents": invoice.amount_cents,
+                    "currency": invoice.currency
+                },
+            ),
+        ]
+    else:
+        attempt.status = "failed"
+        attempt.error_code = error_code
+        attempt.error_message = error_message
+        retry_at = retries.attempt_failed(invoice.id, attempt.idempotency_key, error_code) if invoice.status == "open" else None
+        events = [
+            dict(
+                event_type="payment_attempt_failed",
+                aggregate_type="invoice",
+                aggregate_id=invoice.id,
+                payload={
+                    "invoice_id": invoice.id,
+                    "attempt_id": attempt.id,
+                    "provider_payment_id": attempt.provider_payment_id,
+                    "error_code": error_code,
+                    "next_retry_at": retry_at.isoformat() if retry_at else None,
+                },
+            ),
+        ]
+
+    attempt.provider_event_id_last = provider_event_id
+    if touch:
+        touch_invoice(db, invoice)
+
+    # The attempt is terminal now: replays of its pay request must not be
+    # answered from the cached requires_action response any more.
+    replay_key = (attempt.invoice_id, attempt.idempotency_key)
+    on_commit(db, lambda: pay_replay_cache.invalidate(replay_key))
+    return events
+
+
 def handle_provider_webhook(
     db: Session,
     provider_payment_id: str,
@@ -82,10 +260,19 @@ def handle_provider_webhook(
     error_code: str | None,
     error_message: str | None,
 ):
-    # Idempotent webhook handling:
+    # Redeliveries are rejected by the processed-event ledger before any
+    # row is loaded; None tells the caller it was a duplicate. If the
+    # callback fails below, the rollback also un-records the event.
+    if not claim_events(db, [(provider_payment_id, provider_event_id)]):
+        return None
+
+    # Idempotent webhook handling. Callbacks with different event ids for
+    # the same payment can arrive together: the attempt row lock makes the
+    # second one wait and then see the terminal status, so the state
+    # change, its outbox events and the balance delta happen once.
     attempt = db.query(PaymentAttempt).filter(
         PaymentAttempt.provider_payment_id == provider_payment_id
-    ).one_or_none()
+    ).with_for_update().one_or_none()
 
     if not attempt:
         raise HTTPException(
@@ -93,62 +280,166 @@ def handle_provider_webhook(
             detail="attempt_not_found_for_provider_payment_id"
         )
 
-    # If we already processed this provider event id, ignore
-    if attempt.provider_event_id_last == provider_event_id:
-        return attempt
-
-    # If already terminal, ignore (idempotency for duplicates/out-of-order)
-    if attempt.status in ("succeeded", "failed"):
-        attempt.provider_event_id_last = provider_event_id
+    if _already_applied(attempt, provider_event_id):
         return attempt
 
     invoice = db.get(Invoice, attempt.invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="invoice_not_found")
 
-    if result == "succeeded":
-        attempt.status = "succeeded"
-        invoice.status = "paid"
+    balances = BalanceDeltas()
+    retries = RetryPlan()
+    for evt in _apply_webhook_result(
+        db, attempt, invoice, result, provider_event_id, error_code, error_message, balances, retries
+    ):
+        enqueue_event(db, **evt)
+    apply_balances(db, balances)
+    apply_retry_plan(db, retries)
 
-        enqueue_event(
-            db,
-            event_type="payment_attempt_succeeded",
-            aggregate_type="invoice",
-            aggregate_id=invoice.id,
-            payload={
-                "invoice_id": invoice.id,
-                "attempt_id": attempt.id,
-                "provider_payment_id": provider_payment_id
-            },
-        )
-        enqueue_event(
-            db,
-            event_type="invoice_paid",
-            aggregate_type="invoice",
-            aggregate_id=invoice.id,
-            payload={
-                "invoice_id": invoice.id,
-                "amount_cents": invoice.amount_cents,
-                "currency": invoice.currency
-            },
+    return attempt
+
+
+def handle_provider_webhook_batch(db: Session, items: Sequence[ProviderWebhookRequest]) -> list[dict]:
+    """Applies many provider callbacks in one transaction.
+
+    Same state transitions as `handle_provider_webhook`, but duplicates are
+    filtered with one ledger INSERT, attempts and invoices are resolved with
+    one IN query each and all resulting outbox events are written with one
+    multi-row INSERT. Items are applied in order, so several callbacks for
+    the same payment behave as if sent one by one.
+    """
+    keys = [(item.provider_payment_id, item.provider_event_id) for item in items]
+    claimed = claim_events(db, keys)
+
+    # Attempts are locked as in the single-callback path, in key order so
+    # that overlapping batches queue up instead of deadlocking.
+    provider_payment_ids = {provider_payment_id for provider_payment_id, _ in claimed}
+    attempts = {
+        a.provider_payment_id: a
+        for a in db.execute(
+            select(PaymentAttempt)
+            .where(PaymentAttempt.provider_payment_id.in_(provider_payment_ids))
+            .order_by(PaymentAttempt.provider_payment_id)
+            .with_for_update()
+        ).scalars()
+    } if provider_payment_ids else {}
+    invoice_ids = {a.invoice_id for a in attempts.values()}
+    invoices = {
+        i.id: i
+        for i in db.execute(select(Invoice).where(Invoice.id.in_(invoice_ids))).scalars()
+    } if invoice_ids else {}
+
+    events: list[dict] = []
+    results: list[dict] = []
+    handled: set[tuple[str, str]] = set()
+    failed: list[tuple[str, str]] = []
+    touched: list[str] = []
+    balances = BalanceDeltas()
+    retries = RetryPlan()
+    for item, key in zip(items, keys):
+        result = {
+            "provider_payment_id": item.provider_payment_id,
+            "provider_event_id": item.provider_event_id,
+        }
+        if key not in claimed or key in handled:
+            results.append({**result, "status": "ok", "duplicate": True})
+            continue
+
+        attempt = attempts.get(item.provider_payment_id)
+        if not attempt:
+            failed.append(key)
+            results.append({**result, "status": "error", "error": "attempt_not_found_for_provider_payment_id"})
+            continue
+
+        if not _already_applied(attempt, item.provider_event_id):
+            invoice = invoices.get(attempt.invoice_id)
+            if not invoice:
+                failed.append(key)
+                results.append({**result, "status": "error", "error": "invoice_not_found"})
+                continue
+            events.extend(
+                _apply_webhook_result(
+                    db, attempt, invoice, item.result, item.provider_event_id, item.error_code, item.error_message,
+                    balances, retries, touch=False,
+                )
+            )
+            touched.append(invoice.id)
+
+        handled.add(key)
+        results.append({**result, "status": "ok", "attempt_id": attempt.id, "attempt_status": attempt.status})
+
+    # Failed items commit with the batch, so their ledger rows must go
+    release_events(db, claimed, failed)
+    apply_balances(db, balances)
+    touch_invoices(db, touched)
+    apply_retry_plan(db, retries)
+    enqueue_events(db, events)
+    return results
+
+
+def pay_due_retries(db: Session, invoice_ids: Sequence[str], now: datetime | None = None) -> dict[str, int]:
+    """Runs the scheduled retries of `invoice_ids` that are due; returns counts by outcome.
+
+    Bulk `pay_invoice` with the same rules: the invoices are locked, an
+    invoice that is no longer open or has an attempt in flight gets no new
+    attempt, and a retry whose key was already used is not made again. The
+    retry rows are deleted either way. Invoice and schedule rows are locked
+    with SKIP LOCKED, so rows busy in a pay or webhook transaction are left
+    for a later run instead of waited on. The caller commits.
+    """
+    now = now or datetime.utcnow()
+    invoices = {
+        i.id: i
+        for i in db.execute(
+            select(Invoice).where(Invoice.id.in_(invoice_ids)).order_by(Invoice.id).with_for_update(skip_locked=True)
+        ).scalars()
+    } if invoice_ids else {}
+    if not invoices:
+        return {}
+
+    keys = {
+        invoice_id: retry_idempotency_key(invoice_id, retry_no)
+        for invoice_id, retry_no in db.execute(
+            select(PaymentRetrySchedule.invoice_id, PaymentRetrySchedule.retry_no)
+            .where(PaymentRetrySchedule.invoice_id.in_(invoices), PaymentRetrySchedule.due_at <= now)
+            .with_for_update(skip_locked=True)
         )
-    else:
-        attempt.status = "failed"
-        attempt.error_code = error_code
-        attempt.error_message = error_message
+    }
+    if not keys:
+        return {}
 
-        enqueue_event(
-            db,
-            event_type="payment_attempt_failed",
-            aggregate_type="invoice",
-            aggregate_id=invoice.id,
-            payload={
-                "invoice_id": invoice.id,
-                "attempt_id": attempt.id,
-                "provider_payment_id": provider_payment_id,
-                "error_code": error_code,
-            },
+    blocked: dict[str, str] = {}
+    for invoice_id, idempotency_key in db.execute(
+        select(PaymentAttempt.invoice_id, PaymentAttempt.idempotency_key).where(
+            PaymentAttempt.invoice_id.in_(keys),
+            or_(PaymentAttempt.idempotency_key.in_(keys.values()), PaymentAttempt.status == "requires_action"),
         )
+    ):
+        if idempotency_key == keys[invoice_id]:
+            blocked[invoice_id] = "already_attempted"
+        else:
+            blocked.setdefault(invoice_id, "attempt_pending")
 
-    attempt.provider_event_id_last = provider_event_id
-    return attempt
+    outcomes: dict[str, int] = {}
+    created: list[str] = []
+    for invoice_id, idempotency_key in sorted(keys.items()):
+        invoice = invoices[invoice_id]
+        outcome = f"invoice_{invoice.status}" if invoice.status != "open" else blocked.get(invoice_id, "created")
+        if outcome == "created":
+            _create_attempt(db, invoice, idempotency_key, touch=False)
+            created.append(invoice_id)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    touch_invoices(db, created)
+    db.execute(
+        delete(PaymentRetrySchedule)
+        .where(PaymentRetrySchedule.invoice_id.in_(keys))
+        .execution_options(synchronize_session=False)
+    )
+
+    def _count():
+        for outcome, n in outcomes.items():
+            DUNNING_RETRIES.inc(n, outcome=outcome)
+
+    on_commit(db, _count)
+    return outcomes
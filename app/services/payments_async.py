@@ -0,0 +1,95 @@
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+
+from app.infra.models import Invoice, PaymentAttempt
+from app.services.customer_balances import BalanceDeltas, apply_balances_async
+from app.services.dunning import RetryPlan, apply_retry_plan_async
+from app.services.outbox import enqueue_event
+from app.services.payments import (
+    _already_applied,
+    _apply_webhook_result,
+    _cached_attempt_status_query,
+    _check_invoice_payable,
+    _create_attempt,
+    _existing_attempt_query,
+    _replay_or_conflict,
+    pay_replay_cache,
+)
+from app.services.provider_events import claim_events_async
+
+# Async twins of app.services.payments for DB_ASYNC_MODE: same rules, awaited
+# I/O. Queries and state transitions are shared with the sync path.
+
+
+async def cached_pay_response_async(db: AsyncSession, replay_key: tuple[str, str]):
+    cached = pay_replay_cache.get(replay_key)
+    if cached is None:
+        return None
+    if (await db.execute(_cached_attempt_status_query(cached))).scalar_one_or_none() == cached.status:
+        return cached
+    pay_replay_cache.invalidate(replay_key)
+    await db.rollback()
+    return None
+
+
+async def pay_invoice_async(db: AsyncSession, invoice_id: str, idempotency_key: str) -> PaymentAttempt:
+    if not idempotency_key:
+        raise HTTPException(status_code=400, detail="idempotency_key_required")
+
+    # Row-lock invoice to avoid concurrent pay attempts for the same invoice
+    invoice = _check_invoice_payable((await db.execute(
+        select(Invoice).where(Invoice.id == invoice_id).with_for_update()
+    )).scalar_one_or_none())
+    db.info["invoice_locked_at"] = time.perf_counter()
+
+    existing = _replay_or_conflict(
+        (await db.execute(_existing_attempt_query(invoice_id, idempotency_key))).first()
+    )
+    if existing:
+        return existing
+
+    return _create_attempt(db, invoice, idempotency_key)
+
+
+async def handle_provider_webhook_async(
+    db: AsyncSession,
+    provider_payment_id: str,
+    result: str,
+    provider_event_id: str,
+    error_code: str | None,
+    error_message: str | None,
+):
+    if not await claim_events_async(db, [(provider_payment_id, provider_event_id)]):
+        return None
+
+    # locked as in handle_provider_webhook: concurrent callbacks apply once
+    attempt = (await db.execute(
+        select(PaymentAttempt).where(PaymentAttempt.provider_payment_id == provider_payment_id).with_for_update()
+    )).scalar_one_or_none()
+
+    if not attempt:
+        raise HTTPException(
+            status_code=404,
+            detail="attempt_not_found_for_provider_payment_id"
+        )
+
+    if _already_applied(attempt, provider_event_id):
+        return attempt
+
+    invoice = await db.get(Invoice, attempt.invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="invoice_not_found")
+
+    balances = BalanceDeltas()
+    retries = RetryPlan()
+    for evt in _apply_webhook_result(
+        db, attempt, invoice, result, provider_event_id, error_code, error_message, balances, retries
+    ):
+        enqueue_event(db, **evt)
+    await apply_balances_async(db, balances)
+    await apply_retry_plan_async(db, retries)
+
+    return attempt
@@ -0,0 +1,121 @@
+"""Duplicate detection for provider callbacks.
+
+Every applied callback is recorded in `processed_provider_events` with an
+INSERT IGNORE ... RETURNING: a single statement both checks and records the
+event, and the returned rows are the events that were new. A concurrent
+transaction inserting the same key makes the statement wait for it, so two
+deliveries of one event can never both be claimed. INSERT ... RETURNING is
+MariaDB-only (10.5+); MySQL has no RETURNING clause.
+
+The ledger is a dedupe window, not a permanent record: the retention worker
+prunes rows older than PROCESSED_EVENTS_RETENTION_DAYS. A redelivery after
+that is applied like a new callback, which the attempt's state rules turn
+into a no-op once the attempt is final.
+
+Keys known to be processed are also kept in a per-process LRU, so repeated
+redeliveries are rejected without touching the database at all. Keys only
+enter the cache once they are committed.
+"""
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import PROVIDER_EVENT_CACHE_SIZE, PROVIDER_EVENT_CACHE_TTL_SECONDS
+from app.infra.cache import TTLCache
+from app.infra.db import on_commit
+from app.infra.models import ProcessedProviderEvent
+
+EventKey = tuple[str, str]  # (provider_payment_id, provider_event_id)
+
+processed_events_cache = TTLCache("provider_events", PROVIDER_EVENT_CACHE_SIZE, PROVIDER_EVENT_CACHE_TTL_SECONDS)
+
+
+def _uncached(keys: Iterable[EventKey]) -> list[EventKey]:
+    pending: list[EventKey] = []
+    for key in keys:
+        if key not in pending and processed_events_cache.get(key) is None:
+            pending.append(key)
+    return pending
+
+
+def _claim_statement(keys: list[EventKey]):
+    now = datetime.utcnow()
+    return (
+        insert(ProcessedProviderEvent)
+        .prefix_with("IGNORE")
+        .values([{"provider_payment_id": p, "provider_event_id": e, "processed_at": now} for p, e in keys])
+        .returning(ProcessedProviderEvent.provider_payment_id, ProcessedProviderEvent.provider_event_id)
+    )
+
+
+def _remember(db: Session | AsyncSession, pending: list[EventKey], claimed: set[EventKey]) -> None:
+    for key in pending:
+        if key not in claimed:
+            # someone else's committed row made the insert skip it
+            processed_events_cache.set(key, True)
+    if claimed:
+        on_commit(db, lambda: [processed_events_cache.set(key, True) for key in claimed])
+
+
+def claim_events(db: Session, keys: Iterable[EventKey]) -> set[EventKey]:
+    """Records `keys` as processed and returns those that were not already."""
+    pending = _uncached(keys)
+    if not pending:
+        return set()
+    claimed = {tuple(row) for row in db.execute(_claim_statement(pending))}
+    _remember(db, pending, claimed)
+    return claimed
+
+
+async def claim_events_async(db: AsyncSession, keys: Iterable[EventKey]) -> set[EventKey]:
+    pending = _uncached(keys)
+    if not pending:
+        return set()
+    claimed = {tuple(row) for row in await db.execute(_claim_statement(pending))}
+    _remember(db, pending, claimed)
+    return claimed
+
+
+def release_events(db: Session, claimed: set[EventKey], keys: Iterable[EventKey]) -> None:
+    """Un-records events from `claimed` whose callback could not be applied.
+
+    Mutates `claimed` in place: it is the set the commit hook caches, so
+    released keys stay out of the cache and a redelivery is retried.
+    """
+    keys = [key for key in keys if key in claimed]
+    if keys:
+        claimed.difference_update(keys)
+        db.execute(
+            delete(ProcessedProviderEvent).where(
+                tuple_(ProcessedProviderEvent.provider_payment_id, ProcessedProviderEvent.provider_event_id).in_(keys)
+            )
+        )
+
+
+def prune_processed_events(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Deletes up to `batch_size` ledger rows processed before `cutoff`.
+
+    Oldest first through ix_processed_events_processed_at, locked with SKIP
+    LOCKED like the outbox archive batches. The caller commits.
+    """
+    keys = db.execute(
+        select(ProcessedProviderEvent.provider_payment_id, ProcessedProviderEvent.provider_event_id)
+        .where(ProcessedProviderEvent.processed_at < cutoff)
+        .order_by(ProcessedProviderEvent.processed_at.asc())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not keys:
+        return 0
+    db.execute(
+        delete(ProcessedProviderEvent)
+        .where(
+            tuple_(ProcessedProviderEvent.provider_payment_id, ProcessedProviderEvent.provider_event_id)
+            .in_([tuple(key) for key in keys])
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return len(keys)
@@ -0,0 +1,171 @@
+"""Provider settlement reconciliation.
+
+A settlement file is CSV without quoting, one settled payment per line:
+
+    provider_payment_id,status,amount_cents,currency
+
+`status` is `succeeded` or `failed`. A header line is optional. Files are
+split at line boundaries into byte ranges that worker processes parse
+independently (`parse_chunk` maps the file itself, so only offsets and
+parsed tuples cross process boundaries). The parent checks each chunk
+against the database in IN-list lookups on uq_provider_payment_id.
+"""
+import mmap
+from typing import Iterator, NamedTuple, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.infra.models import Invoice, PaymentAttempt
+
+SETTLEMENT_STATUSES = ("succeeded", "failed")
+_HEADER = b"provider_payment_id,"
+
+
+class SettlementRow(NamedTuple):
+    provider_payment_id: str
+    status: str
+    amount_cents: int
+    currency: str
+
+
+class LocalPayment(NamedTuple):
+    attempt_id: str
+    attempt_status: str
+    invoice_id: str
+    invoice_status: str
+    amount_cents: int
+    currency: str
+
+
+def chunk_ranges(path: str, chunk_bytes: int) -> list[tuple[int, int]]:
+    """Byte ranges of about `chunk_bytes`, each ending at a line boundary."""
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = []
+            start = 0
+            while start < size:
+                end = start + chunk_bytes
+                if end < size:
+                    newline = mm.find(b"\n", end - 1)
+                    end = size if newline == -1 else newline + 1
+                ranges.append((start, min(end, size)))
+                start = end
+            return ranges
+
+
+def parse_chunk(path: str, start: int, end: int) -> tuple[list[SettlementRow], list[dict]]:
+    """Parses lines in [start, end); returns rows and per-line errors.
+
+    Runs in pool workers. Errors carry the line's byte offset, as line
+    numbers would need every earlier chunk to be counted first.
+    """
+    rows: list[SettlementRow] = []
+    errors: list[dict] = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    offset = start
+    for line in data.split(b"\n"):
+        line_offset, offset = offset, offset + len(line) + 1
+        line = line.strip()
+        if not line or (line_offset == 0 and line.startswith(_HEADER)):
+            continue
+        parts = line.split(b",")
+        if len(parts) != 4:
+            errors.append({"offset": line_offset, "error": "wrong_field_count"})
+            continue
+        try:
+            provider_payment_id, status, amount, currency = (p.strip().decode() for p in parts)
+        except UnicodeDecodeError:
+            errors.append({"offset": line_offset, "error": "invalid_encoding"})
+            continue
+        if status not in SETTLEMENT_STATUSES:
+            errors.append({"offset": line_offset, "error": "unknown_status"})
+            continue
+        try:
+            amount_cents = int(amount)
+        except ValueError:
+            errors.append({"offset": line_offset, "error": "invalid_amount"})
+            continue
+        rows.append(SettlementRow(provider_payment_id, status, amount_cents, currency.upper()))
+    return rows, errors
+
+
+def lookup_payments(db: Session, provider_payment_ids: Sequence[str], batch_size: int) -> dict[str, LocalPayment]:
+    found: dict[str, LocalPayment] = {}
+    ids = list(dict.fromkeys(provider_payment_ids))
+    for i in range(0, len(ids), batch_size):
+        for ppid, *local in db.execute(
+            select(
+                PaymentAttempt.provider_payment_id,
+                PaymentAttempt.id,
+                PaymentAttempt.status,
+                Invoice.id,
+                Invoice.status,
+                Invoice.amount_cents,
+                Invoice.currency,
+            )
+            .join(Invoice, Invoice.id == PaymentAttempt.invoice_id)
+            .where(PaymentAttempt.provider_payment_id.in_(ids[i:i + batch_size]))
+        ):
+            found[ppid] = LocalPayment(*local)
+    return found
+
+
+def compare(row: SettlementRow, local: LocalPayment | None) -> list[str]:
+    """Mismatch types between a settlement line and our records."""
+    if local is None:
+        return ["unknown_provider_payment_id"]
+    mismatches = []
+    if row.status == "succeeded":
+        if local.invoice_status != "paid":
+            mismatches.append("not_paid_locally")
+        elif local.attempt_status != "succeeded":
+            # paid through another attempt: the customer may be charged twice
+            mismatches.append("attempt_not_succeeded")
+    elif local.attempt_status == "succeeded":
+        mismatches.append("failed_at_provider")
+    if row.amount_cents != local.amount_cents:
+        mismatches.append("amount_mismatch")
+    if row.currency != local.currency.upper():
+        mismatches.append("currency_mismatch")
+    return mismatches
+
+
+def reconcile_rows(
+    db: Session, rows: Sequence[SettlementRow], lookup_batch_size: int
+) -> Iterator[dict]:
+    """Report records for the rows that do not match."""
+    local = lookup_payments(db, [r.provider_payment_id for r in rows], lookup_batch_size)
+    for row in rows:
+        payment = local.get(row.provider_payment_id)
+        mismatches = compare(row, payment)
+        if mismatches:
+            yield {
+                "provider_payment_id": row.provider_payment_id,
+                "mismatches": mismatches,
+                "provider": {"status": row.status, "amount_cents": row.amount_cents, "currency": row.currency},
+                "local": payment._asdict() if payment else None,
+            }
+
+
+def mismatch_event(record: dict) -> dict | None:
+    """Outbox event for a report record, or None for unknown payments."""
+    local = record["local"]
+    if local is None:
+        return None
+    return dict(
+        event_type="settlement_mismatch",
+        aggregate_type="invoice",
+        aggregate_id=local["invoice_id"],
+        payload={
+            "invoice_id": local["invoice_id"],
+            "attempt_id": local["attempt_id"],
+            "provider_payment_id": record["provider_payment_id"],
+            "mismatches": record["mismatches"],
+            "provider": record["provider"],
+        },
+    )
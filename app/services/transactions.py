@@ -0,0 +1,103 @@
+"""Transaction runner with replay on deadlocks and lock wait timeouts.
+
+A use case is passed in as a unit of work: a function that does all its
+reads and writes on the given session and returns the response. The runner
+commits it. On MySQL error 1213 (deadlock; InnoDB already rolled the
+transaction back) or 1205 (lock wait timeout), it rolls back and replays
+the whole unit of work after a jittered backoff. The unit of work must
+therefore re-read everything it depends on, and it must not have side
+effects outside the session. on_commit callbacks are fine: a rollback drops
+them.
+
+Replays are bounded by TX_RETRY_MAX_ATTEMPTS and TX_RETRY_BUDGET_SECONDS.
+Past either limit the request fails with 503 and a Retry-After header,
+never a 500, so well-behaved clients back off instead of retrying at full
+speed.
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    TX_RETRY_BASE_DELAY_SECONDS,
+    TX_RETRY_BUDGET_SECONDS,
+    TX_RETRY_MAX_ATTEMPTS,
+    TX_RETRY_MAX_DELAY_SECONDS,
+)
+from app.infra.metrics import Counter
+
+T = TypeVar("T")
+
+RETRYABLE_MYSQL_ERRORS = {1213: "deadlock", 1205: "lock_wait_timeout"}
+
+TX_RETRIES = Counter("db_transaction_retries_total", "Units of work replayed after a retryable error.", ("operation", "reason"))
+TX_EXHAUSTED = Counter(
+    "db_transaction_retries_exhausted_total", "Units of work that failed with 503 after their retry budget.",
+    ("operation", "reason"),
+)
+
+
+def retry_reason(exc: BaseException) -> str | None:
+    """"deadlock" / "lock_wait_timeout" for retryable driver errors, else None."""
+    if not isinstance(exc, DBAPIError):
+        return None
+    args = getattr(exc.orig, "args", ())
+    return RETRYABLE_MYSQL_ERRORS.get(args[0]) if args and isinstance(args[0], int) else None
+
+
+def backoff_delay(attempt: int) -> float:
+    # Full jitter: spreads the replays of transactions that collided
+    return random.uniform(0, min(TX_RETRY_MAX_DELAY_SECONDS, TX_RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1)))
+
+
+def _next_delay(operation: str, reason: str, attempt: int, started: float) -> float:
+    delay = backoff_delay(attempt)
+    if attempt >= TX_RETRY_MAX_ATTEMPTS or time.monotonic() - started + delay > TX_RETRY_BUDGET_SECONDS:
+        TX_EXHAUSTED.inc(operation=operation, reason=reason)
+        raise HTTPException(status_code=503, detail="transaction_conflict", headers={"Retry-After": "1"})
+    TX_RETRIES.inc(operation=operation, reason=reason)
+    return delay
+
+
+def run_in_transaction(db: Session, operation: str, unit_of_work: Callable[[Session], T]) -> T:
+    started = time.monotonic()
+    attempt = 1
+    while True:
+        try:
+            result = unit_of_work(db)
+            db.commit()
+            return result
+        except DBAPIError as exc:
+            reason = retry_reason(exc)
+            db.rollback()
+            if reason is None:
+                raise
+            delay = _next_delay(operation, reason, attempt, started)
+        time.sleep(delay)
+        attempt += 1
+
+
+async def run_in_transaction_async(
+    db: AsyncSession, operation: str, unit_of_work: Callable[[AsyncSession], Awaitable[T]]
+) -> T:
+    started = time.monotonic()
+    attempt = 1
+    while True:
+        try:
+            result = await unit_of_work(db)
+            await db.commit()
+            return result
+        except DBAPIError as exc:
+            reason = retry_reason(exc)
+            await db.rollback()
+            if reason is None:
+                raise
+            delay = _next_delay(operation, reason, attempt, started)
+        await asyncio.sleep(delay)
+        attempt += 1
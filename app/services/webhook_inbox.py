@@ -0,0 +1,69 @@
+import zlib
+from datetime import datetime
+from itertools import groupby
+from typing import Sequence
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import WEBHOOK_INBOX_SHARDS
+from app.infra.models import WebhookInboxEntry
+from app.schemas.payment import ProviderWebhookRequest
+from app.services.payments import handle_provider_webhook_batch
+
+
+def shard_for(provider_payment_id: str, shards: int = WEBHOOK_INBOX_SHARDS) -> int:
+    # crc32 rather than hash(): it has to be stable across processes
+    return zlib.crc32(provider_payment_id.encode()) % shards
+
+
+def worker_shards(worker_no: int, processes: int, shards: int = WEBHOOK_INBOX_SHARDS) -> list[int]:
+    return [s for s in range(shards) if s % processes == worker_no]
+
+
+def inbox_insert(payload: ProviderWebhookRequest):
+    """The single INSERT that acknowledges a callback in inbox mode."""
+    return insert(WebhookInboxEntry).values(
+        shard=shard_for(payload.provider_payment_id),
+        provider_payment_id=payload.provider_payment_id,
+        payload=payload.model_dump(),
+    )
+
+
+def append_webhook(db: Session, payload: ProviderWebhookRequest) -> None:
+    db.execute(inbox_insert(payload))
+
+
+def process_inbox_batch(db: Session, shards: Sequence[int], limit: int) -> int:
+    """Applies up to `limit` pending callbacks from `shards`, oldest first.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED and applied with
+    `handle_provider_webhook_batch` in the caller's transaction. Callbacks
+    that fail validation against the current state (unknown payment, ...)
+    are marked processed with their error rather than retried. Returns the
+    number of rows handled.
+    """
+    rows = db.execute(
+        select(WebhookInboxEntry.id, WebhookInboxEntry.payload)
+        .where(WebhookInboxEntry.processed_at.is_(None), WebhookInboxEntry.shard.in_(shards))
+        .order_by(WebhookInboxEntry.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+
+    results = handle_provider_webhook_batch(db, [ProviderWebhookRequest.model_validate(r.payload) for r in rows])
+
+    now = datetime.utcnow()
+    outcomes = sorted(
+        ((res["status"], res.get("error"), row.id) for row, res in zip(rows, results)),
+        key=lambda o: (o[0], o[1] or ""),
+    )
+    for (status, error), group in groupby(outcomes, key=lambda o: (o[0], o[1])):
+        db.execute(
+            update(WebhookInboxEntry)
+            .where(WebhookInboxEntry.id.in_([o[2] for o in group]))
+            .values(processed_at=now, status=status, error=error)
+        )
+    return len(rows)
@@ -0,0 +1,161 @@
+"""Dunning worker: runs scheduled retries of failed payments when they are due.
+
+The worker keeps the retries due within DUNNING_LOOKAHEAD_SECONDS in a
+min-heap on due_at, loaded from an index range of ix_retry_schedule_due (at
+most DUNNING_HEAP_SIZE entries). It sleeps until the earliest entry is due
+or the next reload, whichever comes first. Entries that are due are popped
+in batches of DUNNING_BATCH_SIZE and run by `pay_due_retries`, one
+transaction per batch. Each batch creates its attempts together and
+deletes its schedule rows with one DELETE. payment_attempts is never
+scanned. A backlog of due retries drains batch after batch without waiting
+for the next reload.
+
+The heap is only a wake-up plan: the table stays the source of truth.
+`pay_due_retries` checks every row again under lock, so a stale entry, or
+one another worker process got to first, is a no-op. Reloads every
+DUNNING_POLL_INTERVAL_SECONDS pick up retries scheduled in the meantime.
+
+    python -m app.workers.dunning
+    python -m app.workers.dunning --once     # run what is due now and exit
+"""
+import argparse
+import heapq
+import logging
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.core.config import (
+    DUNNING_BATCH_SIZE,
+    DUNNING_HEAP_SIZE,
+    DUNNING_LOOKAHEAD_SECONDS,
+    DUNNING_POLL_INTERVAL_SECONDS,
+)
+from app.infra.db import SessionLocal
+from app.services.dunning import load_due
+from app.services.payments import pay_due_retries
+
+logger = logging.getLogger("app.workers.dunning")
+
+
+class RetryHeap:
+    """Min-heap of (due_at, invoice_id), one entry per invoice."""
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[datetime, str]] = []
+        self._queued: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, entries) -> None:
+        for due_at, invoice_id in entries:
+            if invoice_id not in self._queued:
+                self._queued.add(invoice_id)
+                heapq.heappush(self._heap, (due_at, invoice_id))
+
+    def next_due(self) -> datetime | None:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime, limit: int) -> list[str]:
+        due = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            _, invoice_id = heapq.heappop(self._heap)
+            self._queued.discard(invoice_id)
+            due.append(invoice_id)
+        return due
+
+
+def reload(heap: RetryHeap, lookahead: float = DUNNING_LOOKAHEAD_SECONDS, heap_size: int = DUNNING_HEAP_SIZE) -> bool:
+    """Adds the retries due within `lookahead`; True if more were left out."""
+    db = SessionLocal()
+    try:
+        entries = load_due(db, datetime.utcnow() + timedelta(seconds=lookahead), heap_size)
+    finally:
+        db.close()
+    heap.push(entries)
+    return len(entries) >= heap_size
+
+
+def run_batch(invoice_ids: list[str]) -> dict[str, int]:
+    db = SessionLocal()
+    try:
+        outcomes = pay_due_retries(db, invoice_ids)
+        db.commit()
+        return outcomes
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run(
+    batch_size: int = DUNNING_BATCH_SIZE,
+    lookahead: float = DUNNING_LOOKAHEAD_SECONDS,
+    heap_size: int = DUNNING_HEAP_SIZE,
+    poll_interval: float = DUNNING_POLL_INTERVAL_SECONDS,
+    stop: threading.Event | None = None,
+    once: bool = False,
+) -> int:
+    """Runs due retries until stopped (or, with `once`, until none is due); returns attempts created."""
+    stop = stop or threading.Event()
+    heap = RetryHeap()
+    created = 0
+    next_reload = 0.0
+    truncated = False
+    while not stop.is_set():
+        if time.monotonic() >= next_reload or (truncated and not heap):
+            try:
+                truncated = reload(heap, 0 if once else lookahead, heap_size)
+            except Exception:
+                logger.exception("loading the retry schedule failed; retrying")
+                stop.wait(poll_interval)
+                continue
+            next_reload = time.monotonic() + poll_interval
+
+        due = heap.pop_due(datetime.utcnow(), batch_size)
+        if due:
+            try:
+                outcomes = run_batch(due)
+            except Exception:
+                # The rows are still scheduled: the next reload brings them back
+                logger.exception("dunning batch failed")
+                continue
+            created += outcomes.get("created", 0)
+            logger.info("ran %d retries: %s", sum(outcomes.values()), outcomes)
+            continue
+
+        if once and not heap and not truncated:
+            break
+
+        wake = next_reload - time.monotonic()
+        next_due = heap.next_due()
+        if next_due is not None:
+            wake = min(wake, (next_due - datetime.utcnow()).total_seconds())
+        stop.wait(max(wake, 0.0))
+    return created
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run scheduled payment retries.")
+    parser.add_argument("--batch-size", type=int, default=DUNNING_BATCH_SIZE)
+    parser.add_argument("--lookahead", type=float, default=DUNNING_LOOKAHEAD_SECONDS)
+    parser.add_argument("--heap-size", type=int, default=DUNNING_HEAP_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=DUNNING_POLL_INTERVAL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="run the retries due now and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s dunning %(message)s")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    started = time.perf_counter()
+    created = run(args.batch_size, args.lookahead, args.heap_size, args.poll_interval, stop, args.once)
+    logger.info("created %d retry attempts in %.1fs", created, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Outbox relay worker.
+
+Drains `outbox_events` into a broker in batches. Each iteration claims up to
+`batch_size` pending rows with FOR UPDATE SKIP LOCKED, publishes them, marks
+them with one bulk UPDATE and commits, so any number of relay processes can
+run side by side without double publishing.
+
+Delivery is at-least-once: if a relay dies after publishing but before the
+commit, the batch becomes visible again and is published a second time.
+
+    python -m app.workers.outbox_relay --processes 4 --publisher file
+    python -m app.workers.outbox_relay --publisher provider    # charge requests to PAYMENT_PROVIDER_URL
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from app.core.config import (
+    OUTBOX_PUBLISHER,
+    OUTBOX_PUBLISHER_FILE,
+    OUTBOX_RELAY_BATCH_SIZE,
+    OUTBOX_RELAY_POLL_INTERVAL_SECONDS,
+)
+from app.infra.db import SessionLocal, engine
+from app.infra.publishers import Publisher, build_publisher
+from app.services.outbox import publish_pending
+
+logger = logging.getLogger("app.workers.outbox_relay")
+
+
+def relay_once(publisher: Publisher, batch_size: int = OUTBOX_RELAY_BATCH_SIZE) -> int:
+    db = SessionLocal()
+    try:
+        count = publish_pending(db, limit=batch_size, publisher=publisher)
+        db.commit()
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run(
+    publisher: Publisher,
+    batch_size: int = OUTBOX_RELAY_BATCH_SIZE,
+    poll_interval: float = OUTBOX_RELAY_POLL_INTERVAL_SECONDS,
+    stop: threading.Event | None = None,
+) -> int:
+    stop = stop or threading.Event()
+    total = 0
+    while not stop.is_set():
+        try:
+            count = relay_once(publisher, batch_size)
+        except Exception:
+            logger.exception("outbox relay batch failed; retrying")
+            stop.wait(poll_interval)
+            continue
+        total += count
+        # A full batch means there is probably more waiting: loop immediately.
+        if count < batch_size:
+            stop.wait(poll_interval)
+    return total
+
+
+def _worker(worker_no: int, args: argparse.Namespace) -> None:
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s relay[{worker_no}] %(message)s")
+    # Never share pooled connections inherited from a parent process.
+    engine.dispose(close=False)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    publisher = build_publisher(args.publisher, args.file)
+    if args.once:
+        started = time.perf_counter()
+        total = 0
+        while True:
+            count = relay_once(publisher, args.batch_size)
+            total += count
+            if count < args.batch_size:
+                break
+        logger.info("drained %d events in %.3fs", total, time.perf_counter() - started)
+        return
+
+    total = run(publisher, args.batch_size, args.poll_interval, stop)
+    logger.info("stopped after publishing %d events", total)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Publish pending outbox events.")
+    parser.add_argument("--publisher", default=OUTBOX_PUBLISHER, choices=["memory", "file", "provider"])
+    parser.add_argument("--file", default=OUTBOX_PUBLISHER_FILE, help="target file for --publisher file")
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_RELAY_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=OUTBOX_RELAY_POLL_INTERVAL_SECONDS)
+    parser.add_argument("--processes", type=int, default=1, help="number of relay processes")
+    parser.add_argument("--once", action="store_true", help="drain the table and exit")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        _worker(0, args)
+        return
+
+    procs = [
+        multiprocessing.Process(target=_worker, args=(n, args), name=f"outbox-relay-{n}")
+        for n in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in procs])
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Outbox retention worker.
+
+Keeps `outbox_events` small: published events older than
+OUTBOX_RETENTION_DAYS are copied to `outbox_events_archive` and deleted from
+the hot table in batches of OUTBOX_RETENTION_BATCH_SIZE, one short
+transaction per batch with a pause in between, then the worker sleeps until
+the next run. Pending (unpublished) events are never touched.
+
+Each pass also prunes the webhook dedupe ledger (`processed_provider_events`)
+of rows older than PROCESSED_EVENTS_RETENTION_DAYS, in batches of the same
+size.
+
+    python -m app.workers.outbox_retention            # scheduled loop
+    python -m app.workers.outbox_retention --once     # single pass, e.g. from cron
+"""
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.config import (
+    OUTBOX_RETENTION_BATCH_PAUSE_SECONDS,
+    OUTBOX_RETENTION_BATCH_SIZE,
+    OUTBOX_RETENTION_DAYS,
+    OUTBOX_RETENTION_INTERVAL_SECONDS,
+    PROCESSED_EVENTS_RETENTION_DAYS,
+)
+from app.infra.db import SessionLocal
+from app.services.outbox_retention import archive_published_batch, retention_cutoff
+from app.services.provider_events import prune_processed_events
+
+logger = logging.getLogger("app.workers.outbox_retention")
+
+
+def _in_batches(step, batch_size: int, pause: float, stop: threading.Event) -> int:
+    total = 0
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            done = step(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        total += done
+        if done < batch_size:
+            break
+        stop.wait(pause)
+    return total
+
+
+def run_once(
+    days: float = OUTBOX_RETENTION_DAYS,
+    batch_size: int = OUTBOX_RETENTION_BATCH_SIZE,
+    pause: float = OUTBOX_RETENTION_BATCH_PAUSE_SECONDS,
+    stop: threading.Event | None = None,
+    processed_events_days: float = PROCESSED_EVENTS_RETENTION_DAYS,
+) -> int:
+    """Returns the number of archived events."""
+    stop = stop or threading.Event()
+    # Fixed for the whole pass so the pass terminates even under new traffic
+    cutoff = retention_cutoff(days)
+    moved = _in_batches(lambda db: archive_published_batch(db, cutoff, batch_size), batch_size, pause, stop)
+
+    ledger_cutoff = retention_cutoff(processed_events_days)
+    pruned = _in_batches(lambda db: prune_processed_events(db, ledger_cutoff, batch_size), batch_size, pause, stop)
+    logger.info("pruned %d processed provider events", pruned)
+    return moved
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Archive published outbox events.")
+    parser.add_argument("--days", type=float, default=OUTBOX_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_RETENTION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=OUTBOX_RETENTION_BATCH_PAUSE_SECONDS)
+    parser.add_argument("--interval", type=float, default=OUTBOX_RETENTION_INTERVAL_SECONDS)
+    parser.add_argument("--processed-events-days", type=float, default=PROCESSED_EVENTS_RETENTION_DAYS)
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s outbox-retention %(message)s")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    while not stop.is_set():
+        try:
+            moved = run_once(args.days, args.batch_size, args.pause, stop, args.processed_events_days)
+            logger.info("archived %d events", moved)
+        except Exception:
+            logger.exception("retention pass failed")
+        if args.once:
+            break
+        stop.wait(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Webhook inbox worker.
+
+Applies provider callbacks that `POST /webhooks/payment-provider` queued in
+`webhook_inbox` (WEBHOOK_INGEST_MODE=inbox). Each iteration claims up to
+`batch_size` pending rows of this worker's shards with FOR UPDATE SKIP
+LOCKED, applies them through `handle_provider_webhook_batch`, marks them
+processed and commits, all in one transaction.
+
+Shards are split between processes (shard % processes == worker number),
+so every payment is handled by exactly one process, in arrival order.
+
+    python -m app.workers.webhook_inbox --processes 4
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Sequence
+
+from app.core.config import (
+    WEBHOOK_INBOX_BATCH_SIZE,
+    WEBHOOK_INBOX_POLL_INTERVAL_SECONDS,
+    WEBHOOK_INBOX_SHARDS,
+)
+from app.infra.db import SessionLocal, engine
+from app.services.webhook_inbox import process_inbox_batch, worker_shards
+
+logger = logging.getLogger("app.workers.webhook_inbox")
+
+
+def process_once(shards: Sequence[int], batch_size: int = WEBHOOK_INBOX_BATCH_SIZE) -> int:
+    db = SessionLocal()
+    try:
+        count = process_inbox_batch(db, shards, batch_size)
+        db.commit()
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run(
+    shards: Sequence[int],
+    batch_size: int = WEBHOOK_INBOX_BATCH_SIZE,
+    poll_interval: float = WEBHOOK_INBOX_POLL_INTERVAL_SECONDS,
+    stop: threading.Event | None = None,
+) -> int:
+    stop = stop or threading.Event()
+    total = 0
+    while not stop.is_set():
+        try:
+            count = process_once(shards, batch_size)
+        except Exception:
+            logger.exception("webhook inbox batch failed; retrying")
+            stop.wait(poll_interval)
+            continue
+        total += count
+        if count < batch_size:
+            stop.wait(poll_interval)
+    return total
+
+
+def _worker(worker_no: int, args: argparse.Namespace) -> None:
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s inbox[{worker_no}] %(message)s")
+    engine.dispose(close=False)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    shards = worker_shards(worker_no, args.processes, args.shards)
+    if args.once:
+        started = time.perf_counter()
+        total = 0
+        while True:
+            count = process_once(shards, args.batch_size)
+            total += count
+            if count < args.batch_size:
+                break
+        logger.info("applied %d callbacks from shards %s in %.3fs", total, shards, time.perf_counter() - started)
+        return
+
+    total = run(shards, args.batch_size, args.poll_interval, stop)
+    logger.info("stopped after applying %d callbacks", total)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply queued provider webhooks.")
+    parser.add_argument("--batch-size", type=int, default=WEBHOOK_INBOX_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=WEBHOOK_INBOX_POLL_INTERVAL_SECONDS)
+    parser.add_argument("--shards", type=int, default=WEBHOOK_INBOX_SHARDS, help="must match the API's WEBHOOK_INBOX_SHARDS")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--once", action="store_true", help="drain the inbox and exit")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        args.processes = 1
+        _worker(0, args)
+        return
+
+    procs = [
+        multiprocessing.Process(target=_worker, args=(n, args), name=f"webhook-inbox-{n}")
+        for n in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in procs])
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Single vs batched invoice creation throughput.
+
+Runs POST /invoices for --duration seconds, then POST /invoices/batch with
+--batch-size invoices per request for the same time, and reports invoices/s
+for both plus the speedup:
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.invoice_create --batch-size 1000 --out create.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from benchmarks.stats import LatencyRecorder, print_summary
+
+
+def _invoice(rng: random.Random) -> dict:
+    return {"amount_cents": rng.randint(100, 100_000), "currency": "EUR", "customer_ref": f"cust_{rng.randint(1, 1000)}"}
+
+
+async def _phase(client: httpx.AsyncClient, concurrency: int, duration: float, batch_size: int) -> tuple[dict, int]:
+    rec = LatencyRecorder()
+    rng = random.Random(1)
+    created = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal created
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if batch_size <= 1:
+                r = await client.post("/invoices", json=_invoice(rng))
+                rec.record("POST /invoices", time.perf_counter() - started, r.status_code)
+                created += r.status_code == 200
+            else:
+                r = await client.post("/invoices/batch", json=[_invoice(rng) for _ in range(batch_size)])
+                rec.record("POST /invoices/batch", time.perf_counter() - started, r.status_code)
+                if r.status_code == 200:
+                    created += sum(1 for x in r.json() if x["status"] == "created")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    summary = rec.summary(elapsed)
+    summary["invoices_per_s"] = round(created / elapsed, 2) if elapsed else 0.0
+    return summary, created
+
+
+async def run(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as client:
+        single, _ = await _phase(client, args.concurrency, args.duration, 1)
+        batch, _ = await _phase(client, args.concurrency, args.duration, args.batch_size)
+    speedup = round(batch["invoices_per_s"] / single["invoices_per_s"], 1) if single["invoices_per_s"] else None
+    return {"single": single, "batch": batch, "speedup": speedup}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per phase")
+    parser.add_argument("--batch-size", type=int, default=1000, help="invoices per POST /invoices/batch")
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    for phase in ("single", "batch"):
+        print_summary(result[phase])
+        print(f"{phase}: {result[phase]['invoices_per_s']} invoices/s\n")
+    print(f"speedup: {result['speedup']}x")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
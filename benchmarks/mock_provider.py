@@ -0,0 +1,257 @@
+"""Mock payment provider for end-to-end load tests on one machine.
+
+Takes charge requests on POST /charges. The outbox relay sends them with
+--publisher provider. Each charge is answered with webhooks to the API's
+POST /webhooks/payment-provider, shaped by these options:
+
+- --latency: delay before the webhook, as a distribution.
+  fixed:0.2 | uniform:0.05,0.5 | exp:0.2 (mean) | lognormal:0.2,0.8 (median, sigma)
+- --failure-rate: share of charges that fail. The error_code is drawn
+  from --error-codes
+- --duplicate-rate: share of final webhooks delivered a second time
+- --out-of-order-rate: share of charges where an older event with the
+  opposite outcome arrives after the final one
+
+Like a real provider, it retries a delivery that gets a 5xx or no answer,
+with backoff. Charges are deduplicated by provider_payment_id, because the
+relay delivers at least once.
+
+GET /stats returns counters. With ?payments=1 it also returns, per payment,
+when the charge arrived and when the API acknowledged its final webhook.
+benchmarks.provider_e2e reads this. POST /reset clears both.
+
+    python -m benchmarks.mock_provider --port 9000 --api-url http://localhost:8000 \\
+        --latency lognormal:0.2,0.8 --failure-rate 0.1 --duplicate-rate 0.2 --out-of-order-rate 0.05
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Sequence
+
+import httpx
+from fastapi import Body, FastAPI
+
+Deliver = Callable[[dict], Awaitable[int]]
+
+
+class Latency:
+    """A delay distribution in seconds, parsed from "kind:param,param"."""
+
+    _PARAMS = {"fixed": 1, "uniform": 2, "exp": 1, "lognormal": 2}
+
+    def __init__(self, spec: str) -> None:
+        kind, _, params = spec.partition(":")
+        values = [float(p) for p in params.split(",") if p.strip()]
+        if self._PARAMS.get(kind) != len(values) or any(v < 0 for v in values):
+            raise ValueError(f"invalid latency {spec!r}; expected one of fixed:S, uniform:MIN,MAX, exp:MEAN, lognormal:MEDIAN,SIGMA")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.values[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.values)
+        if self.kind == "exp":
+            return rng.expovariate(1 / self.values[0]) if self.values[0] else 0.0
+        median, sigma = self.values
+        return rng.lognormvariate(math.log(median), sigma) if median else 0.0
+
+
+class Behaviour:
+    def __init__(
+        self,
+        latency: Latency,
+        failure_rate: float = 0.0,
+        duplicate_rate: float = 0.0,
+        out_of_order_rate: float = 0.0,
+        error_codes: Sequence[str] = ("card_declined",),
+    ) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.duplicate_rate = duplicate_rate
+        self.out_of_order_rate = out_of_order_rate
+        self.error_codes = list(error_codes)
+
+
+def _webhook(provider_payment_id: str, result: str, rng: random.Random, error_code: str | None = None) -> dict:
+    body = {
+        "provider_payment_id": provider_payment_id,
+        "result": result,
+        "provider_event_id": f"evt_{rng.getrandbits(80):020x}",
+    }
+    if result == "failed":
+        body["error_code"] = error_code or "card_declined"
+        body["error_message"] = "Declined by mock provider"
+    return body
+
+
+def plan_webhooks(charge: dict, behaviour: Behaviour, rng: random.Random) -> list[tuple[float, dict, bool]]:
+    """(delay, body, is_final) for every webhook one charge produces, in delivery order."""
+    provider_payment_id = charge["provider_payment_id"]
+    failed = rng.random() < behaviour.failure_rate
+    final = _webhook(
+        provider_payment_id, "failed" if failed else "succeeded", rng,
+        rng.choice(behaviour.error_codes) if failed else None,
+    )
+    delay = behaviour.latency.sample(rng)
+    plan = [(delay, final, True)]
+    if rng.random() < behaviour.duplicate_rate:
+        delay += behaviour.latency.sample(rng)
+        plan.append((delay, final, False))
+    if rng.random() < behaviour.out_of_order_rate:
+        # an older event with the opposite outcome, arriving last
+        delay += behaviour.latency.sample(rng)
+        plan.append((delay, _webhook(provider_payment_id, "succeeded" if failed else "failed", rng), False))
+    return plan
+
+
+class MockProvider:
+    def __init__(
+        self,
+        behaviour: Behaviour,
+        deliver: Deliver,
+        seed: int | None = None,
+        max_retries: int = 8,
+        max_in_flight: int = 64,
+    ) -> None:
+        self.behaviour = behaviour
+        self.deliver = deliver
+        self.rng = random.Random(seed)
+        self.max_retries = max_retries
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._tasks: set[asyncio.Task] = set()
+        self.reset()
+
+    def reset(self) -> None:
+        self.received: dict[str, float] = {}
+        self.completed: dict[str, float] = {}
+        self.counts: Counter = Counter()
+        self.scheduled = 0
+
+    def accept(self, charges: Sequence[dict]) -> dict:
+        loop = asyncio.get_running_loop()
+        accepted = 0
+        for charge in charges:
+            provider_payment_id = charge["provider_payment_id"]
+            if provider_payment_id in self.received:
+                continue
+            self.received[provider_payment_id] = time.time()
+            accepted += 1
+            plan = plan_webhooks(charge, self.behaviour, self.rng)
+            self.scheduled += len(plan)
+            task = loop.create_task(self._deliver_plan(plan))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self.counts["charges"] += accepted
+        self.counts["duplicate_charges"] += len(charges) - accepted
+        return {"accepted": accepted, "duplicates": len(charges) - accepted}
+
+    async def _deliver_plan(self, plan: list[tuple[float, dict, bool]]) -> None:
+        # one charge's webhooks go out one after another, so "arrives after" holds even at zero latency
+        started = time.perf_counter()
+        for delay, body, final in plan:
+            await asyncio.sleep(max(0.0, started + delay - time.perf_counter()))
+            try:
+                await self._deliver(body, final)
+            finally:
+                self.scheduled -= 1
+
+    async def _deliver(self, body: dict, final: bool) -> None:
+        for attempt in range(self.max_retries + 1):
+            async with self._in_flight:
+                try:
+                    status = await self.deliver(body)
+                except httpx.HTTPError:
+                    status = 0
+            self.counts[f"webhook_{status}"] += 1
+            if 0 < status < 500:
+                # 4xx is a bug on one side or the other: retrying will not help
+                if final and status < 300:
+                    self.completed.setdefault(body["provider_payment_id"], time.time())
+                return
+            await asyncio.sleep(self.rng.uniform(0, min(5.0, 0.1 * 2 ** attempt)))
+        self.counts["webhooks_abandoned"] += 1
+
+    def stats(self, payments: bool = False) -> dict:
+        result = {
+            "charges": len(self.received),
+            "completed": len(self.completed),
+            "pending_webhooks": self.scheduled,
+            "counts": dict(sorted(self.counts.items())),
+        }
+        if payments:
+            result["payments"] = {
+                ppid: [received, self.completed.get(ppid)] for ppid, received in self.received.items()
+            }
+        return result
+
+
+def create_app(provider: MockProvider) -> FastAPI:
+    app = FastAPI(title="mock payment provider")
+
+    @app.post("/charges", status_code=202)
+    async def charges(items: list[dict] = Body(...)):
+        return provider.accept(items)
+
+    @app.get("/stats")
+    async def stats(payments: bool = False):
+        return provider.stats(payments)
+
+    @app.post("/reset")
+    async def reset():
+        provider.reset()
+        return {"status": "ok"}
+
+    return app
+
+
+def http_deliver(api_url: str, max_connections: int) -> Deliver:
+    client = httpx.AsyncClient(
+        base_url=api_url, timeout=30, limits=httpx.Limits(max_connections=max_connections)
+    )
+
+    async def deliver(body: dict) -> int:
+        r = await client.post("/webhooks/payment-provider", json=body)
+        return r.status_code
+
+    return deliver
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--api-url", default="http://localhost:8000", help="where webhooks are sent")
+    parser.add_argument("--latency", type=Latency, default=Latency("lognormal:0.2,0.8"))
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--out-of-order-rate", type=float, default=0.05)
+    parser.add_argument("--error-codes", default="card_declined,insufficient_funds,expired_card")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="concurrent webhook deliveries")
+    parser.add_argument("--max-retries", type=int, default=8, help="redeliveries after a 5xx or no answer")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    behaviour = Behaviour(
+        args.latency, args.failure_rate, args.duplicate_rate, args.out_of_order_rate,
+        [c.strip() for c in args.error_codes.split(",") if c.strip()],
+    )
+    provider = MockProvider(
+        behaviour, http_deliver(args.api_url, args.max_in_flight), args.seed, args.max_retries, args.max_in_flight
+    )
+    print(
+        f"mock provider on {args.host}:{args.port} -> {args.api_url} (latency {args.latency.spec}, "
+        f"failures {args.failure_rate}, duplicates {args.duplicate_rate}, out of order {args.out_of_order_rate})"
+    )
+    uvicorn.run(create_app(provider), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Outbox insert throughput: one ORM object per event vs the coalesced INSERT.
+
+Writes --transactions transactions of --events-per-tx events each against
+DATABASE_URL, first the way enqueue_event used to (an OutboxEvent added to
+the session per event), then through enqueue_event, which inserts all events
+of a transaction in one statement at commit. Reports events/s for both:
+
+    python -m benchmarks.outbox_insert --transactions 2000 --events-per-tx 2 --payload-bytes 200
+
+Payloads are stored as configured, so running it again with
+OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES set measures the compressed encoding.
+The rows written are deleted afterwards.
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import delete
+
+from app.core.config import OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES
+from app.infra.db import SessionLocal
+from app.infra.models import OutboxEvent
+from app.infra.types import new_id
+from app.services.outbox import enqueue_event
+
+AGGREGATE_TYPE = "benchmark"
+
+
+def _payload(n: int, payload_bytes: int) -> dict:
+    # Repetitive like real payloads (ids, amounts, line items), so compression has something to find
+    lines = [{"sku": f"sku-{i}", "amount_cents": 100 + i, "currency": "EUR"} for i in range(max(1, payload_bytes // 50))]
+    return {"invoice_id": new_id(), "n": n, "lines": lines}
+
+
+def _orm(db, aggregate_id: str, payload: dict) -> None:
+    db.add(OutboxEvent(event_type="benchmark", aggregate_type=AGGREGATE_TYPE, aggregate_id=aggregate_id, payload=payload))
+
+
+def _coalesced(db, aggregate_id: str, payload: dict) -> None:
+    enqueue_event(db, "benchmark", AGGREGATE_TYPE, aggregate_id, payload)
+
+
+def _phase(write, args: argparse.Namespace) -> dict:
+    payloads = [_payload(n, args.payload_bytes) for n in range(args.events_per_tx)]
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for _ in range(args.transactions):
+            aggregate_id = new_id()
+            for payload in payloads:
+                write(db, aggregate_id, payload)
+            db.commit()
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    events = args.transactions * args.events_per_tx
+    return {
+        "events": events,
+        "seconds": round(elapsed, 3),
+        "events_per_s": round(events / elapsed, 1) if elapsed else 0.0,
+        "tx_per_s": round(args.transactions / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        db.execute(delete(OutboxEvent).where(OutboxEvent.aggregate_type == AGGREGATE_TYPE))
+        db.commit()
+
+
+def run(args: argparse.Namespace) -> dict:
+    try:
+        orm = _phase(_orm, args)
+        coalesced = _phase(_coalesced, args)
+    finally:
+        _cleanup()
+    speedup = round(coalesced["events_per_s"] / orm["events_per_s"], 2) if orm["events_per_s"] else None
+    return {"orm": orm, "coalesced": coalesced, "speedup": speedup}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--events-per-tx", type=int, default=2, help="a succeeded webhook writes 2")
+    parser.add_argument("--payload-bytes", type=int, default=200, help="approximate JSON size per payload")
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    print(f"payload compression: {'>= %d bytes' % OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES if OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES else 'off'}")
+    for path in ("orm", "coalesced"):
+        r = result[path]
+        print(f"{path:>9}: {r['events_per_s']} events/s ({r['tx_per_s']} tx/s, {r['events']} events in {r['seconds']}s)")
+    print(f"speedup: {result['speedup']}x")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": {**vars(args), "compress_min_bytes": OUTBOX_PAYLOAD_COMPRESS_MIN_BYTES}, **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Sync vs async comparison for the payment hot path.
+
+Drives create invoice -> pay -> webhook against a running API and reports
+requests/s and p50/p95/p99 latency per endpoint. Run it once per mode and
+compare the JSON files:
+
+    DB_ASYNC_MODE=false uvicorn app.main:app --workers 1 &
+    python -m benchmarks.pay_path --label sync --out sync.json
+
+    DB_ASYNC_MODE=true uvicorn app.main:app --workers 1 &
+    python -m benchmarks.pay_path --label async --out async.json
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from benchmarks.stats import LatencyRecorder, print_summary
+
+
+async def _timed(client: httpx.AsyncClient, rec: LatencyRecorder, endpoint: str, method: str, url: str, **kw):
+    started = time.perf_counter()
+    r = await client.request(method, url, **kw)
+    rec.record(endpoint, time.perf_counter() - started, r.status_code)
+    return r
+
+
+async def _flow(client: httpx.AsyncClient, rec: LatencyRecorder) -> None:
+    r = await _timed(client, rec, "POST /invoices", "POST", "/invoices", json={"amount_cents": 1999})
+    if r.status_code != 200:
+        return
+    invoice_id = r.json()["invoice_id"]
+    r = await _timed(
+        client, rec, "POST /invoices/{id}/pay", "POST", f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": str(uuid.uuid4())}, json={"payment_method": "mock_card"},
+    )
+    if r.status_code != 202:
+        return
+    await _timed(
+        client, rec, "POST /webhooks/payment-provider", "POST", "/webhooks/payment-provider",
+        json={
+            "provider_payment_id": r.json()["provider_payment_id"],
+            "result": "succeeded",
+            "provider_event_id": f"evt_{uuid.uuid4().hex[:16]}",
+        },
+    )
+
+
+async def run(base_url: str, concurrency: int, duration: float) -> dict:
+    rec = LatencyRecorder()
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                await _flow(client, rec)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return rec.summary(time.perf_counter() - started)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", help="write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args.base_url, args.concurrency, args.duration))
+    summary = {"label": args.label, "concurrency": args.concurrency, **summary}
+    print_summary(summary)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""End-to-end payment completion latency and throughput through the mock provider.
+
+Needs the API, the outbox relay with the provider publisher and the mock
+provider, all on this machine:
+
+    uvicorn app.main:app --workers 2 &
+    python -m benchmarks.mock_provider --latency lognormal:0.2,0.8 --failure-rate 0.1 &
+    python -m app.workers.outbox_relay --publisher provider --poll-interval 0.05 &
+    python -m benchmarks.provider_e2e --payments 5000 --concurrency 32 --out e2e.json
+
+It creates --payments invoices and pays each one, recording the time /pay
+answered. It then polls the mock provider until the API has acknowledged
+the final webhook of every payment, or until --timeout. A payment's
+completion latency is acknowledged minus paid. That covers the relay
+picking up the charge, the provider's latency, webhook retries and the
+webhook transaction. The report gives p50/p95/p99 and completed
+payments/s. With WEBHOOK_INGEST_MODE=inbox, "acknowledged" means queued in
+the inbox, not yet applied.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from benchmarks.stats import LatencyRecorder, percentile, print_summary
+
+
+async def _pay_all(api: httpx.AsyncClient, args: argparse.Namespace, rec: LatencyRecorder) -> dict[str, float]:
+    rng = random.Random(args.seed)
+    paid: dict[str, float] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for n in range(args.payments):
+        queue.put_nowait(n)
+
+    async def call(endpoint: str, url: str, **kw) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            r = await api.post(url, **kw)
+        except httpx.HTTPError:
+            rec.record(endpoint, time.perf_counter() - started, 0)
+            return None
+        rec.record(endpoint, time.perf_counter() - started, r.status_code)
+        return r
+
+    async def worker():
+        while not queue.empty():
+            n = queue.get_nowait()
+            r = await call(
+                "POST /invoices", "/invoices",
+                json={"amount_cents": rng.randint(100, 100_000), "currency": "EUR", "customer_ref": f"cust_{n % 1000}"},
+            )
+            if r is None or r.status_code != 200:
+                continue
+            invoice_id = r.json()["invoice_id"]
+            r = await call(
+                "POST /invoices/{id}/pay", f"/invoices/{invoice_id}/pay",
+                json={"payment_method": "mock_card"}, headers={"Idempotency-Key": f"e2e-{n}"},
+            )
+            if r is not None and r.status_code == 202:
+                paid[r.json()["provider_payment_id"]] = time.time()
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return paid
+
+
+async def _wait_completed(provider: httpx.AsyncClient, paid: dict[str, float], timeout: float) -> dict:
+    deadline = time.perf_counter() + timeout
+    while True:
+        stats = (await provider.get("/stats", params={"payments": 1})).json()
+        completed = sum(1 for ppid in paid if (stats["payments"].get(ppid) or [None, None])[1] is not None)
+        if completed >= len(paid) or time.perf_counter() >= deadline:
+            return stats
+        await asyncio.sleep(0.5)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency)) as api, \
+            httpx.AsyncClient(base_url=args.provider_url, timeout=60) as provider:
+        await provider.post("/reset")
+        rec = LatencyRecorder()
+        started = time.perf_counter()
+        started_at = time.time()
+        paid = await _pay_all(api, args, rec)
+        requests = rec.summary(time.perf_counter() - started)
+        stats = await _wait_completed(provider, paid, args.timeout)
+
+    timings = stats.pop("payments")
+    latencies = []
+    last_completion = started_at
+    for ppid, paid_at in paid.items():
+        completed_at = (timings.get(ppid) or [None, None])[1]
+        if completed_at is not None:
+            latencies.append(max(0.0, completed_at - paid_at))
+            last_completion = max(last_completion, completed_at)
+    latencies.sort()
+    elapsed = last_completion - started_at
+    return {
+        "requests": requests,
+        "provider": stats,
+        "e2e": {
+            "paid": len(paid),
+            "completed": len(latencies),
+            "incomplete": len(paid) - len(latencies),
+            "elapsed_s": round(elapsed, 3),
+            "completed_per_s": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--provider-url", default="http://localhost:9000")
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for webhooks after the last pay")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the result as JSON to this file")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print_summary(result["requests"])
+    e2e = result["e2e"]
+    print(
+        f"\n{e2e['completed']}/{e2e['paid']} payments completed in {e2e['elapsed_s']}s "
+        f"({e2e['completed_per_s']}/s): p50 {e2e['p50_ms']} ms, p95 {e2e['p95_ms']} ms, p99 {e2e['p99_ms']} ms"
+    )
+    print(f"provider: {result['provider']['counts']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
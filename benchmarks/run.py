@@ -0,0 +1,204 @@
+"""Load generator for the invoice -> pay -> webhook -> publish flow.
+
+Each virtual user loops over full payment flows with a configurable mix of
+misbehaviour: concurrent duplicate pay requests, client retries with the
+same Idempotency-Key, failed payments, duplicated webhooks and stale
+webhooks delivered after the final one. A background task keeps calling
+the outbox publish endpoint.
+
+The app can be driven in-process (ASGI transport, no server needed) or over
+HTTP against uvicorn. Either way it uses the database from DATABASE_URL,
+whose InnoDB lock-wait and deadlock counters are sampled before and after
+the run.
+
+    python -m benchmarks.run --mode inprocess --duration 20 --concurrency 32
+    python -m benchmarks.run --mode http --base-url http://localhost:8000 --out result.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import httpx
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.config import DATABASE_URL
+from benchmarks.stats import LatencyRecorder, print_summary
+
+INNODB_COUNTERS = ("Innodb_row_lock_waits", "Innodb_row_lock_time", "Innodb_deadlocks")
+
+
+class Mix:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.dup_pay_rate = args.dup_pay_rate
+        self.retry_pay_rate = args.retry_pay_rate
+        self.fail_rate = args.fail_rate
+        self.dup_webhook_rate = args.dup_webhook_rate
+        self.out_of_order_rate = args.out_of_order_rate
+
+
+class Runner:
+    def __init__(self, client: httpx.AsyncClient, mix: Mix, rng: random.Random) -> None:
+        self.client = client
+        self.mix = mix
+        self.rng = rng
+        self.rec = LatencyRecorder()
+        self.errors = 0
+
+    async def call(self, endpoint: str, method: str, url: str, **kw) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kw)
+        except httpx.HTTPError:
+            self.errors += 1
+            self.rec.record(endpoint, time.perf_counter() - started, 0)
+            return None
+        self.rec.record(endpoint, time.perf_counter() - started, r.status_code)
+        return r
+
+    async def webhook(self, provider_payment_id: str, result: str, event_id: str) -> None:
+        body = {"provider_payment_id": provider_payment_id, "result": result, "provider_event_id": event_id}
+        if result == "failed":
+            body["error_code"] = "card_declined"
+        await self.call("POST /webhooks/payment-provider", "POST", "/webhooks/payment-provider", json=body)
+
+    async def flow(self) -> None:
+        mix, rng = self.mix, self.rng
+        r = await self.call(
+            "POST /invoices", "POST", "/invoices",
+            json={"amount_cents": rng.randint(100, 100_000), "currency": "EUR", "customer_ref": f"cust_{rng.randint(1, 1000)}"},
+        )
+        if r is None or r.status_code != 200:
+            return
+        invoice_id = r.json()["invoice_id"]
+
+        pay_kw = dict(headers={"Idempotency-Key": str(uuid.uuid4())}, json={"payment_method": "mock_card"})
+        pay_url = f"/invoices/{invoice_id}/pay"
+        copies = 2 if rng.random() < mix.dup_pay_rate else 1
+        # concurrent duplicates race for the invoice row lock
+        responses = await asyncio.gather(
+            *(self.call("POST /invoices/{id}/pay", "POST", pay_url, **pay_kw) for _ in range(copies))
+        )
+        if rng.random() < mix.retry_pay_rate:
+            responses.append(await self.call("POST /invoices/{id}/pay", "POST", pay_url, **pay_kw))
+        ok = [p for p in responses if p is not None and p.status_code == 202]
+        if not ok:
+            return
+        provider_payment_id = ok[0].json()["provider_payment_id"]
+
+        result = "failed" if rng.random() < mix.fail_rate else "succeeded"
+        final_event = f"evt_{uuid.uuid4().hex[:20]}"
+        await self.webhook(provider_payment_id, result, final_event)
+        if rng.random() < mix.dup_webhook_rate:
+            await self.webhook(provider_payment_id, result, final_event)
+        if rng.random() < mix.out_of_order_rate:
+            # an older event with the opposite outcome arriving last
+            stale = "succeeded" if result == "failed" else "failed"
+            await self.webhook(provider_payment_id, stale, f"evt_{uuid.uuid4().hex[:20]}")
+
+    async def publisher(self, interval: float, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            await self.call("POST /internal/outbox/publish", "POST", "/internal/outbox/publish", params={"limit": 500})
+            await asyncio.sleep(interval)
+
+
+def _innodb_counters(database_url: str) -> dict | None:
+    try:
+        engine = create_engine(database_url, poolclass=NullPool)
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SHOW GLOBAL STATUS WHERE Variable_name IN :names").bindparams(
+                    bindparam("names", expanding=True)
+                ),
+                {"names": list(INNODB_COUNTERS)},
+            ).all()
+        engine.dispose()
+    except Exception:
+        # not MySQL/MariaDB, or no privilege to read global status
+        return None
+    return {name: int(value) for name, value in rows}
+
+
+def _client(args: argparse.Namespace) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    if args.mode == "inprocess":
+        from app.main import app
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+    return httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    before = _innodb_counters(args.database_url)
+
+    async with _client(args) as client:
+        runner = Runner(client, Mix(args), rng)
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                await runner.flow()
+
+        tasks = [user() for _ in range(args.concurrency)]
+        if args.publish_interval > 0:
+            tasks.append(runner.publisher(args.publish_interval, deadline))
+        await asyncio.gather(*tasks)
+        summary = runner.rec.summary(time.perf_counter() - started)
+
+    after = _innodb_counters(args.database_url)
+    summary["transport_errors"] = runner.errors
+    summary["server_errors"] = sum(
+        n for s in summary["endpoints"].values() for code, n in s["statuses"].items() if code >= 500
+    )
+    if before is not None and after is not None:
+        summary["innodb"] = {
+            "row_lock_waits": after.get("Innodb_row_lock_waits", 0) - before.get("Innodb_row_lock_waits", 0),
+            "row_lock_time_ms": after.get("Innodb_row_lock_time", 0) - before.get("Innodb_row_lock_time", 0),
+            "deadlocks": after.get("Innodb_deadlocks", 0) - before.get("Innodb_deadlocks", 0),
+        }
+    else:
+        summary["innodb"] = None
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="used with --mode http")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="sampled for InnoDB lock/deadlock counters")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--dup-pay-rate", type=float, default=0.2, help="share of flows sending two concurrent pays")
+    parser.add_argument("--retry-pay-rate", type=float, default=0.2, help="share of flows retrying pay with the same key")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="share of payments the provider fails")
+    parser.add_argument("--dup-webhook-rate", type=float, default=0.2, help="share of webhooks delivered twice")
+    parser.add_argument("--out-of-order-rate", type=float, default=0.1, help="share of flows with a stale webhook last")
+    parser.add_argument("--publish-interval", type=float, default=0.5, help="seconds between outbox publishes; 0 disables")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", help="write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args))
+    summary = {"label": args.label, "mode": args.mode, "concurrency": args.concurrency, "config": vars(args), **summary}
+    summary["config"].pop("database_url", None)
+
+    print_summary(summary)
+    print(f"server errors: {summary['server_errors']}  transport errors: {summary['transport_errors']}")
+    if summary["innodb"] is not None:
+        print(
+            f"innodb: {summary['innodb']['row_lock_waits']} row lock waits "
+            f"({summary['innodb']['row_lock_time_ms']} ms), {summary['innodb']['deadlocks']} deadlocks"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Serialization cost per invoice list/detail response, before and after FAST_JSON.
+
+No database or server is needed: synthetic rows shaped like the ORM objects
+are rendered the way each mode renders them, and the time per response is
+reported for each path:
+
+- models: the pre-FAST_JSON path. Pydantic models are built per row, and
+  FastAPI re-validates them against the response_model. The list endpoint
+  then json.dumps the result; the detail endpoint uses model_dump_json.
+- validated: FAST_JSON off today. Dicts are validated by the response model.
+- fast: FAST_JSON on. Dicts go straight to orjson.
+
+    python -m benchmarks.serialization --rows 100 --attempts 5 --events 10
+"""
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.schemas.invoice import InvoiceDetailOut, InvoiceOut, OutboxEventSummary, PaymentAttemptOut
+
+_invoice_list = TypeAdapter(list[InvoiceOut])
+
+
+def _rows(args: argparse.Namespace):
+    now = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    invoices = [
+        SimpleNamespace(id=str(uuid.uuid4()), status="open", amount_cents=1000 + n, currency="EUR", customer_ref=f"cust_{n}")
+        for n in range(args.rows)
+    ]
+    attempts = [
+        SimpleNamespace(
+            id=str(uuid.uuid4()), status="failed", idempotency_key=f"key-{n}", provider_payment_id=f"pp_{n}",
+            error_code="card_declined", error_message="Card declined", created_at=now + timedelta(seconds=n),
+        )
+        for n in range(args.attempts)
+    ]
+    events = [
+        SimpleNamespace(
+            id=str(uuid.uuid4()), event_type="payment_attempt_failed", aggregate_type="invoice",
+            aggregate_id=invoices[0].id, created_at=now + timedelta(seconds=n), published_at=now if n % 2 else None,
+        )
+        for n in range(args.events)
+    ]
+    return invoices, attempts, events
+
+
+def _list_models(invoices) -> bytes:
+    models = [
+        InvoiceOut(invoice_id=i.id, status=i.status, amount_cents=i.amount_cents, currency=i.currency, customer_ref=i.customer_ref)
+        for i in invoices
+    ]
+    content = _invoice_list.dump_python(_invoice_list.validate_python(models), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _list_dicts(invoices) -> list[dict]:
+    return [
+        {"invoice_id": i.id, "status": i.status, "amount_cents": i.amount_cents, "currency": i.currency, "customer_ref": i.customer_ref}
+        for i in invoices
+    ]
+
+
+def _list_validated(invoices) -> bytes:
+    content = _invoice_list.dump_python(_invoice_list.validate_python(_list_dicts(invoices)), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _list_fast(invoices) -> bytes:
+    return orjson.dumps(_list_dicts(invoices))
+
+
+def _detail_models(inv, attempts, events) -> bytes:
+    return InvoiceDetailOut(
+        invoice_id=inv.id, status=inv.status, amount_cents=inv.amount_cents, currency=inv.currency, customer_ref=inv.customer_ref,
+        attempts=[
+            PaymentAttemptOut(
+                attempt_id=a.id, status=a.status, idempotency_key=a.idempotency_key, provider_payment_id=a.provider_payment_id,
+                error_code=a.error_code, error_message=a.error_message, created_at=a.created_at,
+            )
+            for a in attempts
+        ],
+        outbox_events=[
+            OutboxEventSummary(
+                id=e.id, event_type=e.event_type, aggregate_type=e.aggregate_type, aggregate_id=e.aggregate_id,
+                created_at=e.created_at, published_at=e.published_at,
+            )
+            for e in events
+        ],
+    ).model_dump_json().encode()
+
+
+def _detail_dict(inv, attempts, events) -> dict:
+    return {
+        "invoice_id": inv.id, "status": inv.status, "amount_cents": inv.amount_cents, "currency": inv.currency,
+        "customer_ref": inv.customer_ref,
+        "attempts": [
+            {
+                "attempt_id": a.id, "status": a.status, "idempotency_key": a.idempotency_key,
+                "provider_payment_id": a.provider_payment_id, "error_code": a.error_code,
+                "error_message": a.error_message, "created_at": a.created_at,
+            }
+            for a in attempts
+        ],
+        "outbox_events": [
+            {
+                "id": e.id, "event_type": e.event_type, "aggregate_type": e.aggregate_type, "aggregate_id": e.aggregate_id,
+                "created_at": e.created_at, "published_at": e.published_at,
+            }
+            for e in events
+        ],
+    }
+
+
+def _detail_validated(inv, attempts, events) -> bytes:
+    return InvoiceDetailOut.model_validate(_detail_dict(inv, attempts, events)).model_dump_json().encode()
+
+
+def _detail_fast(inv, attempts, events) -> bytes:
+    return orjson.dumps(_detail_dict(inv, attempts, events))
+
+
+def _per_call_us(fn, number: int, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def run(args: argparse.Namespace) -> dict:
+    invoices, attempts, events = _rows(args)
+    # Same JSON from every path, so only the cost differs
+    assert json.loads(_list_models(invoices)) == json.loads(_list_fast(invoices)) == json.loads(_list_validated(invoices))
+    detail = (invoices[0], attempts, events)
+    assert json.loads(_detail_models(*detail)) == json.loads(_detail_fast(*detail)) == json.loads(_detail_validated(*detail))
+
+    result = {}
+    for name, paths in (
+        (f"list ({args.rows} invoices)", {"models": _list_models, "validated": _list_validated, "fast": _list_fast}),
+        (
+            f"detail ({args.attempts} attempts, {args.events} events)",
+            {"models": _detail_models, "validated": _detail_validated, "fast": _detail_fast},
+        ),
+    ):
+        call_args = (invoices,) if name.startswith("list") else detail
+        timings = {path: round(_per_call_us(lambda: fn(*call_args), args.number, args.repeat), 2) for path, fn in paths.items()}
+        timings["speedup"] = round(timings["models"] / timings["fast"], 1)
+        result[name] = timings
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="invoices per list response (the API caps pages at 100)")
+    parser.add_argument("--attempts", type=int, default=5, help="payment attempts in the detail response")
+    parser.add_argument("--events", type=int, default=10, help="outbox events in the detail response (the API shows 10)")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per path; the fastest is reported")
+    parser.add_argument("--out", help="write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    for name, timings in result.items():
+        print(
+            f"{name:<36} models {timings['models']:>9.2f} us  validated {timings['validated']:>9.2f} us  "
+            f"fast {timings['fast']:>9.2f} us  x{timings['speedup']}"
+        )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ from sqlalchemy.orm import Session
 
 from app.main import app
 from app.infra.db import SessionLocal
+from app.services.invoices import invoice_detail_cache
+from app.services.payments import pay_replay_cache
+from app.services.provider_events import processed_events_cache
+from query_budget import query_budget  # noqa: F401  (fixture)
 
 
 @pytest.fixture()
@@ -20,9 +24,18 @@ def db() -> Session:
 def client(db: Session):
     # Her test öncesi tabloları temizle (sıra önemli)
     db.execute(text("DELETE FROM outbox_events"))
+    db.execute(text("DELETE FROM outbox_events_archive"))
+    db.execute(text("DELETE FROM payment_retry_schedule"))
     db.execute(text("DELETE FROM payment_attempts"))
     db.execute(text("DELETE FROM invoices"))
+    db.execute(text("DELETE FROM webhook_inbox"))
+    db.execute(text("DELETE FROM processed_provider_events"))
+    db.execute(text("DELETE FROM import_runs"))
+    db.execute(text("DELETE FROM customer_balances"))
     db.commit()
+    pay_replay_cache.clear()
+    processed_events_cache.clear()
+    invoice_detail_cache.clear()
 
     with TestClient(app) as c:
         yield c
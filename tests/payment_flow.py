@@ -0,0 +1,41 @@
+"""Invoice -> pay -> webhook helpers shared by the API tests.
+
+    invoice_id = create_invoice(client, 1500)
+    provider_payment_id = pay(client, invoice_id, "key-1")
+    succeed(client, provider_payment_id, "evt_1")
+"""
+
+
+def create_invoice(client, amount_cents: int = 1000, currency: str = "EUR", **fields) -> str:
+    r = client.post("/invoices", json={"amount_cents": amount_cents, "currency": currency, **fields})
+    assert r.status_code == 200, r.text
+    return r.json()["invoice_id"]
+
+
+def pay(client, invoice_id: str, key: str) -> str:
+    """Starts a payment; returns its provider_payment_id."""
+    r = client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": key},
+        json={"payment_method": "mock_card"},
+    )
+    assert r.status_code == 202, r.text
+    return r.json()["provider_payment_id"]
+
+
+def webhook_body(provider_payment_id: str, result: str, event_id: str, error_code: str | None = None) -> dict:
+    body = {"provider_payment_id": provider_payment_id, "result": result, "provider_event_id": event_id}
+    if error_code:
+        body["error_code"] = error_code
+    return body
+
+
+def webhook(client, provider_payment_id: str, result: str, event_id: str, error_code: str | None = None):
+    return client.post(
+        "/webhooks/payment-provider", json=webhook_body(provider_payment_id, result, event_id, error_code)
+    )
+
+
+def succeed(client, provider_payment_id: str, event_id: str) -> None:
+    r = webhook(client, provider_payment_id, "succeeded", event_id)
+    assert r.status_code == 200, r.text
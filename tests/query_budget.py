@@ -0,0 +1,50 @@
+"""pytest plugin: per-endpoint SQL statement budgets.
+
+    def test_detail_budget(client, query_budget):
+        with query_budget(4):
+            client.get(f"/invoices/{invoice_id}")
+
+Counts every statement the app's engine executes inside the block (from any
+thread, so TestClient requests are included) and fails the test with the
+statement shapes if the budget is exceeded.
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.infra.db import engine
+from app.infra.instrumentation import statement_shape
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        shapes = Counter(statement_shape(s) for s in self.statements)
+        return "\n".join(f"  {n}x {shape[:200]}" for shape, n in shapes.most_common())
+
+
+@pytest.fixture()
+def query_budget():
+    @contextmanager
+    def budget(max_queries: int):
+        counter = QueryCounter()
+        event.listen(engine, "after_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "after_cursor_execute", counter)
+        assert len(counter) <= max_queries, (
+            f"{len(counter)} statements, budget {max_queries}:\n{counter.report()}"
+        )
+
+    return budget
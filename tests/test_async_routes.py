@@ -0,0 +1,52 @@
+import importlib.util
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.payments as payments_api
+import app.core.config as config
+import app.main as main
+from app.infra.async_db import async_engine
+from payment_flow import create_invoice, pay, webhook
+
+
+@pytest.fixture()
+def async_client(client, monkeypatch):
+    # app.main as it is built with DB_ASYNC_MODE=true, without touching the
+    # sync app the other tests use
+    monkeypatch.setattr(config, "DB_ASYNC_MODE", True)
+    spec = importlib.util.spec_from_file_location("async_main", main.__file__)
+    async_main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(async_main)
+
+    def sync_path_used(*args, **kwargs):
+        raise AssertionError("served by the sync route")
+
+    monkeypatch.setattr(payments_api, "pay_invoice", sync_path_used)
+    monkeypatch.setattr(payments_api, "handle_provider_webhook", sync_path_used)
+    with TestClient(async_main.app) as c:
+        yield c
+        # pooled connections belong to this TestClient's event loop
+        c.portal.call(async_engine.dispose)
+
+
+def test_pay_and_webhooks_through_async_routes(async_client):
+    invoice_id = create_invoice(async_client, 1500, customer_ref="cust_async")
+    pp_id = pay(async_client, invoice_id, "async-key-1")
+    assert pay(async_client, invoice_id, "async-key-1") == pp_id
+    r = async_client.post(f"/invoices/{invoice_id}/pay", headers={"Idempotency-Key": "async-key-2"}, json={})
+    assert (r.status_code, r.json()["detail"]) == (409, "invoice_has_pending_attempt")
+
+    r = webhook(async_client, pp_id, "succeeded", "evt_async_1")
+    assert r.status_code == 200 and r.json()["attempt_status"] == "succeeded"
+    # a redelivery and a stale callback change nothing
+    assert webhook(async_client, pp_id, "succeeded", "evt_async_1").status_code == 200
+    assert webhook(async_client, pp_id, "failed", "evt_async_2").json()["attempt_status"] == "succeeded"
+
+    detail = async_client.get(f"/invoices/{invoice_id}").json()
+    assert detail["status"] == "paid"
+    assert sorted(e["event_type"] for e in detail["outbox_events"]) == [
+        "invoice_paid", "payment_attempt_created", "payment_attempt_succeeded",
+    ]
+    [balance] = async_client.get("/customers/cust_async/summary").json()["balances"]
+    assert (balance["open_count"], balance["paid_count"], balance["paid_amount_cents"]) == (0, 1, 1500)
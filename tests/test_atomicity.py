@@ -1,3 +1,5 @@
+import uuid
+
 from sqlalchemy import text
 
 def test_webhook_success_updates_invoice_and_writes_outbox(client, db):
@@ -28,6 +30,6 @@ def test_webhook_success_updates_invoice_and_writes_outbox(client, db):
     # outbox has invoice_paid exactly once
     cnt = db.execute(
         text("SELECT COUNT(*) FROM outbox_events WHERE event_type='invoice_paid' AND aggregate_id=:iid"),
-        {"iid": invoice_id},
+        {"iid": uuid.UUID(invoice_id).bytes},
     ).scalar_one()
     assert cnt == 1
@@ -0,0 +1,27 @@
+import uuid
+
+from sqlalchemy import text
+
+from app.infra.types import uuid7
+
+
+def test_uuid7_is_versioned_and_time_ordered():
+    ids = [uuid7() for _ in range(50)]
+    assert all(u.version == 7 and u.variant == uuid.RFC_4122 for u in ids)
+    # millisecond prefix never goes backwards
+    prefixes = [u.bytes[:6] for u in ids]
+    assert prefixes == sorted(prefixes)
+
+
+def test_ids_are_stored_as_16_bytes_and_served_as_strings(client, db):
+    invoice_id = client.post("/invoices", json={"amount_cents": 1000, "currency": "EUR"}).json()["invoice_id"]
+    assert str(uuid.UUID(invoice_id)) == invoice_id
+
+    raw = db.execute(text("SELECT id FROM invoices")).scalar_one()
+    assert bytes(raw) == uuid.UUID(invoice_id).bytes
+
+    assert client.get(f"/invoices/{invoice_id}").json()["invoice_id"] == invoice_id
+
+
+def test_malformed_id_is_not_found(client):
+    assert client.get("/invoices/not-a-uuid").status_code == 404
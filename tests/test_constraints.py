@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 
 from sqlalchemy import text
@@ -13,7 +15,7 @@ def test_unique_invoice_idempotency_constraint_enforced(db):
             "INSERT INTO invoices (id, status, amount_cents, currency, created_at, updated_at) "
             "VALUES (:id, 'open', 1000, 'EUR', NOW(), NOW())"
         ),
-        {"id": invoice_id},
+        {"id": uuid.UUID(invoice_id).bytes},
     )
     db.commit()
 
@@ -0,0 +1,100 @@
+import threading
+import time
+
+from sqlalchemy import text
+
+import app.services.payments as payments
+from app.cli.rebuild_customer_balances import rebuild
+from payment_flow import create_invoice, pay, webhook_body
+
+
+def _invoice(client, amount, customer="cust_a", currency="EUR"):
+    return create_invoice(client, amount, currency, customer_ref=customer)
+
+
+def _pay_and_succeed(client, invoice_id, event_id):
+    return webhook_body(pay(client, invoice_id, event_id), "succeeded", event_id)
+
+
+def _balances(client, customer="cust_a"):
+    r = client.get(f"/customers/{customer}/summary")
+    assert r.status_code == 200
+    return {b["currency"]: b for b in r.json()["balances"]}
+
+
+def test_balances_follow_creation_and_payment(client):
+    first = _invoice(client, 1000)
+    _invoice(client, 250)
+    _invoice(client, 900, currency="USD")
+    client.post("/invoices/batch", json=[{"amount_cents": 50, "customer_ref": "cust_a"}, {"amount_cents": 0}])
+
+    success = _pay_and_succeed(client, first, "evt_bal_1")
+    client.post("/webhooks/payment-provider", json=success)
+    # a redelivered success, or a later one for the same payment, must not count it twice
+    client.post("/webhooks/payment-provider", json=success)
+    client.post("/webhooks/payment-provider", json={**success, "provider_event_id": "evt_bal_2"})
+
+    balances = _balances(client)
+    assert balances["EUR"] == {
+        "currency": "EUR", "invoice_count": 3,
+        "open_count": 2, "open_amount_cents": 300, "paid_count": 1, "paid_amount_cents": 1000,
+    }
+    assert balances["USD"]["open_amount_cents"] == 900
+
+    assert client.get("/customers/nobody/summary").status_code == 404
+
+
+def test_concurrent_successes_for_one_payment_count_once(client, db, monkeypatch):
+    # Two success callbacks with different event ids for one payment, in
+    # overlapping transactions: the second waits on the attempt row lock
+    success = _pay_and_succeed(client, _invoice(client, 800, customer="cust_c"), "evt_bal_c1")
+    loaded = threading.Event()
+    already_applied = payments._already_applied
+
+    def slow_already_applied(attempt, provider_event_id):
+        applied = already_applied(attempt, provider_event_id)
+        if provider_event_id == "evt_bal_c1":
+            # keep the first callback's transaction open while the second arrives
+            loaded.set()
+            time.sleep(0.5)
+        return applied
+
+    monkeypatch.setattr(payments, "_already_applied", slow_already_applied)
+    first = threading.Thread(target=client.post, args=("/webhooks/payment-provider",), kwargs={"json": success})
+    first.start()
+    assert loaded.wait(5)
+    second = client.post("/webhooks/payment-provider", json={**success, "provider_event_id": "evt_bal_c2"})
+    first.join()
+
+    assert second.status_code == 200
+    balances = _balances(client, "cust_c")["EUR"]
+    assert (balances["open_count"], balances["paid_count"]) == (0, 1)
+    assert db.execute(text("SELECT COUNT(*) FROM outbox_events WHERE event_type = 'invoice_paid'")).scalar_one() == 1
+
+
+def test_batch_webhooks_update_balances_once_per_batch(client, query_budget):
+    items = [_pay_and_succeed(client, _invoice(client, 100 * n, customer=f"cust_{n % 2}"), f"evt_bal_b{n}") for n in range(1, 5)]
+    with query_budget(12) as small:
+        client.post("/webhooks/payment-provider/batch", json=items[:2])
+    with query_budget(len(small)):
+        client.post("/webhooks/payment-provider/batch", json=items[2:])
+
+    assert _balances(client, "cust_1")["EUR"]["paid_amount_cents"] == 100 + 300
+    assert _balances(client, "cust_0")["EUR"]["paid_count"] == 2
+
+
+def test_rebuild_reconstructs_balances(client, db):
+    paid = _invoice(client, 700, customer="cust_r1")
+    client.post("/webhooks/payment-provider", json=_pay_and_succeed(client, paid, "evt_bal_r"))
+    for n in range(5):
+        _invoice(client, 10, customer=f"cust_r{n}")
+    _invoice(client, 10, customer=None)
+    expected = {f"cust_r{n}": _balances(client, f"cust_r{n}") for n in range(5)}
+
+    db.execute(text("DELETE FROM customer_balances"))
+    db.execute(text("INSERT INTO customer_balances VALUES ('cust_gone', 'EUR', 1, 1, 0, 0, '2026-01-01')"))
+    db.commit()
+
+    assert rebuild(batch_size=2) == 5
+    assert {f"cust_r{n}": _balances(client, f"cust_r{n}") for n in range(5)} == expected
+    assert client.get("/customers/cust_gone/summary").status_code == 404
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text, update
+
+from app.infra.models import OutboxEvent, PaymentAttempt, PaymentRetrySchedule
+from app.services.dunning import DunningPolicy, next_retry_no, retry_idempotency_key
+from app.services.payments import pay_due_retries
+from app.workers import dunning as worker
+from app.workers.dunning import RetryHeap
+from payment_flow import create_invoice, pay, succeed, webhook
+
+
+def _decline(client, invoice_id: str, key: str, event_id: str, error_code: str = "card_declined") -> None:
+    assert webhook(client, pay(client, invoice_id, key), "failed", event_id, error_code).status_code == 200
+
+
+def _schedule(db, invoice_id: str):
+    db.rollback()
+    return db.get(PaymentRetrySchedule, invoice_id)
+
+
+def _make_due(db) -> None:
+    db.execute(update(PaymentRetrySchedule).values(due_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+
+def test_policy():
+    policy = DunningPolicy(
+        max_retries=3, delays=[60, 600], no_retry_error_codes=frozenset({"card_stolen"}),
+        error_code_delays={"insufficient_funds": 86400},
+    )
+    assert [policy.delay(n, "card_declined") for n in (1, 2, 3, 4)] == [60, 600, 600, None]
+    assert policy.delay(1, "card_stolen") is None
+    assert policy.delay(1, "insufficient_funds") == 86400
+    assert policy.delay(4, "insufficient_funds") is None
+
+
+def test_retry_numbers_follow_the_idempotency_key():
+    assert next_retry_no("inv", "customer-key") == 1
+    assert next_retry_no("inv", retry_idempotency_key("inv", 2)) == 3
+    assert next_retry_no("inv", retry_idempotency_key("other", 2)) == 1
+
+
+def test_failed_attempt_schedules_a_retry(client, db):
+    invoice_id = create_invoice(client, 500)
+    _decline(client, invoice_id, "k1", "evt_1")
+
+    row = _schedule(db, invoice_id)
+    assert row.retry_no == 1 and row.error_code == "card_declined"
+    assert row.due_at > datetime.utcnow()
+    payload = db.execute(
+        select(OutboxEvent.payload).where(OutboxEvent.event_type == "payment_attempt_failed")
+    ).scalar_one()
+    assert payload["next_retry_at"] == row.due_at.isoformat()
+
+
+def test_hard_declines_are_not_retried(client, db):
+    invoice_id = create_invoice(client, 500)
+    _decline(client, invoice_id, "k1", "evt_1", "card_stolen")
+    assert _schedule(db, invoice_id) is None
+
+
+def test_due_retry_creates_an_attempt_and_the_next_failure_schedules_the_next_retry(client, db):
+    invoice_id = create_invoice(client, 500)
+    _decline(client, invoice_id, "k1", "evt_1")
+    _make_due(db)
+
+    assert pay_due_retries(db, [invoice_id]) == {"created": 1}
+    db.commit()
+    attempt = db.execute(
+        select(PaymentAttempt).where(PaymentAttempt.idempotency_key == retry_idempotency_key(invoice_id, 1))
+    ).scalar_one()
+    assert attempt.status == "requires_action"
+    assert _schedule(db, invoice_id) is None
+
+    assert webhook(client, attempt.provider_payment_id, "failed", "evt_2", "card_declined").status_code == 200
+    assert _schedule(db, invoice_id).retry_no == 2
+
+
+def test_retries_not_yet_due_are_left_alone(client, db):
+    invoice_id = create_invoice(client, 500)
+    _decline(client, invoice_id, "k1", "evt_1")
+    assert pay_due_retries(db, [invoice_id]) == {}
+    db.commit()
+    assert _schedule(db, invoice_id) is not None
+
+
+def test_retry_is_dropped_when_invoice_was_paid_or_is_being_paid(client, db):
+    paid, pending = create_invoice(client, 500), create_invoice(client, 500)
+    for invoice_id in (paid, pending):
+        _decline(client, invoice_id, "k1", f"evt_{invoice_id}")
+    succeed(client, pay(client, paid, "k2"), "evt_paid")
+    pay(client, pending, "k2")
+    _make_due(db)
+
+    assert pay_due_retries(db, [paid, pending]) == {"invoice_paid": 1, "attempt_pending": 1}
+    db.commit()
+    assert _schedule(db, paid) is None and _schedule(db, pending) is None
+    assert db.execute(text("SELECT COUNT(*) FROM payment_attempts")).scalar_one() == 4
+
+
+def test_retry_heap_orders_and_deduplicates():
+    now = datetime(2026, 1, 1)
+    heap = RetryHeap()
+    heap.push([(now + timedelta(seconds=2), "b"), (now, "a"), (now + timedelta(seconds=60), "c")])
+    heap.push([(now, "b")])
+    assert len(heap) == 3
+    assert heap.pop_due(now + timedelta(seconds=5), limit=10) == ["a", "b"]
+    assert heap.next_due() == now + timedelta(seconds=60)
+
+
+def test_worker_runs_all_due_retries_in_batches(client, db):
+    invoice_ids = [create_invoice(client, 500) for _ in range(5)]
+    for n, invoice_id in enumerate(invoice_ids):
+        _decline(client, invoice_id, "k1", f"evt_{n}")
+    _make_due(db)
+
+    assert worker.run(batch_size=2, heap_size=3, once=True) == 5
+    assert db.execute(text("SELECT COUNT(*) FROM payment_retry_schedule")).scalar_one() == 0
+
+
+def test_retry_batch_cost_does_not_grow_with_batch_size(client, db, query_budget):
+    invoice_ids = [create_invoice(client, 500) for _ in range(6)]
+    for n, invoice_id in enumerate(invoice_ids):
+        _decline(client, invoice_id, "k1", f"evt_{n}")
+    _make_due(db)
+
+    with query_budget(10) as small:
+        worker.run_batch(invoice_ids[:2])
+    with query_budget(len(small)):
+        worker.run_batch(invoice_ids[2:])
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from sqlalchemy import func, select
+
+import app.api.events as events_api
+from app.infra.models import OutboxEvent
+from app.services.outbox_feed import read_feed
+from payment_flow import create_invoice, pay
+
+
+def _pay(client, key):
+    invoice_id = create_invoice(client, 700)
+    pay(client, invoice_id, key)
+    return invoice_id
+
+
+def _start(client, db):
+    # The feed cursor is global and DELETE does not reset AUTO_INCREMENT:
+    # start at a fresh event, so the test's own events follow without a hole
+    _pay(client, "feed-start")
+    start = db.execute(select(func.max(OutboxEvent.seq))).scalar_one()
+    db.rollback()
+    return start
+
+
+def test_feed_pages_by_cursor(client, db):
+    start = _start(client, db)
+    first = _pay(client, "feed-key-1")
+    second = _pay(client, "feed-key-2")
+
+    page = client.get("/events", params={"after": start, "limit": 1}).json()
+    assert [e["aggregate_id"] for e in page["events"]] == [first]
+    assert page["cursor"] == page["events"][0]["seq"]
+
+    page = client.get("/events", params={"after": page["cursor"]}).json()
+    assert [e["aggregate_id"] for e in page["events"]] == [second]
+
+    empty = client.get("/events", params={"after": page["cursor"]}).json()
+    assert empty == {"events": [], "cursor": page["cursor"]}
+
+
+def test_long_poll_is_woken_by_commit(client, db, monkeypatch):
+    # poll fallback far beyond the test's bound: only the notification can wake it
+    monkeypatch.setattr(events_api, "OUTBOX_FEED_POLL_INTERVAL_SECONDS", 30)
+    start = _start(client, db)
+
+    timer = threading.Timer(0.3, lambda: _pay(client, "feed-key-3"))
+    timer.start()
+    started = time.perf_counter()
+    page = client.get("/events", params={"after": start, "wait": 10}).json()
+    timer.join()
+
+    assert time.perf_counter() - started < 5
+    assert page["events"][0]["event_type"] == "payment_attempt_created"
+
+
+def test_feed_waits_at_a_recent_gap(client, db):
+    start = _start(client, db)
+    for key in ("feed-key-4", "feed-key-5", "feed-key-6"):
+        _pay(client, key)
+    seqs = [e["seq"] for e in read_feed(db, start, 10)]
+    assert len(seqs) == 3
+
+    db.execute(OutboxEvent.__table__.delete().where(OutboxEvent.seq == seqs[1]))
+    db.commit()
+
+    # the hole might be a transaction still in flight...
+    assert [e["seq"] for e in read_feed(db, start, 10)] == seqs[:1]
+    # ...until it is older than the grace period
+    assert [e["seq"] for e in read_feed(db, start, 10, gap_grace=0)] == [seqs[0], seqs[2]]
+
+
+def test_new_consumer_waits_at_the_hole_before_the_lowest_seq(client, db):
+    _pay(client, "feed-key-7")
+    db.execute(OutboxEvent.__table__.update().values(seq=OutboxEvent.seq + 1000))
+    db.commit()
+
+    # seqs up to 1000 might belong to transactions still in flight...
+    assert read_feed(db, 0, 10) == []
+    # ...until the lowest row is older than the grace period
+    assert [e["seq"] > 1000 for e in read_feed(db, 0, 10, gap_grace=0)] == [True]
@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+
+
+def test_export_invoices_ndjson_and_csv(client):
+    ids = {
+        client.post("/invoices", json={"amount_cents": 700 + i, "customer_ref": "cust_exp"}).json()["invoice_id"]
+        for i in range(3)
+    }
+
+    r = client.get("/exports/invoices", params={"format": "ndjson"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert {row["id"] for row in rows} == ids
+    assert all(row["customer_ref"] == "cust_exp" for row in rows)
+
+    r = client.get("/exports/invoices", params={"format": "csv"})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert {row["id"] for row in rows} == ids
+    assert {row["amount_cents"] for row in rows} == {"700", "701", "702"}
+
+
+def test_export_outbox_events_serializes_payload(client):
+    inv = client.post("/invoices", json={"amount_cents": 900}).json()
+    client.post(
+        f"/invoices/{inv['invoice_id']}/pay",
+        headers={"Idempotency-Key": "export-key-1"},
+        json={"payment_method": "mock_card"},
+    )
+
+    r = client.get("/exports/outbox_events")
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 1
+    assert rows[0]["event_type"] == "payment_attempt_created"
+    assert rows[0]["payload"]["invoice_id"] == inv["invoice_id"]
@@ -0,0 +1,33 @@
+import json
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+import app.api.invoices as invoices_api
+from app.schemas.invoice import InvoiceDetailOut
+from payment_flow import create_invoice, pay, succeed
+
+
+def test_fast_paths_render_the_same_json(client, db, monkeypatch):
+    invoice_id = create_invoice(client, 700)
+    succeed(client, pay(client, invoice_id, "fast-json"), "evt_fast")
+    validated_detail = client.get(f"/invoices/{invoice_id}").json()
+    validated_list = client.get("/invoices", params={"limit": 1})
+
+    monkeypatch.setattr(invoices_api, "FAST_JSON", True)
+    monkeypatch.setattr(invoices_api, "JSONResponse", ORJSONResponse)
+    monkeypatch.setattr(invoices_api, "dumps_bytes", orjson.dumps)
+    invoices_api.invoice_detail_cache.clear()
+
+    fast_detail = client.get(f"/invoices/{invoice_id}").json()
+    fast_list = client.get("/invoices", params={"limit": 1})
+
+    assert fast_detail == validated_detail
+    assert len(fast_detail["attempts"]) == 1 and len(fast_detail["outbox_events"]) == 3
+    assert fast_list.json() == validated_list.json()
+    # headers set on the injected Response survive the direct return
+    assert fast_list.headers.get("x-next-cursor") == validated_list.headers.get("x-next-cursor")
+
+    # the dict built for the fast path is exactly what the response model accepts
+    detail = invoices_api._invoice_detail(db, invoice_id)
+    assert json.loads(orjson.dumps(detail)) == json.loads(InvoiceDetailOut.model_validate(detail).model_dump_json())
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.cli.import_invoices import import_file
+from app.infra.models import ImportRun, Invoice
+
+
+def _count(db):
+    return db.execute(select(func.count()).select_from(Invoice)).scalar_one()
+
+
+def test_batch_creates_valid_rows_and_reports_invalid_ones(client, db):
+    r = client.post("/invoices/batch", json=[
+        {"amount_cents": 1000, "currency": "EUR", "customer_ref": "cust_1"},
+        {"amount_cents": 0},
+        {"amount_cents": 2500},
+        {"currency": "EUR"},
+    ])
+    assert r.status_code == 200
+    results = r.json()
+    assert [x["status"] for x in results] == ["created", "error", "created", "error"]
+    assert [x["row"] for x in results] == [0, 1, 2, 3]
+    assert "amount_cents" in results[1]["error"]
+
+    detail = client.get(f"/invoices/{results[2]['invoice_id']}").json()
+    assert detail["amount_cents"] == 2500
+    assert detail["currency"] == "EUR"
+    assert _count(db) == 2
+
+
+def test_batch_over_the_limit_is_rejected(client, monkeypatch):
+    import app.api.invoices as invoices_api
+    monkeypatch.setattr(invoices_api, "INVOICE_BATCH_MAX_ITEMS", 2)
+    r = client.post("/invoices/batch", json=[{"amount_cents": 1}] * 3)
+    assert r.status_code == 413
+
+
+def test_import_resumes_after_the_last_committed_chunk(client, db, tmp_path):
+    src = tmp_path / "invoices.csv"
+    src.write_text(
+        "amount_cents,currency,customer_ref\n"
+        "100,EUR,cust_1\n"
+        "oops,EUR,cust_2\n"
+        "300,,cust_3\n"
+        "400,USD,\n"
+        "500,EUR,cust_5\n"
+    )
+    errors = tmp_path / "errors.ndjson"
+
+    run = import_file(str(src), "csv", batch_size=2, run_id="run-1", errors_path=str(errors))
+    assert (run.rows_done, run.invoices_created, run.row_errors) == (5, 4, 1)
+    assert run.finished_at is not None
+    assert [json.loads(line)["row"] for line in errors.read_text().splitlines()] == [2]
+    assert _count(db) == 4
+
+    # re-running a finished import is a no-op
+    import_file(str(src), "csv", batch_size=2, run_id="run-1")
+    assert _count(db) == 4
+
+    # as if the process had died right after committing the first chunk:
+    # only rows 3-5 are imported again
+    db.execute(ImportRun.__table__.update().values(rows_done=2, invoices_created=1, finished_at=None))
+    db.commit()
+    run = import_file(str(src), "csv", batch_size=2, run_id="run-1")
+    assert run.rows_done == 5
+    assert _count(db) == 7
+
+
+def test_import_rejects_rows_with_more_fields_than_the_header(client, db, tmp_path):
+    src = tmp_path / "invoices.csv"
+    src.write_text(
+        "amount_cents,currency,customer_ref\n"
+        "100,EUR,cust_1\n"
+        "200,EUR,cust_2,surplus\n"
+        "300,EUR,cust_3\n"
+    )
+    errors = tmp_path / "errors.ndjson"
+
+    run = import_file(str(src), "csv", batch_size=10, run_id="run-extra", errors_path=str(errors))
+    assert (run.rows_done, run.invoices_created, run.row_errors) == (3, 2, 1)
+    [error] = [json.loads(line) for line in errors.read_text().splitlines()]
+    assert error["row"] == 2 and "more fields than the header" in error["error"]
+
+
+def test_import_errors_are_written_before_the_chunk_commits(client, db, tmp_path, monkeypatch):
+    src = tmp_path / "invoices.csv"
+    src.write_text("amount_cents,currency,customer_ref\n100,EUR,cust_1\noops,EUR,cust_2\n")
+    errors = tmp_path / "errors.ndjson"
+
+    commit = Session.commit
+    commits = []
+
+    def crash_on_chunk_commit(self):
+        # the first commit creates the import run
+        commits.append(self)
+        if len(commits) > 1:
+            raise RuntimeError("killed before commit")
+        commit(self)
+
+    monkeypatch.setattr(Session, "commit", crash_on_chunk_commit)
+    with pytest.raises(RuntimeError):
+        import_file(str(src), "csv", batch_size=10, run_id="run-crash", errors_path=str(errors))
+    monkeypatch.undo()
+
+    assert [json.loads(line)["row"] for line in errors.read_text().splitlines()] == [2]
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.infra.models import OutboxEvent
+
+from app.services.invoices import invoice_detail_cache
+from app.services.outbox_retention import archive_published_batch, retention_cutoff
+
+
+def _create(client):
+    return client.post("/invoices", json={"amount_cents": 2500, "currency": "EUR"}).json()["invoice_id"]
+
+
+def test_if_none_match_returns_304_until_the_invoice_changes(client):
+    invoice_id = _create(client)
+
+    first = client.get(f"/invoices/{invoice_id}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    assert "last-modified" in first.headers
+
+    not_modified = client.get(f"/invoices/{invoice_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "etag-key-1"},
+        json={"payment_method": "mock_card"},
+    )
+    changed = client.get(f"/invoices/{invoice_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["attempts"]) == 1
+
+
+def test_publishing_outbox_events_changes_the_etag(client):
+    invoice_id = _create(client)
+    client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "etag-key-2"},
+        json={"payment_method": "mock_card"},
+    )
+    before = client.get(f"/invoices/{invoice_id}")
+    assert before.json()["outbox_events"][0]["published_at"] is None
+
+    client.post("/internal/outbox/publish")
+    after = client.get(f"/invoices/{invoice_id}", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()["outbox_events"][0]["published_at"] is not None
+
+
+def test_unchanged_detail_is_served_from_cache(client):
+    invoice_id = _create(client)
+    first = client.get(f"/invoices/{invoice_id}")
+
+    hits = invoice_detail_cache.hits
+    second = client.get(f"/invoices/{invoice_id}")
+    assert invoice_detail_cache.hits == hits + 1
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_archiving_outbox_events_changes_the_etag(client, db):
+    invoice_id = _create(client)
+    client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "etag-key-3"},
+        json={"payment_method": "mock_card"},
+    )
+    client.post("/internal/outbox/publish")
+    before = client.get(f"/invoices/{invoice_id}")
+    assert len(before.json()["outbox_events"]) == 1
+
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.aggregate_id == invoice_id)
+        .values(published_at=datetime.utcnow() - timedelta(days=30))
+    )
+    db.commit()
+    assert archive_published_batch(db, retention_cutoff(days=7), batch_size=10) == 1
+    db.commit()
+
+    after = client.get(f"/invoices/{invoice_id}", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()["outbox_events"] == []
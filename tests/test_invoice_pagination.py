@@ -0,0 +1,40 @@
+def test_list_invoices_walks_all_pages_with_cursor(client):
+    created = {
+        client.post("/invoices", json={"amount_cents": 100 + i, "customer_ref": "cust_page"}).json()["invoice_id"]
+        for i in range(5)
+    }
+    client.post("/invoices", json={"amount_cents": 999, "customer_ref": "cust_other"})
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2, "customer_ref": "cust_page"}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/invoices", params=params)
+        assert r.status_code == 200
+        seen.extend(i["invoice_id"] for i in r.json())
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 5
+    assert set(seen) == created
+
+
+def test_list_invoices_filters_by_status(client):
+    inv = client.post("/invoices", json={"amount_cents": 500}).json()
+    client.post("/invoices", json={"amount_cents": 600})
+
+    assert client.get("/invoices", params={"status": "paid"}).json() == []
+    open_ids = {i["invoice_id"] for i in client.get("/invoices", params={"status": "open"}).json()}
+    assert inv["invoice_id"] in open_ids
+
+
+def test_list_invoices_rejects_malformed_cursor(client):
+    r = client.get("/invoices", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_cursor"
@@ -0,0 +1,26 @@
+import re
+
+
+def _sample(body, name, labels):
+    m = re.search(rf"^{re.escape(name)}{{{re.escape(labels)}}} (\S+)$", body, re.M)
+    return float(m.group(1)) if m else 0.0
+
+
+def test_metrics_exposes_pool_and_per_request_query_stats(client):
+    before = client.get("/metrics").text
+    inv = client.post("/invoices", json={"amount_cents": 1234}).json()
+    client.get(f"/invoices/{inv['invoice_id']}")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+
+    assert "# TYPE db_pool_checkout_seconds histogram" in body
+    assert 'db_pool_size{engine="primary"}' in body
+    assert _sample(body, "db_queries_total", 'engine="primary"') > _sample(before, "db_queries_total", 'engine="primary"')
+
+    # get_invoice issues three statements: invoice, attempts, outbox events
+    route = 'route="/invoices/{invoice_id}"'
+    assert _sample(body, "http_request_db_queries_count", route) >= 1
+    assert _sample(body, "http_request_db_queries_sum", route) >= 3
@@ -0,0 +1,89 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from app.infra.publishers import InMemoryPublisher, ProviderPublisher
+from app.main import app
+from app.services.outbox import publish_pending
+from benchmarks.mock_provider import Behaviour, Latency, MockProvider, plan_webhooks
+from payment_flow import create_invoice, pay
+
+
+class _RecordingClient:
+    def __init__(self) -> None:
+        self.charges: list[dict] = []
+
+    def charge(self, charges) -> None:
+        self.charges.extend(charges)
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert Latency("fixed:0.25").sample(rng) == 0.25
+    assert 0.1 <= Latency("uniform:0.1,0.2").sample(rng) <= 0.2
+    assert Latency("lognormal:0.2,0.5").sample(rng) > 0
+    for bad in ("fixed", "uniform:1", "gamma:1,2", "exp:-1"):
+        with pytest.raises(ValueError):
+            Latency(bad)
+
+
+def test_webhook_plan():
+    rng = random.Random(1)
+    charge = {"provider_payment_id": "pp_1"}
+
+    [(delay, body, final)] = plan_webhooks(charge, Behaviour(Latency("fixed:0.1")), rng)
+    assert (delay, body["result"], final) == (0.1, "succeeded", True)
+
+    misbehaving = Behaviour(Latency("fixed:0.1"), failure_rate=1, duplicate_rate=1, out_of_order_rate=1, error_codes=["expired_card"])
+    plan = plan_webhooks(charge, misbehaving, rng)
+    assert [d for d, _, _ in plan] == pytest.approx([0.1, 0.2, 0.3])
+    (_, first, is_final), (_, duplicate, _), (_, stale, _) = plan
+    assert is_final and first["result"] == "failed" and first["error_code"] == "expired_card"
+    assert duplicate == first
+    assert stale["result"] == "succeeded" and stale["provider_event_id"] != first["provider_event_id"]
+
+
+def test_provider_publisher_sends_charges_for_created_attempts():
+    client, inner = _RecordingClient(), InMemoryPublisher()
+    events = [
+        {"event_type": "invoice_created", "payload": {}},
+        {"event_type": "payment_attempt_created", "payload": {
+            "provider_payment_id": "pp_1", "amount_cents": 100, "currency": "EUR", "attempt_id": "a1", "invoice_id": "i1",
+        }},
+    ]
+    ProviderPublisher(client, inner).publish(events)
+    assert client.charges == [{"provider_payment_id": "pp_1", "amount_cents": 100, "currency": "EUR", "reference": "a1"}]
+    assert inner.published == events
+
+
+def test_charges_published_by_the_relay_complete_through_webhooks(client, db):
+    invoice_ids = [create_invoice(client, 100) for _ in range(3)]
+    for n, invoice_id in enumerate(invoice_ids):
+        pay(client, invoice_id, f"k{n}")
+
+    charges = _RecordingClient()
+    publish_pending(db, limit=100, publisher=ProviderPublisher(charges))
+    db.commit()
+    assert len(charges.charges) == 3
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+            async def deliver(body):
+                return (await api.post("/webhooks/payment-provider", json=body)).status_code
+
+            provider = MockProvider(
+                Behaviour(Latency("fixed:0"), duplicate_rate=1, out_of_order_rate=1), deliver, seed=1
+            )
+            # a redelivered charge request is deduplicated
+            assert provider.accept(charges.charges + charges.charges[:1]) == {"accepted": 3, "duplicates": 1}
+            while provider.stats()["pending_webhooks"]:
+                await asyncio.sleep(0.01)
+            return provider.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["completed"] == 3
+    assert stats["counts"]["webhook_200"] == 9
+    for invoice_id in invoice_ids:
+        assert client.get(f"/invoices/{invoice_id}").json()["status"] == "paid"
@@ -0,0 +1,107 @@
+import uuid
+
+from sqlalchemy import event, select, text
+
+from app.infra.db import engine
+from app.infra.models import OutboxEvent
+from app.infra.types import CompressedJSON
+from app.services.outbox import enqueue_event, enqueue_events, flush_events
+
+
+def _outbox_inserts(statements):
+    return [s for s in statements if s.startswith("INSERT INTO outbox_events")]
+
+
+def _count(db):
+    return db.execute(text("SELECT COUNT(*) FROM outbox_events")).scalar_one()
+
+
+def test_events_are_inserted_together_at_commit(client, db):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    aggregate_id = str(uuid.uuid4())
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        first = enqueue_event(db, "a", "invoice", aggregate_id, {"n": 1})
+        second = enqueue_event(db, "b", "invoice", aggregate_id, {"n": 2})
+        assert _outbox_inserts(statements) == []
+        db.commit()
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+    assert len(_outbox_inserts(statements)) == 1
+    rows = db.execute(select(OutboxEvent.id, OutboxEvent.payload).order_by(OutboxEvent.created_at)).all()
+    assert [(r.id, r.payload) for r in rows] == [(first.id, {"n": 1}), (second.id, {"n": 2})]
+
+
+def test_rollback_drops_enqueued_events(client, db):
+    enqueue_event(db, "a", "invoice", str(uuid.uuid4()), {})
+    db.rollback()
+    db.commit()
+    assert _count(db) == 0
+
+
+def test_savepoint_rollback_drops_only_its_events(client, db):
+    kept = enqueue_event(db, "a", "invoice", str(uuid.uuid4()), {})
+    savepoint = db.begin_nested()
+    enqueue_events(db, [{"event_type": "b", "aggregate_type": "invoice", "aggregate_id": str(uuid.uuid4()), "payload": {}}])
+    savepoint.rollback()
+    with db.begin_nested():
+        released = enqueue_event(db, "c", "invoice", str(uuid.uuid4()), {})
+    db.commit()
+    assert sorted(db.execute(select(OutboxEvent.id)).scalars()) == sorted([kept.id, released.id])
+
+
+def test_events_in_a_released_savepoint_go_with_the_outer_rollback(client, db):
+    with db.begin_nested():
+        enqueue_event(db, "a", "invoice", str(uuid.uuid4()), {})
+    db.rollback()
+    db.commit()
+    assert _count(db) == 0
+
+
+def test_flush_events_makes_them_visible_before_commit(client, db):
+    enqueue_event(db, "a", "invoice", str(uuid.uuid4()), {})
+    flush_events(db)
+    assert _count(db) == 1
+    db.commit()
+    assert _count(db) == 1
+
+
+def test_webhook_writes_its_events_in_one_insert(client, query_budget):
+    inv = client.post("/invoices", json={"amount_cents": 100, "currency": "EUR"}).json()
+    pp_id = client.post(
+        f"/invoices/{inv['invoice_id']}/pay", json={}, headers={"Idempotency-Key": "k1"}
+    ).json()["provider_payment_id"]
+    with query_budget(10) as counter:
+        client.post(
+            "/webhooks/payment-provider",
+            json={"provider_payment_id": pp_id, "result": "succeeded", "provider_event_id": "evt_1"},
+        )
+    assert len(_outbox_inserts(counter.statements)) == 1
+
+
+def _round_trip(column, value):
+    stored = column.bind_processor(engine.dialect)(value)
+    return stored, column.result_processor(engine.dialect, None)(stored)
+
+
+def test_large_payloads_are_stored_compressed():
+    column = CompressedJSON(256)
+    small = {"invoice_id": "x"}
+    large = {"lines": [{"sku": f"sku-{n}", "amount_cents": 100} for n in range(50)]}
+
+    stored, loaded = _round_trip(column, small)
+    assert "$zlib" not in stored and loaded == small
+
+    stored, loaded = _round_trip(column, large)
+    assert "$zlib" in stored and len(stored) < len(str(large))
+    assert loaded == large
+
+
+def test_compression_is_off_by_default():
+    stored, loaded = _round_trip(CompressedJSON(), {"lines": ["x" * 1000]})
+    assert "$zlib" not in stored and loaded == {"lines": ["x" * 1000]}
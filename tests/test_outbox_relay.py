@@ -0,0 +1,51 @@
+from sqlalchemy import text
+
+from app.infra.db import SessionLocal
+from app.infra.publishers import InMemoryPublisher
+from app.services.outbox import claim_pending
+from app.workers.outbox_relay import relay_once
+from payment_flow import create_invoice, pay
+
+
+def _create_paid_attempts(client, n):
+    for i in range(n):
+        pay(client, create_invoice(client, 1000 + i), f"relay-key-{i}")
+
+
+def test_relay_publishes_each_event_once(client, db):
+    _create_paid_attempts(client, 3)
+
+    publisher = InMemoryPublisher()
+    assert relay_once(publisher, batch_size=2) == 2
+    assert relay_once(publisher, batch_size=2) == 1
+    assert relay_once(publisher, batch_size=2) == 0
+
+    assert len(publisher.published) == 3
+    assert len({e["id"] for e in publisher.published}) == 3
+    assert {e["event_type"] for e in publisher.published} == {"payment_attempt_created"}
+
+    pending = db.execute(
+        text("SELECT COUNT(*) FROM outbox_events WHERE published_at IS NULL")
+    ).scalar_one()
+    assert pending == 0
+
+
+def test_concurrent_claims_skip_locked_rows(client):
+    _create_paid_attempts(client, 3)
+
+    s1, s2 = SessionLocal(), SessionLocal()
+    try:
+        first = claim_pending(s1, limit=2)
+        # s1 still holds its row locks; s2 must skip them instead of waiting
+        second = claim_pending(s2, limit=10)
+
+        ids1 = {r.id for r in first}
+        ids2 = {r.id for r in second}
+        assert len(ids1) == 2
+        assert len(ids2) == 1
+        assert ids1.isdisjoint(ids2)
+    finally:
+        s1.rollback()
+        s2.rollback()
+        s1.close()
+        s2.close()
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.services.outbox_retention import archive_published_batch, retention_cutoff
+from payment_flow import create_invoice, pay
+
+
+def test_archive_moves_only_old_published_events(client, db):
+    for i in range(3):
+        pay(client, create_invoice(client, 800), f"retention-key-{i}")
+
+    ids = db.execute(text("SELECT id FROM outbox_events ORDER BY id")).scalars().all()
+    old = datetime.utcnow() - timedelta(days=30)
+    # two old published events, one still pending
+    db.execute(
+        text("UPDATE outbox_events SET published_at = :ts WHERE id IN (:a, :b)"),
+        {"ts": old, "a": ids[0], "b": ids[1]},
+    )
+    db.commit()
+
+    cutoff = retention_cutoff(days=7)
+    assert archive_published_batch(db, cutoff, batch_size=1) == 1
+    db.commit()
+    assert archive_published_batch(db, cutoff, batch_size=10) == 1
+    db.commit()
+    assert archive_published_batch(db, cutoff, batch_size=10) == 0
+    db.commit()
+
+    hot = db.execute(text("SELECT id FROM outbox_events")).scalars().all()
+    archived = db.execute(text("SELECT id FROM outbox_events_archive")).scalars().all()
+    assert hot == [ids[2]]
+    assert sorted(archived) == sorted(ids[:2])
@@ -0,0 +1,43 @@
+def test_second_key_conflicts_while_attempt_pending_then_allowed_after_failure(client):
+    inv = client.post("/invoices", json={"amount_cents": 4200, "currency": "EUR"}).json()
+    invoice_id = inv["invoice_id"]
+
+    first = client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "pending-key-1"},
+        json={"payment_method": "mock_card"},
+    )
+    assert first.status_code == 202
+
+    # different key while the first attempt is still in flight
+    second = client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "pending-key-2"},
+        json={"payment_method": "mock_card"},
+    )
+    assert second.status_code == 409
+    assert second.json()["detail"] == "invoice_has_pending_attempt"
+
+    # replay of the first key still returns the original attempt
+    replay = client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "pending-key-1"},
+        json={"payment_method": "mock_card"},
+    )
+    assert replay.status_code == 202
+    assert replay.json() == first.json()
+
+    client.post("/webhooks/payment-provider", json={
+        "provider_payment_id": first.json()["provider_payment_id"],
+        "result": "failed",
+        "provider_event_id": "evt_pending_1",
+        "error_code": "card_declined",
+    })
+
+    retry = client.post(
+        f"/invoices/{invoice_id}/pay",
+        headers={"Idempotency-Key": "pending-key-2"},
+        json={"payment_method": "mock_card"},
+    )
+    assert retry.status_code == 202
+    assert retry.json()["attempt_id"] != first.json()["attempt_id"]
@@ -0,0 +1,49 @@
+from sqlalchemy import update
+
+from app.infra.models import Invoice, PaymentAttempt
+from app.services.payments import pay_replay_cache
+
+
+def test_pay_replay_served_from_cache_until_webhook_finalizes(client):
+    inv = client.post("/invoices", json={"amount_cents": 2100, "currency": "EUR"}).json()
+    invoice_id = inv["invoice_id"]
+    headers = {"Idempotency-Key": "cache-key-1"}
+
+    first = client.post(f"/invoices/{invoice_id}/pay", headers=headers, json={"payment_method": "mock_card"})
+    assert first.status_code == 202
+
+    hits = pay_replay_cache.hits
+    replay = client.post(f"/invoices/{invoice_id}/pay", headers=headers, json={"payment_method": "mock_card"})
+    assert replay.status_code == 202
+    assert replay.json() == first.json()
+    assert pay_replay_cache.hits == hits + 1
+
+    client.post("/webhooks/payment-provider", json={
+        "provider_payment_id": first.json()["provider_payment_id"],
+        "result": "succeeded",
+        "provider_event_id": "evt_cache_1",
+    })
+
+    # the webhook invalidated the cached requires_action response, so the
+    # replay goes back to the database and sees the paid invoice
+    after = client.post(f"/invoices/{invoice_id}/pay", headers=headers, json={"payment_method": "mock_card"})
+    assert after.status_code == 409
+    assert after.json()["detail"] == "invoice_already_paid"
+    assert pay_replay_cache.hits == hits + 1
+
+
+def test_cached_response_is_not_served_after_another_process_finalizes(client, db):
+    inv = client.post("/invoices", json={"amount_cents": 2100, "currency": "EUR"}).json()
+    invoice_id = inv["invoice_id"]
+    headers = {"Idempotency-Key": "cache-key-2"}
+    first = client.post(f"/invoices/{invoice_id}/pay", headers=headers, json={"payment_method": "mock_card"})
+    assert first.status_code == 202
+
+    # the webhook is applied elsewhere: this process's cache is not invalidated
+    db.execute(update(PaymentAttempt).where(PaymentAttempt.id == first.json()["attempt_id"]).values(status="succeeded"))
+    db.execute(update(Invoice).where(Invoice.id == invoice_id).values(status="paid"))
+    db.commit()
+
+    after = client.post(f"/invoices/{invoice_id}/pay", headers=headers, json={"payment_method": "mock_card"})
+    assert after.status_code == 409
+    assert after.json()["detail"] == "invoice_already_paid"
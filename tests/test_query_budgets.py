@@ -0,0 +1,62 @@
+import app.main as main
+from app.infra.instrumentation import RequestStats, statement_shape
+from payment_flow import create_invoice, pay, webhook_body
+
+
+def test_create_invoice_budget(client, query_budget):
+    with query_budget(1):
+        create_invoice(client)
+
+
+def test_invoice_detail_budget(client, query_budget):
+    invoice_id = create_invoice(client)
+    with query_budget(4):
+        etag = client.get(f"/invoices/{invoice_id}").headers["etag"]
+    with query_budget(1):
+        assert client.get(f"/invoices/{invoice_id}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_pay_budget(client, query_budget):
+    invoice_id = create_invoice(client)
+    # lock invoice, replay lookup, then one flush: attempt, version bump, outbox event
+    with query_budget(5):
+        pay(client, invoice_id, "budget-key-1")
+
+
+def test_webhook_budget(client, query_budget):
+    body = webhook_body(pay(client, create_invoice(client), "budget-key-2"), "succeeded", "evt_budget")
+    # ledger, attempt, invoice, balances upsert, attempt + invoice updates,
+    # and both outbox events in one INSERT
+    with query_budget(7):
+        client.post("/webhooks/payment-provider", json=body)
+    # duplicates stop at the ledger (and then at the in-process cache)
+    with query_budget(1):
+        client.post("/webhooks/payment-provider", json=body)
+    with query_budget(0):
+        client.post("/webhooks/payment-provider", json=body)
+
+
+def test_batch_webhook_cost_does_not_grow_with_batch_size(client, query_budget):
+    items = [
+        webhook_body(pay(client, create_invoice(client), f"budget-batch-{n}"), "succeeded", f"evt_batch_{n}")
+        for n in range(6)
+    ]
+    with query_budget(10) as small:
+        client.post("/webhooks/payment-provider/batch", json=items[:2])
+    with query_budget(len(small)):
+        client.post("/webhooks/payment-provider/batch", json=items[2:])
+
+
+def test_profile_headers_flag_repeated_statement_shapes(client, monkeypatch):
+    monkeypatch.setattr(main, "DB_QUERY_PROFILE", True)
+    r = client.get("/invoices")
+    assert int(r.headers["x-db-query-count"]) >= 1
+    assert float(r.headers["x-db-time-ms"]) >= 0
+
+    stats = RequestStats(profile=True)
+    for n in range(5):
+        stats.record(f"SELECT * FROM payment_attempts WHERE invoice_id = %(invoice_id_{n})s", 0.001)
+    stats.record("SELECT * FROM invoices WHERE id IN (%(id_1)s, %(id_2)s)", 0.002)
+    assert stats.repeated_shapes() == [("SELECT * FROM payment_attempts WHERE invoice_id = ?", 5)]
+    assert stats.headers()["X-DB-N-Plus-One"] == "1"
+    assert statement_shape("SELECT 1 WHERE a IN (?, ?, ?)") == "SELECT 1 WHERE a IN (?)"
@@ -0,0 +1,75 @@
+import pytest
+
+import app.infra.db as db_module
+import app.main as main
+from app.infra.replica import read_route
+
+
+class _StubMonitor:
+    def __init__(self, lag):
+        self.value = lag
+
+    def lag(self):
+        return self.value
+
+
+@pytest.fixture()
+def replica(monkeypatch):
+    # The "replica" is the test database itself; routing is observed through
+    # which session factory get_read_db picks.
+    used = []
+
+    def replica_session():
+        used.append("replica")
+        return db_module.SessionLocal()
+
+    monitor = _StubMonitor(0.0)
+    monkeypatch.setattr(db_module, "ReplicaSessionLocal", replica_session)
+    monkeypatch.setattr(db_module, "replica_monitor", monitor)
+    monkeypatch.setattr(main, "replica_engine", db_module.engine)
+    return used, monitor
+
+
+def test_read_route_decisions():
+    assert read_route(0.5, None, now=100.0) == "replica"
+    assert read_route(None, None, now=100.0) == "lagging"
+    assert read_route(30.0, None, now=100.0) == "lagging"
+    assert read_route(0.5, 98.0, now=100.0) == "recent_write"
+    assert read_route(0.5, 60.0, now=100.0) == "replica"
+    # a timestamp from the future must not pin the client to the primary
+    assert read_route(0.5, 1e12, now=100.0) == "replica"
+
+
+def test_reads_go_to_replica_except_right_after_a_write(client, replica):
+    used, monitor = replica
+
+    assert client.get("/invoices").status_code == 200
+    assert used == ["replica"]
+
+    created = client.post("/invoices", json={"amount_cents": 100, "currency": "EUR"})
+    marker = created.headers["x-last-write-at"]
+    assert client.cookies.get("last_write_at") == marker
+
+    # the cookie keeps this client on the primary: it sees its own invoice
+    r = client.get(f"/invoices/{created.json()['invoice_id']}")
+    assert r.status_code == 200
+    assert used == ["replica"]
+
+    # other clients, or the same one after the window, read the replica
+    client.cookies.clear()
+    client.get("/invoices")
+    assert used == ["replica", "replica"]
+
+    # so does an API client echoing an old marker in the header
+    client.get("/invoices", headers={"X-Last-Write-At": str(float(marker) - 3600)})
+    assert used == ["replica"] * 3
+
+    monitor.value = None
+    client.get("/invoices")
+    assert used == ["replica"] * 3
+
+
+def test_without_replica_no_write_marker_is_set(client):
+    r = client.post("/invoices", json={"amount_cents": 100, "currency": "EUR"})
+    assert "x-last-write-at" not in r.headers
+    assert client.get("/invoices").status_code == 200
@@ -0,0 +1,76 @@
+import json
+
+from sqlalchemy import select
+
+from app.cli.reconcile_settlements import reconcile_file
+from app.infra.models import OutboxEvent
+from app.services.reconciliation import chunk_ranges, parse_chunk
+from payment_flow import create_invoice, pay, succeed
+
+
+def _payment(client, amount, key, succeeded=True):
+    invoice_id = create_invoice(client, amount)
+    pp_id = pay(client, invoice_id, key)
+    if succeeded:
+        succeed(client, pp_id, f"evt_{key}")
+    return invoice_id, pp_id
+
+
+def test_chunks_split_at_line_boundaries(tmp_path):
+    path = tmp_path / "settlement.csv"
+    lines = [f"pp_{n},succeeded,{n},EUR" for n in range(50)]
+    path.write_bytes(
+        ("provider_payment_id,status,amount_cents,currency\n" + "\n".join(lines) + "\nbroken line\n").encode()
+        + b"pp_\xff2,succeeded,1,EUR\n"
+    )
+
+    rows, errors = [], []
+    for start, end in chunk_ranges(str(path), 40):
+        r, e = parse_chunk(str(path), start, end)
+        rows += r
+        errors += e
+    assert [r.provider_payment_id for r in rows] == [f"pp_{n}" for n in range(50)]
+    assert errors == [
+        {"offset": path.read_bytes().index(b"broken"), "error": "wrong_field_count"},
+        {"offset": path.read_bytes().index(b"pp_\xff"), "error": "invalid_encoding"},
+    ]
+    assert chunk_ranges(str(path), 10**9) == [(0, path.stat().st_size)]
+    empty = tmp_path / "empty.csv"
+    empty.write_text("")
+    assert chunk_ranges(str(empty), 40) == []
+
+
+def test_reconcile_reports_mismatches(client, db, tmp_path):
+    ok_invoice, ok = _payment(client, 1000, "rec-ok")
+    _, unpaid = _payment(client, 500, "rec-unpaid", succeeded=False)
+    failed_invoice, paid_but_failed = _payment(client, 300, "rec-failed")
+    _, wrong_amount = _payment(client, 700, "rec-amount")
+
+    path = tmp_path / "settlement.csv"
+    path.write_text("\n".join([
+        f"{ok},succeeded,1000,eur",
+        f"{unpaid},succeeded,500,EUR",
+        f"{paid_but_failed},failed,300,EUR",
+        f"{wrong_amount},succeeded,701,USD",
+        "pp_unknown,succeeded,100,EUR",
+        "pp_bad,settled,100,EUR",
+    ]) + "\n")
+    out = tmp_path / "mismatches.ndjson"
+
+    counts = reconcile_file(str(path), str(out), workers=2, chunk_bytes=64, lookup_batch_size=2, emit_events=True)
+
+    report = {r["provider_payment_id"]: r["mismatches"] for r in map(json.loads, out.read_text().splitlines())}
+    assert report == {
+        unpaid: ["not_paid_locally"],
+        paid_but_failed: ["failed_at_provider"],
+        wrong_amount: ["amount_mismatch", "currency_mismatch"],
+        "pp_unknown": ["unknown_provider_payment_id"],
+    }
+    assert counts["lines"] == 6 and counts["parse_errors"] == 1 and counts["events"] == 3
+
+    events = db.execute(
+        select(OutboxEvent.aggregate_id, OutboxEvent.payload).where(OutboxEvent.event_type == "settlement_mismatch")
+    ).all()
+    assert len(events) == 3
+    assert {e.aggregate_id for e in events}.isdisjoint({ok_invoice})
+    assert failed_invoice in {e.aggregate_id for e in events}
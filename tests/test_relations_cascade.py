@@ -1,3 +1,5 @@
+import uuid
+
 from sqlalchemy import text
 
 def test_deleting_invoice_cascades_payment_attempts(client, db):
@@ -15,17 +17,17 @@ def test_deleting_invoice_cascades_payment_attempts(client, db):
     # sanity: attempt exists
     attempt_count = db.execute(
         text("SELECT COUNT(*) FROM payment_attempts WHERE invoice_id = :iid"),
-        {"iid": invoice_id},
+        {"iid": uuid.UUID(invoice_id).bytes},
     ).scalar_one()
     assert attempt_count == 1
 
     # delete invoice (direct SQL for clarity)
-    db.execute(text("DELETE FROM invoices WHERE id = :iid"), {"iid": invoice_id})
+    db.execute(text("DELETE FROM invoices WHERE id = :iid"), {"iid": uuid.UUID(invoice_id).bytes})
     db.commit()
 
     # attempts should be gone
     attempt_count2 = db.execute(
         text("SELECT COUNT(*) FROM payment_attempts WHERE invoice_id = :iid"),
-        {"iid": invoice_id},
+        {"iid": uuid.UUID(invoice_id).bytes},
     ).scalar_one()
     assert attempt_count2 == 0
@@ -0,0 +1,91 @@
+import pymysql
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import app.api.payments as payments_api
+import app.services.transactions as transactions
+from app.services.transactions import TX_EXHAUSTED, TX_RETRIES, retry_reason, run_in_transaction
+
+
+def _deadlock():
+    return OperationalError("UPDATE invoices ...", {}, pymysql.err.OperationalError(1213, "Deadlock found"))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(transactions, "backoff_delay", lambda attempt: 0.0)
+
+
+def test_retry_reason_classifies_driver_errors():
+    assert retry_reason(_deadlock()) == "deadlock"
+    assert retry_reason(OperationalError("s", {}, pymysql.err.OperationalError(1205, "Lock wait timeout"))) == "lock_wait_timeout"
+    assert retry_reason(IntegrityError("s", {}, pymysql.err.IntegrityError(1062, "Duplicate entry"))) is None
+    assert retry_reason(ValueError("x")) is None
+
+
+def test_unit_of_work_is_replayed_after_a_deadlock(db):
+    calls = []
+    before = TX_RETRIES.value(operation="test", reason="deadlock")
+
+    def unit_of_work(session):
+        calls.append(1)
+        if len(calls) == 1:
+            raise _deadlock()
+        return "done"
+
+    assert run_in_transaction(db, "test", unit_of_work) == "done"
+    assert len(calls) == 2
+    assert TX_RETRIES.value(operation="test", reason="deadlock") == before + 1
+
+
+def test_exhausted_retries_fail_with_503(db, monkeypatch):
+    monkeypatch.setattr(transactions, "TX_RETRY_MAX_ATTEMPTS", 3)
+    calls = []
+    before = TX_EXHAUSTED.value(operation="test", reason="deadlock")
+
+    def unit_of_work(session):
+        calls.append(1)
+        raise _deadlock()
+
+    with pytest.raises(HTTPException) as exc:
+        run_in_transaction(db, "test", unit_of_work)
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+    assert len(calls) == 3
+    assert TX_EXHAUSTED.value(operation="test", reason="deadlock") == before + 1
+
+
+def test_other_errors_are_not_retried(db):
+    calls = []
+
+    def unit_of_work(session):
+        calls.append(1)
+        raise IntegrityError("s", {}, pymysql.err.IntegrityError(1062, "Duplicate entry"))
+
+    with pytest.raises(IntegrityError):
+        run_in_transaction(db, "test", unit_of_work)
+    assert len(calls) == 1
+
+
+def test_pay_survives_a_deadlock(client, db, monkeypatch):
+    inv = client.post("/invoices", json={"amount_cents": 100, "currency": "EUR"}).json()
+    real_pay_invoice = payments_api.pay_invoice
+    calls = []
+
+    def flaky_pay_invoice(db, **kwargs):
+        calls.append(1)
+        attempt = real_pay_invoice(db, **kwargs)
+        if len(calls) == 1:
+            # after the attempt row was written: the replay must not duplicate it
+            db.flush()
+            raise _deadlock()
+        return attempt
+
+    monkeypatch.setattr(payments_api, "pay_invoice", flaky_pay_invoice)
+    r = client.post(f"/invoices/{inv['invoice_id']}/pay", json={}, headers={"Idempotency-Key": "k1"})
+    assert r.status_code == 202
+    assert len(calls) == 2
+
+    assert db.execute(text("SELECT COUNT(*) FROM payment_attempts")).scalar_one() == 1
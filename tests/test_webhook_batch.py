@@ -0,0 +1,56 @@
+import uuid
+
+from sqlalchemy import text
+
+from payment_flow import create_invoice, pay
+
+
+def _pay(client, key):
+    invoice_id = create_invoice(client, 1500)
+    return invoice_id, pay(client, invoice_id, key)
+
+
+def test_batch_webhook_applies_items_and_reports_per_item(client, db):
+    inv_ok, pp_ok = _pay(client, "batch-key-1")
+    inv_failed, pp_failed = _pay(client, "batch-key-2")
+
+    r = client.post("/webhooks/payment-provider/batch", json=[
+        {"provider_payment_id": pp_ok, "result": "succeeded", "provider_event_id": "evt_b1"},
+        {"provider_payment_id": pp_failed, "result": "failed", "provider_event_id": "evt_b2",
+         "error_code": "card_declined"},
+        # duplicate delivery inside the same batch
+        {"provider_payment_id": pp_ok, "result": "succeeded", "provider_event_id": "evt_b1"},
+        {"provider_payment_id": "pp_unknown", "result": "succeeded", "provider_event_id": "evt_b3"},
+    ])
+    assert r.status_code == 200
+    results = r.json()
+
+    assert [x["status"] for x in results] == ["ok", "ok", "ok", "error"]
+    assert results[0]["attempt_status"] == "succeeded"
+    assert results[1]["attempt_status"] == "failed"
+    assert results[2]["duplicate"] is True
+    assert results[3]["error"] == "attempt_not_found_for_provider_payment_id"
+
+    assert client.get(f"/invoices/{inv_ok}").json()["status"] == "paid"
+    assert client.get(f"/invoices/{inv_failed}").json()["status"] == "open"
+
+    counts = dict(db.execute(
+        text("SELECT event_type, COUNT(*) FROM outbox_events GROUP BY event_type")
+    ).all())
+    assert counts["invoice_paid"] == 1
+    assert counts["payment_attempt_succeeded"] == 1
+    assert counts["payment_attempt_failed"] == 1
+
+
+def test_batch_webhook_is_idempotent_across_requests(client, db):
+    inv_id, pp_id = _pay(client, "batch-key-3")
+    body = [{"provider_payment_id": pp_id, "result": "succeeded", "provider_event_id": "evt_b4"}]
+
+    assert client.post("/webhooks/payment-provider/batch", json=body).status_code == 200
+    assert client.post("/webhooks/payment-provider/batch", json=body).status_code == 200
+
+    cnt = db.execute(
+        text("SELECT COUNT(*) FROM outbox_events WHERE event_type='invoice_paid' AND aggregate_id=:iid"),
+        {"iid": uuid.UUID(inv_id).bytes},
+    ).scalar_one()
+    assert cnt == 1
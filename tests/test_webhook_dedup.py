@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from app.infra.models import PaymentAttempt, ProcessedProviderEvent
+from app.services.provider_events import processed_events_cache, prune_processed_events
+from payment_flow import create_invoice, pay, webhook
+
+
+def test_older_event_redelivered_after_newer_is_a_duplicate(client, db):
+    pp_id = pay(client, create_invoice(client, 900), "dedup-key-1")
+    assert webhook(client, pp_id, "failed", "evt_old").json()["attempt_status"] == "failed"
+    assert "duplicate" not in webhook(client, pp_id, "failed", "evt_new").json()
+
+    # provider_event_id_last is evt_new now; the ledger still knows evt_old
+    processed_events_cache.clear()
+    r = webhook(client, pp_id, "failed", "evt_old")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok", "duplicate": True}
+
+    # ... and the answer is cached for the next redelivery
+    assert processed_events_cache.get((pp_id, "evt_old")) is True
+
+
+def test_failed_callback_is_not_recorded(client, db):
+    r = webhook(client, "pp_missing", "succeeded", "evt_x")
+    assert r.status_code == 404
+
+    count = db.execute(select(func.count()).select_from(ProcessedProviderEvent)).scalar_one()
+    assert count == 0
+    assert processed_events_cache.get(("pp_missing", "evt_x")) is None
+
+
+def test_batch_reports_duplicates_and_releases_failures(client, db):
+    pp_id = pay(client, create_invoice(client, 900), "dedup-key-2")
+    item = {"provider_payment_id": pp_id, "result": "succeeded", "provider_event_id": "evt_b1"}
+    missing = {"provider_payment_id": "pp_missing", "result": "succeeded", "provider_event_id": "evt_b2"}
+
+    r = client.post("/webhooks/payment-provider/batch", json=[item, item, missing])
+    assert r.status_code == 200
+    body = r.json()
+    assert [(x["status"], x["duplicate"]) for x in body] == [("ok", False), ("ok", True), ("error", False)]
+
+    keys = db.execute(select(ProcessedProviderEvent.provider_payment_id)).scalars().all()
+    assert keys == [pp_id]
+
+    attempt = db.execute(select(PaymentAttempt).where(PaymentAttempt.provider_payment_id == pp_id)).scalar_one()
+    assert attempt.status == "succeeded"
+
+
+def test_prune_removes_ledger_rows_past_the_dedupe_window(client, db):
+    pp_id = pay(client, create_invoice(client, 900), "dedup-key-prune")
+    webhook(client, pp_id, "failed", "evt_old")
+    webhook(client, pp_id, "failed", "evt_new")
+    db.execute(
+        update(ProcessedProviderEvent)
+        .where(ProcessedProviderEvent.provider_event_id == "evt_old")
+        .values(processed_at=datetime.utcnow() - timedelta(days=60))
+    )
+    db.commit()
+
+    cutoff = datetime.utcnow() - timedelta(days=30)
+    assert prune_processed_events(db, cutoff, batch_size=10) == 1
+    db.commit()
+    assert prune_processed_events(db, cutoff, batch_size=10) == 0
+    assert db.execute(select(ProcessedProviderEvent.provider_event_id)).scalars().all() == ["evt_new"]
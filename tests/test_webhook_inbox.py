@@ -0,0 +1,53 @@
+from sqlalchemy import select
+
+import app.api.payments as payments_api
+from app.infra.models import PaymentAttempt, WebhookInboxEntry
+from app.services.webhook_inbox import process_inbox_batch, shard_for, worker_shards
+from payment_flow import create_invoice, pay, webhook_body
+
+ALL_SHARDS = worker_shards(0, 1)
+
+
+def test_inbox_mode_acks_then_worker_applies_in_order(client, db, monkeypatch):
+    monkeypatch.setattr(payments_api, "WEBHOOK_INGEST_MODE", "inbox")
+    invoice_id = create_invoice(client, 1200)
+    pp_id = pay(client, invoice_id, "inbox-key-1")
+
+    for body in (
+        webhook_body(pp_id, "succeeded", "evt_in_1"),
+        # stale callback arriving after the final one
+        webhook_body(pp_id, "failed", "evt_in_2"),
+        webhook_body("pp_unknown", "succeeded", "evt_in_3"),
+    ):
+        r = client.post("/webhooks/payment-provider", json=body)
+        assert r.status_code == 200
+        assert r.json() == {"status": "accepted"}
+
+    # nothing applied yet
+    assert client.get(f"/invoices/{invoice_id}").json()["status"] == "open"
+
+    assert process_inbox_batch(db, ALL_SHARDS, limit=100) == 3
+    db.commit()
+    assert process_inbox_batch(db, ALL_SHARDS, limit=100) == 0
+
+    assert client.get(f"/invoices/{invoice_id}").json()["status"] == "paid"
+    attempt = db.execute(select(PaymentAttempt).where(PaymentAttempt.provider_payment_id == pp_id)).scalar_one()
+    assert attempt.status == "succeeded"
+
+    entries = db.execute(select(WebhookInboxEntry).order_by(WebhookInboxEntry.id)).scalars().all()
+    assert all(e.processed_at is not None for e in entries)
+    assert [(e.status, e.error) for e in entries] == [
+        ("ok", None), ("ok", None), ("error", "attempt_not_found_for_provider_payment_id"),
+    ]
+
+
+def test_worker_only_claims_its_own_shards(client, db, monkeypatch):
+    monkeypatch.setattr(payments_api, "WEBHOOK_INGEST_MODE", "inbox")
+    pp_id = pay(client, create_invoice(client, 1200), "inbox-key-2")
+    client.post("/webhooks/payment-provider", json={"provider_payment_id": pp_id, "result": "succeeded"})
+
+    shard = shard_for(pp_id)
+    others = [s for s in ALL_SHARDS if s != shard]
+    assert process_inbox_batch(db, others, limit=100) == 0
+    assert process_inbox_batch(db, [shard], limit=100) == 1
+    db.commit()